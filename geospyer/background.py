@@ -0,0 +1,170 @@
+"""
+In-process background analysis jobs for interactive front ends.
+
+JobManager runs analyses through a FairScheduler (a fixed number of workers
+shared fairly between users, interactive requests first) and hands back job
+handles that can be polled and cancelled. Identical submissions (same key)
+made while a job is queued or running share that job instead of starting
+another API call, and a job is only cancelled once every submitter has
+released it, so one user abandoning a request never aborts it for another.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .cancel import CancelledError, CancelToken, cancel_scope
+from .scheduler import FairScheduler
+
+
+class BackgroundJob:
+    """Handle for an analysis running on a JobManager."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.token = CancelToken()
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.subscribers = 1
+        self.done = threading.Event()
+        self.task = None
+
+    @property
+    def finished(self) -> bool:
+        return self.done.is_set()
+
+    def _finish(self, status: str, result: Dict[str, Any]) -> None:
+        self.status = status
+        self.result = result
+        self.finished_at = time.time()
+        self.done.set()
+
+
+class JobManager:
+    """
+    Fairly scheduled pool of cancellable, de-duplicated background analyses.
+
+    Example:
+        manager = JobManager(max_workers=4)
+        job = manager.submit(cache_key, geospy.locate_bytes, data, user=session_id, interactive=True)
+        ...
+        if job.finished:
+            print(job.result)
+        manager.release(job)  # Cancels it if nobody else is waiting
+    """
+
+    def __init__(self, max_workers: int = 4):
+        """
+        Args:
+            max_workers: Maximum number of analyses running at once, across all users
+        """
+        self.scheduler = FairScheduler(workers=max_workers)
+        self._inflight: Dict[str, BackgroundJob] = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.cancelled = 0
+
+    def submit(self, key: str, func: Callable[..., Dict[str, Any]], *args,
+               user: str = "default", interactive: bool = False, **kwargs) -> BackgroundJob:
+        """
+        Run func(*args, **kwargs) in the background, or join an identical job in flight.
+
+        Args:
+            key: Identity of the request (e.g. a result cache key)
+            func: Analysis function returning a result dictionary
+            user: Submitting user, for fair sharing of the workers
+            interactive: Someone is waiting on this single result; run it before bulk work
+
+        Returns:
+            The job handle; the caller should release() it when no longer interested
+        """
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is not None and not job.finished and not job.token.cancelled:
+                job.subscribers += 1
+                self.deduplicated += 1
+                if interactive:
+                    self.scheduler.promote(job.task)
+                return job
+            job = BackgroundJob(key)
+            self._inflight[key] = job
+            self.submitted += 1
+            job.task = self.scheduler.submit(lambda: self._run(job, func, args, kwargs),
+                                             user=user, interactive=interactive)
+        return job
+
+    def position(self, job: BackgroundJob) -> Optional[int]:
+        """Number of jobs that will start before this one, or None if it is not waiting."""
+        return self.scheduler.position(job.task) if job.task is not None else None
+
+    def _run(self, job: BackgroundJob, func: Callable, args, kwargs) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            with cancel_scope(job.token):
+                job.token.raise_if_cancelled()
+                result = func(*args, **kwargs)
+            job._finish("failed" if "error" in result else "done", result)
+        except CancelledError:
+            job._finish("cancelled", {"error": "Analysis cancelled", "cancelled": True})
+        except Exception as e:
+            job._finish("failed", {"error": f"Unexpected error during analysis: {str(e)}"})
+        finally:
+            self._forget(job)
+
+    def _forget(self, job: BackgroundJob) -> None:
+        with self._lock:
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+
+    def release(self, job: BackgroundJob) -> bool:
+        """
+        Drop one submitter's interest in a job, cancelling it when none remain.
+
+        Returns:
+            True if the job was cancelled
+        """
+        with self._lock:
+            job.subscribers -= 1
+            if job.subscribers > 0 or job.finished:
+                return False
+        return self.cancel(job)
+
+    def cancel(self, job: BackgroundJob) -> bool:
+        """
+        Cancel a job for every submitter, aborting its in-flight request and backoff.
+
+        Returns:
+            True if the job had not finished yet
+        """
+        if job.finished:
+            return False
+        self._forget(job)
+        job.token.cancel()
+        self.cancelled += 1
+        if job.task is not None and self.scheduler.cancel(job.task):
+            # Never started, so no worker will record the outcome
+            job._finish("cancelled", {"error": "Analysis cancelled", "cancelled": True})
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            inflight = len(self._inflight)
+        return {
+            **self.scheduler.stats(),
+            "in_flight": inflight,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "cancelled": self.cancelled,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = list(self._inflight.values())
+        for job in jobs:
+            self.cancel(job)
+        self.scheduler.shutdown()
@@ -0,0 +1,346 @@
+"""
+Load benchmark for GeoSpy deployments.
+
+Drives GeoSpy.locate_bytes against a configurable endpoint with a synthetic
+corpus of JPEGs of several sizes, either at a fixed concurrency (closed loop:
+each worker sends its next request as soon as the previous one returns) or at
+an open-loop arrival rate (requests start on schedule whether or not earlier
+ones finished, so queueing shows up in the latency instead of silently
+lowering the load). It reports throughput, latency percentiles overall and per
+image size, retries and errors, and the client's CPU time and memory.
+
+StubServer is a local stand-in for the Gemini endpoint with configurable
+latency and error rate, so client-side limits can be measured without quota.
+measure_models compares the memory and access time of results held as
+dictionaries, as Location models and as a LocationBatch.
+"""
+
+import io
+import json
+import math
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource  # Unix only; CPU and RSS are reported as None elsewhere
+except ImportError:
+    resource = None
+
+DEFAULT_SIZES = ((640, 480), (1600, 1200), (4000, 3000))
+
+# Answer returned by StubServer for every successful request
+STUB_RESULT = {
+    "interpretation": "Benchmark stand-in response.",
+    "locations": [{
+        "country": "France", "state": "Île-de-France", "city": "Paris", "confidence": "High",
+        "coordinates": {"latitude": 48.8566, "longitude": 2.3522},
+        "explanation": "Stand-in answer from the benchmark server."
+    }]
+}
+
+
+def parse_sizes(spec: str) -> List[Tuple[int, int]]:
+    """Parse "640x480,1600x1200" into a list of (width, height)."""
+    sizes = []
+    for item in spec.split(","):
+        width, _, height = item.strip().lower().partition("x")
+        if not width.isdigit() or not height.isdigit():
+            raise ValueError(f"Invalid image size '{item}', expected WIDTHxHEIGHT")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def synthetic_corpus(sizes: Sequence[Tuple[int, int]] = DEFAULT_SIZES, per_size: int = 4,
+                     quality: int = 85) -> List[Tuple[str, bytes]]:
+    """
+    Generate noisy JPEGs (which compress about as poorly as photos) of each size.
+
+    Args:
+        sizes: (width, height) of the images
+        per_size: Distinct images generated per size, so results are not served from caches
+        quality: JPEG quality
+
+    Returns:
+        List of (size label, JPEG bytes)
+    """
+    from PIL import Image
+    corpus = []
+    for width, height in sizes:
+        for i in range(per_size):
+            bands = [Image.effect_noise((width, height), 40 + 10 * band + i) for band in range(3)]
+            image = Image.merge("RGB", bands)
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=quality)
+            corpus.append((f"{width}x{height}", buffer.getvalue()))
+    return corpus
+
+
+class StubServer:
+    """
+    Local stand-in for the Gemini models endpoint.
+
+    Example:
+        with StubServer(latency=1.5, error_rate=0.05) as stub:
+            geospy = GeoSpy(api_key="bench", api_base=stub.api_base)
+    """
+
+    def __init__(self, latency: float = 1.0, jitter: float = 0.25, error_rate: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            latency: Mean seconds before answering
+            jitter: Answers take latency * (1 ± jitter), uniformly distributed
+            error_rate: Share of requests answered with 503 (overloaded)
+            host: Interface to bind
+            port: Port to listen on (0 picks a free one)
+        """
+        stub = self
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        body = json.dumps({"candidates": [{"content": {"parts": [{"text": json.dumps(STUB_RESULT)}]}}]}).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                failed = random.random() < stub.error_rate
+                with stub._lock:
+                    stub.requests += 1
+                    stub.errors += int(failed)
+                time.sleep(max(0.0, stub.latency * (1 + random.uniform(-stub.jitter, stub.jitter))))
+                out = b'{"error": {"code": 503, "message": "Stand-in overload"}}' if failed else body
+                self.send_response(503 if failed else 200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.api_base = f"http://{host}:{self.httpd.server_port}/v1/models"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def latency_summary(latencies: Sequence[float]) -> Dict[str, Any]:
+    return {
+        "count": len(latencies),
+        "mean": round(sum(latencies) / len(latencies), 4) if latencies else None,
+        **{f"p{pct}": round(value, 4) if value is not None else None
+           for pct in (50, 95, 99) for value in [percentile(latencies, pct)]},
+        "max": round(max(latencies), 4) if latencies else None,
+    }
+
+
+def synthetic_results(count: int, locations: int = 5) -> List[Dict[str, Any]]:
+    """Generate result dictionaries shaped like Gemini answers (random places and confidences)."""
+    rng = random.Random(0)
+    return [{
+        "interpretation": f"Street scene number {i} with shop signs, road markings and vegetation.",
+        "locations": [{
+            "country": f"Country {rng.randrange(200)}", "state": f"State {rng.randrange(5000)}",
+            "city": f"City {rng.randrange(50000)}", "confidence": rng.choice(("High", "Medium", "Low")),
+            "coordinates": {"latitude": rng.uniform(-90, 90), "longitude": rng.uniform(-180, 180)},
+            "explanation": f"Clue {j} of result {i}: architecture and signage typical of the region."
+        } for j in range(locations)]
+    } for i in range(count)]
+
+
+def _best_seconds(function, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure_models(results: int = 20000, locations: int = 5) -> Dict[str, Any]:
+    """
+    Measure memory and access time of results as dicts, Location models and a LocationBatch.
+
+    Each representation is built from freshly parsed JSON (as results arrive
+    from the API or a results file) and measured with tracemalloc after the
+    parsed dictionaries are released, so only what it retains is counted.
+    Access time is the best of five runs summing every latitude.
+
+    Args:
+        results: Number of synthetic results
+        locations: Locations per result
+
+    Returns:
+        Report dictionary with "memory_mb" and "sum_latitudes_ms" per representation
+    """
+    import numpy as np
+    from .models import LocationBatch, LocationResult
+
+    text = json.dumps(synthetic_results(results, locations))
+    builders = {
+        "dicts": lambda parsed: parsed,
+        "models": lambda parsed: [LocationResult.from_dict(result) for result in parsed],
+        "batch": lambda parsed: LocationBatch.from_results(parsed),
+    }
+    memory: Dict[str, float] = {}
+    built: Dict[str, Any] = {}
+    for name, build in builders.items():
+        tracemalloc.start()
+        value = build(json.loads(text))  # The parsed dicts are released unless the builder keeps them
+        memory[name] = round(tracemalloc.get_traced_memory()[0] / 1e6, 1)
+        tracemalloc.stop()
+        built[name] = value
+
+    dicts, models, batch = built["dicts"], built["models"], built["batch"]
+    timings = {
+        "dicts": _best_seconds(lambda: sum(location["coordinates"]["latitude"]
+                                           for result in dicts for location in result["locations"])),
+        "models": _best_seconds(lambda: sum(location.latitude
+                                            for result in models for location in result.locations)),
+        "batch": _best_seconds(lambda: float(np.nansum(batch.latitude))),
+    }
+    return {
+        "results": results,
+        "locations_per_result": locations,
+        "memory_mb": memory,
+        "sum_latitudes_ms": {name: round(seconds * 1000, 2) for name, seconds in timings.items()},
+    }
+
+
+def _usage() -> Tuple[float, Optional[float]]:
+    """Return (process CPU seconds, peak RSS in MB)."""
+    if resource is None:
+        return time.process_time(), None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss / divisor
+
+
+def run_bench(geospy, corpus: Sequence[Tuple[str, bytes]], requests: int = 100,
+              concurrency: int = 4, rate: Optional[float] = None, max_in_flight: int = 256,
+              warmup: int = 0) -> Dict[str, Any]:
+    """
+    Send requests through GeoSpy and measure them.
+
+    Args:
+        geospy: Client under test (configured with the endpoint, rate limiter, ...)
+        corpus: (label, image bytes) pairs, used round-robin
+        requests: Number of measured requests
+        concurrency: Closed loop: requests in flight at once (ignored when rate is set)
+        rate: Open loop: requests started per second (Poisson arrivals)
+        max_in_flight: Open loop: cap on concurrent requests; later arrivals wait
+            for a slot, and that wait counts towards their latency
+        warmup: Requests sent first and left out of the results (opens connections)
+
+    Returns:
+        Report dictionary (see format of the "bench" CLI JSON output)
+    """
+    for i in range(warmup):
+        geospy.locate_bytes(corpus[i % len(corpus)][1])
+
+    stats_before = dict(geospy.stats)
+    samples: List[Tuple[str, float, Optional[str]]] = []
+    samples_lock = threading.Lock()
+
+    def one(index: int, scheduled: float) -> None:
+        label, data = corpus[index % len(corpus)]
+        result = geospy.locate_bytes(data)
+        # Latency from the scheduled start, so time spent queued for a slot is included
+        latency = time.perf_counter() - scheduled
+        with samples_lock:
+            samples.append((label, latency, result.get("error")))
+
+    cpu_before, _ = _usage()
+    started = time.perf_counter()
+    if rate:
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            arrival = started
+            for i in range(requests):
+                arrival += random.expovariate(rate)
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(one, i, arrival)
+    else:
+        counter = iter(range(requests))
+        counter_lock = threading.Lock()
+
+        def worker() -> None:
+            while True:
+                with counter_lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                one(index, time.perf_counter())
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+    cpu_after, peak_rss = _usage()
+
+    delta = {name: geospy.stats.get(name, 0) - stats_before.get(name, 0) for name in geospy.stats}
+    errors: Dict[str, int] = {}
+    for _, _, error in samples:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+    by_size: Dict[str, List[float]] = {}
+    for label, latency, error in samples:
+        if not error:
+            by_size.setdefault(label, []).append(latency)
+    succeeded = [latency for _, latency, error in samples if not error]
+
+    return {
+        "mode": "open_loop" if rate else "closed_loop",
+        "concurrency": concurrency if not rate else None,
+        "rate": rate,
+        "max_in_flight": max_in_flight if rate else None,
+        "endpoint": geospy.api_base,
+        "model": geospy.model,
+        "requests": len(samples),
+        "succeeded": len(succeeded),
+        "failed": len(samples) - len(succeeded),
+        "errors": errors,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_per_second": round(len(succeeded) / elapsed, 3) if elapsed else None,
+        "latency_seconds": latency_summary(succeeded),
+        "latency_by_size": {label: latency_summary(values) for label, values in sorted(by_size.items())},
+        "api_requests": delta.get("api_requests", 0),
+        "retries": delta.get("retries", 0),
+        "circuit_rejections": delta.get("circuit_rejections", 0),
+        "client_cpu_seconds": round(cpu_after - cpu_before, 3),
+        "client_cpu_percent": round(100 * (cpu_after - cpu_before) / elapsed, 1) if elapsed else None,
+        "client_peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+        "corpus": {label: sum(1 for item in corpus if item[0] == label) for label, _ in corpus},
+        "corpus_bytes": sum(len(data) for _, data in corpus),
+    }
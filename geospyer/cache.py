@@ -0,0 +1,153 @@
+"""
+Result caching for GeoSpy.
+
+A bounded, thread-safe LRU cache with per-entry expiry, used to memoize
+analysis results by image content and prompt inputs so repeated analyses of
+the same image are served without another API call, and a byte-bounded LRU
+of encoded image previews so front ends never resend full-size images.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def make_cache_key(image_digest: str, context_info: Optional[str] = None,
+                   location_guess: Optional[str] = None) -> str:
+    """
+    Build a cache key from an image digest and the prompt inputs.
+
+    Args:
+        image_digest: Content hash (or other stable identifier) of the image
+        context_info: Optional additional context about the image
+        location_guess: Optional user's guess of the location
+
+    Returns:
+        Hex digest identifying this analysis request
+    """
+    h = hashlib.sha256()
+    for part in (image_digest, context_info or "", location_guess or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache with a maximum size and time-to-live.
+
+    Only successful results should be stored; callers decide what to cache.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 3600):
+        """
+        Args:
+            max_entries: Maximum number of cached results
+            ttl: Seconds a result stays valid (None never expires)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a result, evicting the least recently used entry when full."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        return {"entries": len(self._entries), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
+
+
+class PreviewCache:
+    """
+    LRU cache of encoded previews bounded by their total size in bytes.
+
+    Keys are image content hashes (or another stable identifier such as a
+    URL), so each image is downscaled and encoded once.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: Maximum total size of the cached previews
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Return (preview bytes, MIME type) for key, or None if not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, data: bytes, mime_type: str) -> None:
+        """Store a preview, evicting least recently used previews beyond max_bytes."""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (data, mime_type)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get_or_create(self, key: str, factory: Callable[[], Tuple[bytes, str]]) -> Tuple[bytes, str]:
+        """Return the cached preview for key, building and storing it with factory() on a miss."""
+        entry = self.get(key)
+        if entry is None:
+            entry = factory()
+            self.put(key, *entry)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,181 @@
+"""
+Cooperative cancellation for GeoSpy analyses.
+
+A CancelToken is bound to the thread running an analysis with cancel_scope().
+While it is bound, every blocking step GeoSpy takes checks it: retry backoff
+and rate limiter waits wake up early, and HTTP requests sent through a
+session using CancellableAdapter have their socket shut down, so a request
+waiting on a slow Gemini response is aborted instead of running to its
+timeout. Cancellation surfaces as CancelledError in the analysing thread.
+"""
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# How often blocking waits that cannot be interrupted directly re-check the token
+POLL_INTERVAL = 0.25
+
+_local = threading.local()
+
+
+class CancelledError(BaseException):
+    """
+    Raised in a thread whose analysis was cancelled.
+
+    Derives from BaseException (like asyncio.CancelledError) so the
+    ``except Exception`` handlers that turn failures into error results do
+    not swallow it.
+    """
+
+
+class CancelToken:
+    """A thread-safe cancellation flag with callbacks that abort blocking I/O."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._aborts: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Cancel the analysis and abort any request it has in flight."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            aborts = list(self._aborts)
+        for abort in aborts:
+            try:
+                abort()
+            except Exception:
+                pass  # Best effort; the analysing thread still sees the flag
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise CancelledError()
+
+    def wait(self, seconds: float) -> bool:
+        """Wait up to seconds; returns True as soon as the token is cancelled."""
+        return self._event.wait(seconds)
+
+    @contextmanager
+    def aborting(self, abort: Callable[[], None]) -> Iterator[None]:
+        """
+        Register a callback that interrupts a blocking operation on cancel.
+
+        Errors raised by the interrupted operation are replaced with
+        CancelledError.
+        """
+        with self._lock:
+            if self._event.is_set():
+                raise CancelledError()
+            self._aborts.append(abort)
+        try:
+            yield
+        except Exception as e:
+            if self._event.is_set():
+                raise CancelledError() from e
+            raise
+        finally:
+            with self._lock:
+                self._aborts.remove(abort)
+
+
+def current_token() -> Optional[CancelToken]:
+    """Return the token bound to the calling thread, if any."""
+    return getattr(_local, "token", None)
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    """Bind a token to the calling thread for the duration of the block."""
+    previous = current_token()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def bind(func: Callable) -> Callable:
+    """Wrap func so it runs under the calling thread's token, e.g. in a worker pool."""
+    token = current_token()
+    if token is None:
+        return func
+
+    def bound(*args, **kwargs):
+        with cancel_scope(token):
+            token.raise_if_cancelled()
+            return func(*args, **kwargs)
+    return bound
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep that wakes up and raises CancelledError when the bound token is cancelled."""
+    token = current_token()
+    if token is None:
+        time.sleep(seconds)
+    elif token.wait(seconds):
+        raise CancelledError()
+
+
+def _shutdown(conn) -> None:
+    sock = getattr(conn, "sock", None)
+    if sock is not None:
+        # Shut down the raw socket (bypassing SSLSocket.shutdown) so a blocked read returns at once
+        socket.socket.shutdown(sock, socket.SHUT_RDWR)
+
+
+class _AbortOnCancel:
+    """Connection pool mixin that shuts down the connection of a cancelled request."""
+
+    def _make_request(self, conn, *args, **kwargs):
+        token = current_token()
+        if token is None:
+            return super()._make_request(conn, *args, **kwargs)
+        with token.aborting(lambda: _shutdown(conn)):
+            return super()._make_request(conn, *args, **kwargs)
+
+
+class _CancellableHTTPConnectionPool(_AbortOnCancel, HTTPConnectionPool):
+    pass
+
+
+class _CancellableHTTPSConnectionPool(_AbortOnCancel, HTTPSConnectionPool):
+    pass
+
+
+class CancellableAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose requests are aborted when the calling thread's token is cancelled.
+
+    Requests made without a bound token behave exactly like a plain HTTPAdapter.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CancellableHTTPConnectionPool,
+            "https": _CancellableHTTPSConnectionPool,
+        }
+
+    def send(self, request, stream=False, **kwargs):
+        token = current_token()
+        if token is None:
+            return super().send(request, stream=stream, **kwargs)
+        token.raise_if_cancelled()
+        response = super().send(request, stream=stream, **kwargs)
+        if not stream:
+            # Read the body here, while the connection can still be shut down on cancel
+            with token.aborting(lambda: _shutdown(getattr(response.raw, "connection", None))):
+                response.content
+        return response
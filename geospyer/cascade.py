@@ -0,0 +1,151 @@
+"""
+Confidence-driven model cascade for GeoSpy.
+
+Every image is first sent to the fastest, cheapest model. The answer is
+accepted unless it looks unreliable (the top location has low confidence,
+equally confident predictions are far apart, or the response could not be
+parsed), in which case the same request is repeated on the next, stronger
+model. Most images resolve on the first tier, so average latency and cost
+stay close to the cheap model while hard images still get the strong one.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from .merge import haversine_km, location_coordinates
+
+# Cheapest model first; each later tier is only used when the previous answer is rejected
+DEFAULT_TIERS = ("gemini-2.0-flash-lite-001", "gemini-2.5-flash")
+
+CONFIDENCE_RANKS = {"Low": 1, "Medium": 2, "High": 3}
+
+# Error messages produced by GeoSpy.parse_response (the model answered, but not usable JSON)
+PARSE_ERRORS = ("Failed to parse API response", "Failed to process API response")
+
+
+def sum_usage(*usages: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+    """Add up the token usage of several requests made for one image (None when none was reported)."""
+    total: Dict[str, int] = {}
+    for usage in usages:
+        for name, value in (usage or {}).items():
+            total[name] = total.get(name, 0) + value
+    return total or None
+
+
+def escalation_reason(result: Dict[str, Any], min_confidence: str = "Medium",
+                      disagreement_km: float = 1000.0, escalate_on_parse_error: bool = True) -> Optional[str]:
+    """
+    Decide whether an answer is too unreliable to accept.
+
+    API and network errors are not escalated: a stronger model or a larger
+    image would not fix them, and the retry logic in send_request already
+    handled them.
+
+    Args:
+        result: Result returned by GeoSpy
+        min_confidence: Reject answers whose top location is less confident than this
+        disagreement_km: Reject answers whose locations sharing the top confidence level
+            are further apart than this (0 disables the check)
+        escalate_on_parse_error: Reject responses that could not be parsed
+
+    Returns:
+        "parse_error", "no_locations", "low_confidence" or "disagreement",
+        or None if the result is accepted
+    """
+    if "error" in result:
+        if escalate_on_parse_error and result["error"] in PARSE_ERRORS:
+            return "parse_error"
+        return None
+
+    locations = result.get("locations") or []
+    if not locations:
+        return "no_locations"
+
+    top = locations[0]
+    top_rank = CONFIDENCE_RANKS.get(top.get("confidence"), 0)
+    if top_rank < CONFIDENCE_RANKS[min_confidence]:
+        return "low_confidence"
+
+    # The model is torn if it is equally sure about places far apart
+    top_coords = location_coordinates(top)
+    if disagreement_km and top_coords:
+        for other in locations[1:]:
+            if CONFIDENCE_RANKS.get(other.get("confidence"), 0) < top_rank:
+                continue
+            coords = location_coordinates(other)
+            if coords and haversine_km(top_coords[0], top_coords[1], coords[0], coords[1]) > disagreement_km:
+                return "disagreement"
+    return None
+
+
+class CascadePolicy:
+    """
+    Run a request on increasingly capable models until an answer is accepted.
+
+    Example:
+        geospy = GeoSpy(cascade=CascadePolicy(["gemini-2.0-flash-lite-001", "gemini-2.5-flash"]))
+        result = geospy.locate("photo.jpg")
+        result["cascade"]  # {"tier": 0, "model": "gemini-2.0-flash-lite-001", "escalations": []}
+    """
+
+    def __init__(self, models: Sequence[str] = DEFAULT_TIERS, min_confidence: str = "Medium",
+                 disagreement_km: float = 1000.0, escalate_on_parse_error: bool = True):
+        """
+        Args:
+            models: Model names, cheapest first
+            min_confidence: Escalate when the top location's confidence is below this level
+            disagreement_km: Escalate when locations sharing the top confidence level are
+                further apart than this (0 disables the check)
+            escalate_on_parse_error: Escalate when the response could not be parsed
+        """
+        if not models:
+            raise ValueError("A cascade needs at least one model")
+        if min_confidence not in CONFIDENCE_RANKS:
+            raise ValueError(f"min_confidence must be one of: {', '.join(CONFIDENCE_RANKS)}")
+        self.models = list(models)
+        self.min_confidence = min_confidence
+        self.disagreement_km = disagreement_km
+        self.escalate_on_parse_error = escalate_on_parse_error
+
+    def escalation_reason(self, result: Dict[str, Any]) -> Optional[str]:
+        """Decide whether a result should be retried on a stronger model (see escalation_reason)."""
+        return escalation_reason(result, self.min_confidence, self.disagreement_km, self.escalate_on_parse_error)
+
+    def run(self, geospy, request_body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send a request through the cascade.
+
+        Args:
+            geospy: GeoSpy client used to send and parse the requests
+            request_body: Request body returned by build_request_body
+
+        Returns:
+            The accepted result with a "cascade" entry recording the tier and
+            model that answered and why earlier tiers were rejected, and the
+            token usage of all tiers tried under "usage". If a
+            stronger tier fails outright, the last successful answer is kept.
+            Errors are returned unchanged.
+        """
+        escalations: List[Dict[str, str]] = []
+        answer = None
+        result: Dict[str, Any] = {}
+        usage = None
+        for tier, model in enumerate(self.models):
+            response, error = geospy.send_request(request_body, model=model)
+            result = error if error is not None else geospy.parse_response(response)
+            usage = sum_usage(usage, result.get("usage"))
+            if "error" not in result:
+                answer = (tier, model, result)
+            reason = self.escalation_reason(result)
+            if reason is None or tier == len(self.models) - 1:
+                break
+            escalations.append({"model": model, "reason": reason})
+            geospy._count("cascade_escalations")
+
+        if answer is None:
+            return result
+        tier, model, result = answer
+        geospy._count(f"cascade_tier_{tier}")
+        result["cascade"] = {"tier": tier, "model": model, "escalations": escalations}
+        if usage:
+            result["usage"] = usage  # Every tier tried was billed
+        return result
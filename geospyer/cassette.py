@@ -0,0 +1,198 @@
+"""
+Record and replay HTTP traffic for GeoSpy.
+
+In record mode every request GeoSpy sends (Gemini calls, Files API uploads,
+image downloads) goes to the network as usual and its response is appended
+to a cassette file: one JSON line per exchange with the request fingerprint,
+status code, headers, body and how long the response took. In replay mode the
+same requests are answered from the cassette without touching the network,
+optionally sleeping for the recorded latencies, so batches can be re-run and
+profiled offline against real traffic shapes without using quota.
+
+Requests are matched by method, URL (with the API key removed) and a hash of
+the body, so the key never reaches the cassette and a different key replays
+the same recording. URL-valued response headers (e.g. the X-Goog-Upload-URL
+of a Files API upload, which echoes the key) are stored without it too. A
+request sent several times (e.g. retried after a 503) is answered with its
+recorded responses in order.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from . import cancel
+
+CASSETTE_MODES = ("record", "replay")
+
+# Query parameters never written to a cassette or used for matching
+SECRET_PARAMS = {"key"}
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """Raised in replay mode for a request that is not in the cassette."""
+
+
+def strip_secrets(url: str) -> str:
+    """Remove the API key from a request URL."""
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if name not in SECRET_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _strip_header(value: str) -> str:
+    """Remove the API key from a header value that is a URL."""
+    return strip_secrets(value) if value.lower().startswith(("http://", "https://")) else value
+
+
+def fingerprint(method: str, url: str, body: Optional[bytes]) -> str:
+    """Identify a request by method, key-less URL and body hash."""
+    digest = hashlib.sha256()
+    digest.update(f"{method.upper()} {strip_secrets(url)}\n".encode())
+    digest.update(body or b"")
+    return digest.hexdigest()
+
+
+class Cassette:
+    """
+    A file of recorded HTTP exchanges.
+
+    Example:
+        geospy = GeoSpy(cassette=Cassette("batch.cassette", "record"))
+        ...
+        geospy = GeoSpy(cassette=Cassette("batch.cassette", "replay", latency_scale=1.0))
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 0.0):
+        """
+        Args:
+            path: Cassette file (JSON lines); record mode appends to it
+            mode: "record" or "replay"
+            latency_scale: In replay mode, sleep this multiple of each recorded
+                response time (0 answers immediately, 1 reproduces the original timing)
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(CASSETTE_MODES)}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._entries: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette file not found: {self.path}")
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["fingerprint"], deque()).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response, elapsed: float) -> None:
+        """Append one exchange to the cassette file."""
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        content = response.content
+        try:
+            text, encoding = content.decode("utf-8"), "text"
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(content).decode("ascii"), "base64"
+        entry = {
+            "fingerprint": fingerprint(request.method, request.url, body),
+            "method": request.method,
+            "url": strip_secrets(request.url),
+            "request_bytes": len(body or b""),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {name: _strip_header(value) for name, value in response.headers.items()
+                        if name.lower() != "set-cookie"},
+            "body": text,
+            "encoding": encoding,
+            "elapsed": round(elapsed, 4),
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+            self.recorded += 1
+
+    def lookup(self, request: requests.PreparedRequest) -> Dict[str, Any]:
+        """
+        Return the recorded exchange for a request.
+
+        Raises:
+            CassetteMiss: If the request was never recorded
+        """
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        key = fingerprint(request.method, request.url, body)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for {request.method} {strip_secrets(request.url)}")
+            # Replay repeated requests in recorded order, then keep answering with the last one
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+            self.replayed += 1
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "path": self.path, "recorded": self.recorded,
+                "replayed": self.replayed, "misses": self.misses}
+
+
+class CassetteAdapter(BaseAdapter):
+    """Transport adapter recording through, or replaying instead of, another adapter."""
+
+    def __init__(self, cassette: Cassette, adapter: BaseAdapter):
+        """
+        Args:
+            cassette: Cassette to record to or replay from
+            adapter: Adapter that performs real requests in record mode
+        """
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        if self.cassette.mode == "record":
+            started = time.monotonic()
+            response = self.adapter.send(request, **kwargs)
+            self.cassette.record(request, response, time.monotonic() - started)
+            return response
+
+        entry = self.cassette.lookup(request)
+        if self.cassette.latency_scale > 0:
+            cancel.sleep(entry["elapsed"] * self.cassette.latency_scale)
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason")
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = (base64.b64decode(entry["body"]) if entry["encoding"] == "base64"
+                             else entry["body"].encode("utf-8"))
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        self.adapter.close()
@@ -0,0 +1,207 @@
+"""
+Circuit breaker for the Gemini endpoint.
+
+Shared by every thread of a GeoSpy client. While Gemini is healthy the
+circuit is closed and requests flow normally. When too many recent requests
+fail (5xx, 429, timeouts, connection errors) it opens: requests are refused
+at once (or wait up to max_wait for it to close) instead of each caller
+sitting through its own retry and timeout sequence. After open_seconds it
+goes half-open and lets a few probe requests through; if they succeed it
+closes again, if one fails it re-opens.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Admission:
+    """Ticket for one admitted request, handed back to CircuitBreaker.record()."""
+
+    __slots__ = ("probe", "generation")
+
+    def __init__(self, probe: bool, generation: int):
+        """
+        Args:
+            probe: True if the request was admitted as a half-open probe
+            generation: Circuit generation it was admitted in; outcomes of
+                requests admitted before the circuit last opened or closed are ignored
+        """
+        self.probe = probe
+        self.generation = generation
+
+
+class CircuitBreaker:
+    """
+    Thread-safe closed / open / half-open circuit breaker.
+
+    Every admitted request must report its outcome with record(), passing
+    the Admission ticket allow() returned for it.
+
+    Example:
+        breaker = CircuitBreaker()
+        admission = breaker.allow()
+        if admission:
+            ok = send()
+            breaker.record(admission, ok)
+    """
+
+    def __init__(self, failure_rate: float = 0.5, min_requests: int = 10, window: float = 60.0,
+                 consecutive_failures: int = 5, open_seconds: float = 30.0, probes: int = 2,
+                 max_wait: float = 0.0):
+        """
+        Args:
+            failure_rate: Open when at least this share of the requests in the window failed
+            min_requests: Requests needed in the window before failure_rate is applied
+            window: Seconds of request outcomes considered
+            consecutive_failures: Also open after this many failures in a row (0 disables)
+            open_seconds: Seconds the circuit stays open before probing
+            probes: Successful probe requests needed to close a half-open circuit
+            max_wait: Seconds a request waits for an open circuit before being refused
+        """
+        self.failure_rate = failure_rate
+        self.min_requests = max(1, min_requests)
+        self.window = window
+        self.consecutive_failures = consecutive_failures
+        self.open_seconds = open_seconds
+        self.probes = max(1, probes)
+        self.max_wait = max_wait
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures_in_window = 0
+        self._failure_streak = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._generation = 0
+        self._cond = threading.Condition()
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            _, failed = self._outcomes.popleft()
+            self._failures_in_window -= int(failed)
+
+    def _open(self, now: float, reason: str) -> None:
+        self.state = OPEN
+        self._generation += 1
+        self._opened_at = now
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.times_opened += 1
+        print(f"Gemini circuit breaker opened ({reason}); refusing requests for {self.open_seconds:g} seconds")
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._generation += 1
+        self._outcomes.clear()
+        self._failures_in_window = 0
+        self._failure_streak = 0
+        print("Gemini circuit breaker closed; requests resumed")
+        self._cond.notify_all()
+
+    def _try_admit(self, now: float) -> Optional[Admission]:
+        if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return Admission(False, self._generation)
+        if self.state == HALF_OPEN and self._probes_in_flight + self._probe_successes < self.probes:
+            self._probes_in_flight += 1
+            return Admission(True, self._generation)
+        return None
+
+    def allow(self, timeout: Optional[float] = None) -> Optional[Admission]:
+        """
+        Admit a request, waiting while the circuit is open.
+
+        Args:
+            timeout: Maximum seconds to wait (defaults to max_wait; 0 fails fast)
+
+        Returns:
+            An Admission if the request may be sent (its outcome must then be
+            recorded with it), None if it was refused
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                admission = self._try_admit(now)
+                if admission is not None:
+                    return admission
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.rejected += 1
+                    return None
+                # Wake up when the circuit closes or when it is due for a probe
+                until_probe = self._opened_at + self.open_seconds - now if self.state == OPEN else remaining
+                self._cond.wait(min(remaining, max(until_probe, 0.01)))
+
+    def record(self, admission: Admission, success: Optional[bool]) -> None:
+        """
+        Report the outcome of an admitted request.
+
+        Args:
+            admission: Ticket allow() returned for the request
+            success: True if Gemini answered, False for an overload, timeout or
+                connection failure, None if the request was abandoned (e.g. cancelled)
+        """
+        with self._cond:
+            now = time.monotonic()
+            if admission.generation != self._generation:
+                return  # Admitted before the circuit last opened or closed
+            probe = admission.probe
+            if probe:
+                self._probes_in_flight -= 1
+            if success is None:
+                return
+
+            if probe:
+                if not success:
+                    self._open(now, "probe request failed")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes:
+                    self._close()
+                return
+
+            self._trim(now)
+            self._outcomes.append((now, not success))
+            self._failures_in_window += int(not success)
+            self._failure_streak = 0 if success else self._failure_streak + 1
+            total = len(self._outcomes)
+            if self.consecutive_failures and self._failure_streak >= self.consecutive_failures:
+                self._open(now, f"{self._failure_streak} failures in a row")
+            elif total >= self.min_requests and self._failures_in_window / total >= self.failure_rate:
+                self._open(now, f"{self._failures_in_window} of the last {total} requests failed")
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets probe requests through (0 if not open)."""
+        with self._cond:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current state, recent failure rate and counters."""
+        with self._cond:
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+            self._trim(now)
+            total = len(self._outcomes)
+            return {
+                "state": self.state,
+                "recent_requests": total,
+                "recent_failure_rate": round(self._failures_in_window / total, 3) if total else 0.0,
+                "retry_after": round(max(0.0, self._opened_at + self.open_seconds - now), 1)
+                if self.state == OPEN else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
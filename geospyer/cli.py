@@ -1,7 +1,20 @@
 import argparse
 import json
 from geospyer import GeoSpy
+from geospyer.cascade import DEFAULT_TIERS, CascadePolicy
+from geospyer.cassette import Cassette
+from geospyer.circuit import CircuitBreaker
+from geospyer.exif import EXIF_MODES
+from geospyer.geospy import DEFAULT_MODEL
+from geospyer.export import WRITERS, infer_format, open_writer
+from geospyer.handles import HandleCache
+from geospyer.models import Location
+import os
 import sys
+import time
+
+# Uploaded image handles are shared between runs through this file (see --upload)
+DEFAULT_HANDLE_CACHE = os.path.join(os.path.expanduser("~"), ".geospyer_handles.json")
 
 
 def banner():
@@ -19,22 +32,718 @@ Uncover the location of photos using AI
     print(font)
 
 
+def print_results(results):
+    """Pretty-print a successful analysis result to the terminal."""
+    print("\n\033[92m===== Analysis Results =====\033[0m")
+    print(f"\033[96mInterpretation:\033[0m")
+    print(results.get("interpretation", "No interpretation available"))
+    
+    print("\n\033[96mPossible Locations:\033[0m")
+    for i, raw in enumerate(location for location in results.get("locations") or [] if isinstance(location, dict)):
+        location = Location.from_dict(raw)
+        # Show the model's own label; the normalized value would turn a missing one into "Medium"
+        confidence = raw.get("confidence") or "Unknown"
+        confidence_color = "\033[92m" if confidence == "High" else "\033[93m" if confidence == "Medium" else "\033[91m"
+        
+        print(f"\n{i+1}. {location.city or 'Unknown city'}, {location.state}, {location.country or 'Unknown country'}")
+        print(f"   Confidence: {confidence_color}{confidence}\033[0m")
+        if location.extra and "support" in location.extra:
+            print(f"   Agreement: {location.extra['support']} of {results.get('merged_from')} analyzed parts")
+        
+        if location.coordinates:
+            lat, lng = location.coordinates
+            print(f"   Coordinates: {lat}, {lng}")
+            print(f"   Google Maps: https://www.google.com/maps?q={lat},{lng}")
+        
+        print(f"   Explanation: {location.explanation or 'No explanation available'}")
+
+
+def cascade_models(args):
+    """Return the model tiers selected with --cascade, or None when not cascading."""
+    spec = getattr(args, "cascade", None)
+    if spec is None:
+        return None
+    models = [model.strip() for model in spec.split(",") if model.strip()]
+    return models or list(DEFAULT_TIERS)
+
+
+def make_geospy(args):
+    """Create the GeoSpy client configured on the command line."""
+    models = cascade_models(args)
+    return GeoSpy(
+        api_key=args.api_key,
+        exif_mode=args.exif,
+        model=args.model,
+        cascade=CascadePolicy(models) if models else None,
+        circuit_breaker=None if args.no_circuit_breaker else CircuitBreaker(),
+        handle_cache=HandleCache(args.handle_cache) if uses_uploads(args) else None,
+        cassette=make_cassette(args)
+    )
+
+
+def make_cassette(args):
+    """Return the Cassette selected with --record or --replay, or None."""
+    if getattr(args, "record", None):
+        return Cassette(args.record, "record")
+    if getattr(args, "replay", None):
+        return Cassette(args.replay, "replay", latency_scale=args.replay_latency or 0.0)
+    return None
+
+
+def print_cassette_stats(geospy):
+    """Print how many HTTP exchanges were recorded or replayed."""
+    cassette = geospy.cassette
+    if cassette is None:
+        return
+    if cassette.mode == "record":
+        print(f"Cassette: {cassette.recorded} responses recorded to {cassette.path}")
+    else:
+        print(f"Cassette: {cassette.replayed} responses replayed from {cassette.path}, {cassette.misses} requests not recorded")
+
+
+def uses_uploads(args):
+    """True when images are sent by Files API reference (--upload or --ask)."""
+    return bool(getattr(args, "upload", False) or getattr(args, "ask", None))
+
+
+def print_circuit_stats(geospy):
+    """Print the circuit breaker state if it opened during the run."""
+    breaker = geospy.circuit_breaker
+    if breaker is None or not breaker.times_opened:
+        return
+    stats = breaker.stats()
+    print(f"Circuit breaker: {stats['state']}, opened {stats['times_opened']} time(s), "
+          f"{geospy.stats['circuit_rejections']} requests refused while Gemini was failing")
+
+
+def print_cascade_stats(geospy):
+    """Print how many images each cascade tier answered."""
+    models = geospy.cascade.models
+    answered = ", ".join(f"{geospy.stats[f'cascade_tier_{tier}']} by {model}" for tier, model in enumerate(models))
+    print(f"Model cascade: answered {answered}; {geospy.stats['cascade_escalations']} escalations")
+
+
+def print_two_pass_stats(geospy):
+    """Print how many images the coarse pass resolved and what that saved."""
+    summary = geospy.two_pass_summary()
+    saved = summary["bytes_saved"]
+    latency = summary["latency_saved_seconds"]
+    if latency is None:
+        latency_text = "API time saved: n/a (no full-resolution pass to compare)"
+    else:
+        latency_text = f"API time {'saved' if latency >= 0 else 'added'}: ~{abs(latency):.1f} s"
+    print(f"Two-pass: {summary['coarse_accepted']} of {summary['images']} images resolved from the preview, "
+          f"{summary['fine_passes']} needed full resolution; "
+          f"upload {'saved' if saved >= 0 else 'added'}: {format_bytes(abs(saved))}; {latency_text}")
+
+
+def print_upload_stats(geospy):
+    """Print how many images were uploaded and how much re-uploading was avoided."""
+    print(f"Files API: {geospy.stats['uploads']} images uploaded ({format_bytes(geospy.stats['upload_bytes'])}), "
+          f"{format_bytes(geospy.stats['upload_bytes_saved'])} not re-sent thanks to cached handles")
+
+
+def analyze(geospy, image, args):
+    """Analyze one image using the mode selected on the command line."""
+    if args.tiles:
+        return geospy.locate_tiled(
+            image,
+            context_info=args.context,
+            location_guess=args.guess,
+            tile_size=args.tile_size,
+            overlap=args.tile_overlap,
+            max_in_flight=args.max_in_flight
+        )
+    if args.sequence:
+        return geospy.locate_sequence(
+            image,
+            context_info=args.context,
+            location_guess=args.guess,
+            max_frames=args.max_frames,
+            threshold=args.frame_threshold
+        )
+    if args.two_pass:
+        return geospy.locate_two_pass(
+            image,
+            context_info=args.context,
+            location_guess=args.guess,
+            coarse_dimension=args.coarse_dimension,
+            min_confidence=args.two_pass_confidence
+        )
+    if args.upload:
+        return geospy.locate_uploaded(
+            image,
+            context_info=args.context,
+            location_guess=args.guess
+        )
+    return geospy.locate(
+        image_path=image,
+        context_info=args.context,
+        location_guess=args.guess
+    )
+
+
+def positive_int(value):
+    """Argument type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def queue_file(spec):
+    """Argument type for --queue: an in-memory queue would vanish when the command exits."""
+    if spec.startswith("memory://"):
+        raise argparse.ArgumentTypeError("memory:// queues only exist inside one process; use an SQLite queue file")
+    return spec
+
+
+def iter_batch(batch_path):
+    """Yield image paths/URLs from a batch file (one per line, # comments allowed)."""
+    with open(batch_path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def report_result(i, image, results):
+    """Print a one-line summary of a batch result. Returns True on success."""
+    if "error" in results:
+        print(f"[{i}] \033[91m{image}: {results['error']}\033[0m")
+        return False
+    top = (results.get("locations") or [{}])[0]
+    print(f"[{i}] {image}: {top.get('city') or 'Unknown city'}, {top.get('country') or 'Unknown country'} ({top.get('confidence', 'Unknown')})")
+    return True
+
+
+def print_pipeline_stats(stats):
+    """Print per-stage queue depth and throughput counters."""
+    print(f"\n{'Stage':<12}{'Kind':<9}{'Workers':>8}{'Queue':>10}{'Max':>6}{'Done':>8}{'Errors':>8}{'Busy':>8}")
+    for stage in stats:
+        print(f"{stage['stage']:<12}{stage['kind']:<9}{stage['workers']:>8}"
+              f"{stage['queue_depth']:>5}/{stage['queue_capacity']:<4}{stage['max_queue_depth']:>6}"
+              f"{stage['processed']:>8}{stage['errors']:>8}{stage['utilization']:>8.0%}")
+
+
+def run_pipeline(geospy, args, writer):
+    """Process the batch with the staged pipeline. Returns (succeeded, failed)."""
+    from geospyer.pipeline import build_geolocation_pipeline
+    pipeline = build_geolocation_pipeline(
+        geospy,
+        writer=writer,
+        context_info=args.context,
+        location_guess=args.guess,
+        read_workers=args.read_workers,
+        preprocess_workers=args.preprocess_workers,
+        send_workers=args.send_workers,
+        queue_size=args.queue_size,
+        max_dimension=args.max_dimension
+    )
+    succeeded = failed = 0
+    last_stats = time.monotonic()
+    records = ({"source": image} for image in iter_batch(args.batch))
+    for i, record in enumerate(pipeline.run(records), start=1):
+        if report_result(i, record["source"], record["result"]):
+            succeeded += 1
+        else:
+            failed += 1
+        if args.stats and time.monotonic() - last_stats >= args.stats:
+            print_pipeline_stats(pipeline.stats())
+            last_stats = time.monotonic()
+    if args.stats:
+        print_pipeline_stats(pipeline.stats())
+    return succeeded, failed
+
+
+def run_batch(geospy, args):
+    """Analyze every image listed in the batch file, streaming results to the output file."""
+    fmt = args.format or (infer_format(args.output) if args.output else None)
+    writer = open_writer(args.output, fmt) if args.output else None
+    succeeded = failed = 0
+    
+    try:
+        if args.pipeline:
+            succeeded, failed = run_pipeline(geospy, args, writer)
+        else:
+            for i, image in enumerate(iter_batch(args.batch), start=1):
+                results = analyze(geospy, image, args)
+                if report_result(i, image, results):
+                    succeeded += 1
+                else:
+                    failed += 1
+                if writer:
+                    writer.write(image, results)
+    finally:
+        if writer:
+            writer.close()
+    
+    print(f"\nBatch complete: {succeeded} succeeded, {failed} failed")
+    if geospy.exif_mode != "ignore":
+        print(f"EXIF metadata: {geospy.stats['exif_calls_saved']} API calls saved, {geospy.stats['exif_context_added']} images enriched with context")
+    if geospy.cascade is not None:
+        print_cascade_stats(geospy)
+    if args.two_pass and not args.pipeline:
+        print_two_pass_stats(geospy)
+    if args.upload and not args.pipeline:
+        print_upload_stats(geospy)
+    print_circuit_stats(geospy)
+    print_cassette_stats(geospy)
+    if writer:
+        print(f"Results saved to {args.output} ({writer.rows_written} rows)")
+
+
+def cmd_serve(args):
+    """Run the long-lived HTTP analysis service."""
+    from geospyer.server import serve
+    serve(
+        host=args.host,
+        port=args.port,
+        api_key=getattr(args, "api_key", None),
+        workers=args.workers,
+        queue_size=args.queue_size,
+        requests_per_minute=args.rpm,
+        cache_size=args.cache_size,
+        cache_ttl=args.cache_ttl,
+        sync_timeout=args.sync_timeout,
+        allow_local_paths=args.allow_local_paths,
+        model=getattr(args, "model", DEFAULT_MODEL),
+        cascade_models=cascade_models(args),
+        circuit_breaker=not getattr(args, "no_circuit_breaker", False)
+    )
+
+
+def cmd_enqueue(args):
+    """Add images to a durable job queue."""
+    from geospyer.jobqueue import open_queue
+    if not args.image and not args.batch:
+        print("Please provide an image using --image or a list of images using --batch.")
+        sys.exit(1)
+    images = iter_batch(args.batch) if args.batch else [args.image]
+    backend = open_queue(args.queue, journal_mode=args.journal_mode)
+    try:
+        count = backend.enqueue(images, args.context, args.guess, max_attempts=args.max_attempts)
+        print(f"Enqueued {count} images into {args.queue}")
+        print(f"Queue status: {backend.stats()}")
+    finally:
+        backend.close()
+
+
+def cmd_worker(args):
+    """Run worker processes that lease and analyze jobs from a queue."""
+    from geospyer.jobqueue import run_workers
+    print(f"Starting {args.processes} worker process(es) x {args.threads} thread(s) on {args.queue}")
+    run_workers(
+        args.queue,
+        processes=args.processes,
+        threads=args.threads,
+        api_key=getattr(args, "api_key", None),
+        visibility_timeout=args.visibility_timeout,
+        poll_interval=args.poll_interval,
+        retry_delay=args.retry_delay,
+        exit_when_empty=args.exit_when_empty,
+        journal_mode=args.journal_mode,
+        exif_mode=args.exif,
+        model=getattr(args, "model", DEFAULT_MODEL),
+        cascade_models=cascade_models(args),
+        circuit_breaker=not getattr(args, "no_circuit_breaker", False)
+    )
+
+
+def cmd_queue_status(args):
+    """Show job counts for a queue and optionally export its results."""
+    from geospyer.jobqueue import open_queue
+    backend = open_queue(args.queue, journal_mode=args.journal_mode)
+    try:
+        stats = backend.stats()
+        print(f"Queue: {args.queue}")
+        for status, count in stats.items():
+            print(f"  {status:<8} {count}")
+        if args.export:
+            with open_writer(args.export, args.format) as writer:
+                for image, result in backend.iter_results():
+                    writer.write(image, result)
+            print(f"\nExported {writer.results_written} results to {args.export} ({writer.rows_written} rows)")
+    finally:
+        backend.close()
+
+
+def format_bytes(size):
+    """Format a byte count as a human readable string."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+
+
+def cmd_plan(args):
+    """Estimate bytes, tokens and duration for a batch without calling the API."""
+    from geospyer.planner import plan_batch
+    inputs = list(args.inputs)
+    if args.batch:
+        inputs.extend(iter_batch(args.batch))
+    if not inputs:
+        print("Please provide images, directories or a --batch file to plan.")
+        sys.exit(1)
+    
+    try:
+        report = plan_batch(
+            inputs,
+            context_info=args.context,
+            location_guess=args.guess,
+            concurrency=args.concurrency,
+            requests_per_minute=args.rpm,
+            avg_latency=args.latency,
+            output_tokens=args.output_tokens,
+            probe_urls=args.probe_urls,
+            max_dimension=args.max_dimension
+        )
+    except ValueError as e:
+        print(f"\033[91mError: {str(e)}\033[0m")
+        sys.exit(1)
+    
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    
+    hours, remainder = divmod(int(report["estimated_seconds"]), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    print("\033[92m===== Batch Plan =====\033[0m")
+    print(f"Images:           {report['images']} ({report['unreadable']} unreadable, {report['remote_unsized']} remote without size, {report['animated']} animated)")
+    print(f"API requests:     {report['requests']}")
+    print(f"Image bytes:      {format_bytes(report['raw_bytes'])} (after preprocessing)")
+    print(f"Upload bytes:     {format_bytes(report['upload_bytes'])} (base64 + request JSON)")
+    print(f"Input tokens:     {report['input_tokens']:,} ({report['prompt_tokens_per_request']:,} prompt tokens per request)")
+    print(f"Output tokens:    {report['output_tokens']:,}")
+    print(f"Throughput:       {report['throughput_per_minute']} requests/min at concurrency {report['concurrency']}")
+    print(f"Estimated time:   {hours}h {minutes:02d}m {seconds:02d}s")
+    for error in report["errors"]:
+        print(f"\033[91m  Unreadable: {error['source']}: {error['error']}\033[0m")
+
+
+def cmd_bench(args):
+    """Load-test GeoSpy against a stand-in server or a configured endpoint."""
+    from contextlib import nullcontext
+    from geospyer.bench import StubServer, measure_models, parse_sizes, run_bench, synthetic_corpus
+    from geospyer.ratelimit import RateLimiter
+    
+    if args.models:
+        report = measure_models(results=args.models)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        if args.json:
+            print(json.dumps(report, indent=2))
+            return
+        print("\033[92m===== Result Models =====\033[0m")
+        print(f"Results:          {report['results']} x {report['locations_per_result']} locations")
+        for name in report["memory_mb"]:
+            print(f"  {name:<14}  {report['memory_mb'][name]:>8.1f} MB, sum of latitudes in {report['sum_latitudes_ms'][name]:.2f} ms")
+        return
+    
+    try:
+        sizes = parse_sizes(args.sizes)
+    except ValueError as e:
+        print(f"\033[91mError: {str(e)}\033[0m")
+        sys.exit(1)
+    corpus = synthetic_corpus(sizes, per_size=args.per_size)
+    
+    # Without --endpoint a local stand-in answers, so no quota is ever used by accident
+    stub = None if args.endpoint else StubServer(latency=args.stub_latency, jitter=args.stub_jitter,
+                                                 error_rate=args.stub_error_rate)
+    with stub if stub is not None else nullcontext():
+        models = cascade_models(args)
+        geospy = GeoSpy(
+            api_key=getattr(args, "api_key", None) or ("bench" if stub is not None else None),
+            pool_size=args.max_in_flight if args.rate else args.concurrency,
+            rate_limiter=RateLimiter(args.rpm) if args.rpm else None,
+            model=getattr(args, "model", DEFAULT_MODEL),
+            cascade=CascadePolicy(models) if models else None,
+            circuit_breaker=None if getattr(args, "no_circuit_breaker", False) else CircuitBreaker(),
+            api_base=args.endpoint or stub.api_base
+        )
+        load = f"{args.rate:g} requests/s" if args.rate else f"concurrency {args.concurrency}"
+        if not args.json:
+            print(f"Benchmarking {args.requests} requests at {load} against {geospy.api_base} "
+                  f"({len(corpus)} images, {format_bytes(sum(len(data) for _, data in corpus))})...")
+        report = run_bench(geospy, corpus, requests=args.requests, concurrency=args.concurrency,
+                           rate=args.rate, max_in_flight=args.max_in_flight, warmup=args.warmup)
+    if stub is not None:
+        report["stub"] = {"latency": args.stub_latency, "jitter": args.stub_jitter, "error_rate": args.stub_error_rate}
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    
+    def fmt(value):
+        return f"{value * 1000:.0f} ms" if value is not None else "n/a"
+    
+    latency = report["latency_seconds"]
+    rss = report["client_peak_rss_mb"]
+    print("\033[92m===== Benchmark =====\033[0m")
+    print(f"Requests:         {report['succeeded']} succeeded, {report['failed']} failed in {report['duration_seconds']:.1f} s")
+    print(f"Throughput:       {report['throughput_per_second']} requests/s")
+    print(f"Latency:          p50 {fmt(latency['p50'])}, p95 {fmt(latency['p95'])}, p99 {fmt(latency['p99'])}, max {fmt(latency['max'])}")
+    for label, summary in report["latency_by_size"].items():
+        print(f"  {label:<14}  p50 {fmt(summary['p50'])}, p95 {fmt(summary['p95'])}, p99 {fmt(summary['p99'])} ({summary['count']} requests)")
+    print(f"API requests:     {report['api_requests']} ({report['retries']} retries, {report['circuit_rejections']} refused by the circuit breaker)")
+    print(f"Client CPU:       {report['client_cpu_seconds']:.2f} s ({report['client_cpu_percent']}% of one core)")
+    print(f"Client peak RSS:  {f'{rss:.0f} MB' if rss is not None else 'n/a'}")
+    for error, count in report["errors"].items():
+        print(f"\033[91m  {count} x {error}\033[0m")
+    if args.output:
+        print(f"Report saved to {args.output}")
+
+
+def cmd_eval(args):
+    """Measure accuracy, latency and tokens on a manifest of images with known coordinates."""
+    from geospyer.evaluation import load_manifest, run_eval, score
+    from geospyer.merge import haversine_km
+    from geospyer.ratelimit import RateLimiter
+    
+    try:
+        items = load_manifest(args.manifest)
+        thresholds = [float(value) for value in args.thresholds.split(",")]
+    except (OSError, ValueError) as e:
+        print(f"\033[91mError: {str(e)}\033[0m")
+        sys.exit(1)
+    results_path = args.results or f"{os.path.splitext(args.manifest)[0]}.results.jsonl"
+    
+    models = cascade_models(args)
+    geospy = GeoSpy(
+        api_key=getattr(args, "api_key", None),
+        pool_size=args.concurrency,
+        rate_limiter=RateLimiter(args.rpm) if args.rpm else None,
+        exif_mode=args.exif,
+        model=getattr(args, "model", DEFAULT_MODEL),
+        cascade=CascadePolicy(models) if models else None,
+        circuit_breaker=None if getattr(args, "no_circuit_breaker", False) else CircuitBreaker()
+    )
+    
+    def analyze_item(item):
+        context = "\n\n".join(part for part in (args.context, item["context"]) if part) or None
+        if args.two_pass:
+            return geospy.locate_two_pass(item["image"], context_info=context,
+                                          coarse_dimension=args.coarse_dimension,
+                                          min_confidence=args.two_pass_confidence)
+        return geospy.locate(image_path=item["image"], context_info=context)
+    
+    def progress(done, total, record):
+        if args.json:
+            return
+        if record["error"]:
+            print(f"\033[91m[{done}/{total}] {record['id']}: {record['error']}\033[0m")
+        elif record["predictions"] and record["predictions"][0]:
+            lat, lon = record["predictions"][0]
+            error_km = haversine_km(record["latitude"], record["longitude"], lat, lon)
+            print(f"[{done}/{total}] {record['id']}: {error_km:,.1f} km off ({record['seconds']:.1f} s)")
+        else:
+            print(f"[{done}/{total}] {record['id']}: no coordinates returned")
+    
+    # Answers from the results file are only reused if they were made with the same settings
+    config = {
+        "model": getattr(args, "model", DEFAULT_MODEL),
+        "cascade": models,
+        "exif": args.exif,
+        "context": args.context,
+        "two_pass": args.two_pass,
+        "coarse_dimension": args.coarse_dimension if args.two_pass else None,
+        "two_pass_confidence": args.two_pass_confidence if args.two_pass else None,
+        "top_k": args.top_k,
+    }
+    
+    if not args.json:
+        print(f"Evaluating {len(items)} images from {args.manifest} (results in {results_path})...")
+    records = run_eval(items, analyze_item, results_path, concurrency=args.concurrency,
+                       top_k=args.top_k, progress=progress, config=config)
+    report = score([records[item["id"]] for item in items if item["id"] in records],
+                   top_k=args.top_k, thresholds_km=thresholds)
+    report["model"] = getattr(args, "model", DEFAULT_MODEL) if models is None else ",".join(models)
+    report["two_pass"] = args.two_pass
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    
+    latency = report["latency_seconds"]
+    print("\033[92m===== Evaluation =====\033[0m")
+    print(f"Images:           {report['images']} ({report['failed']} failed, {report['without_coordinates']} without coordinates)")
+    print(f"{'Threshold':<18}{'Top-1':>8}{f'Top-{args.top_k}':>8}")
+    for threshold in report["top1_accuracy"]:
+        top1, topk = report["top1_accuracy"][threshold], report["topk_accuracy"][threshold]
+        print(f"  {threshold:<16}{top1:>8.1%}{topk:>8.1%}" if top1 is not None else f"  {threshold:<16}{'n/a':>8}{'n/a':>8}")
+    median = report["top1_error"]["median_km"]
+    print(f"Median error:     {f'{median:,.1f} km' if median is not None else 'n/a'} (top-1)")
+    if latency["count"]:
+        print(f"Latency:          p50 {latency['p50']:.2f} s, p95 {latency['p95']:.2f} s, p99 {latency['p99']:.2f} s")
+    if report["prompt_tokens"]["mean"] is not None:
+        print(f"Tokens per image: {report['prompt_tokens']['mean']:,.0f} prompt, {report['output_tokens']['mean']:,.0f} output "
+              f"({report['prompt_tokens']['total'] + report['output_tokens']['total']:,} total)")
+    if args.output:
+        print(f"Report saved to {args.output}")
+
+
 def main():
     banner()
     parser = argparse.ArgumentParser(
         prog="geospyer",
         description="GeoSpy - AI powered geolocation tool"
     )
+    
+    # Options shared by subcommands; SUPPRESS keeps a top-level --api-key from being overwritten
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--api-key", type=str, default=argparse.SUPPRESS, help="Custom Gemini API key")
+    common.add_argument("--model", type=str, default=argparse.SUPPRESS, help=f"Gemini model to use (default: {DEFAULT_MODEL})")
+    common.add_argument("--cascade", type=str, nargs="?", const="", default=argparse.SUPPRESS, metavar="MODELS",
+                        help=f"Try comma-separated models cheapest first, escalating low-confidence answers (default: {','.join(DEFAULT_TIERS)})")
+    common.add_argument("--no-circuit-breaker", action="store_true", default=argparse.SUPPRESS,
+                        help="Keep retrying every request while Gemini is failing instead of pausing requests")
+    
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    
+    serve_parser = subparsers.add_parser("serve", parents=[common], help="Run the HTTP analysis service")
+    serve_parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    serve_parser.add_argument("--workers", type=int, default=4, help="Number of concurrent analysis workers (default: 4)")
+    serve_parser.add_argument("--queue-size", type=int, default=64, help="Maximum queued jobs before returning 429 (default: 64)")
+    serve_parser.add_argument("--rpm", type=float, help="Maximum Gemini requests per minute across all workers")
+    serve_parser.add_argument("--cache-size", type=int, default=1024, help="Maximum cached results, 0 to disable (default: 1024)")
+    serve_parser.add_argument("--cache-ttl", type=float, default=3600, help="Seconds cached results stay valid (default: 3600)")
+    serve_parser.add_argument("--sync-timeout", type=float, default=120, help="Seconds POST /locate waits before returning a job id (default: 120)")
+    serve_parser.add_argument("--allow-local-paths", action="store_true", help="Allow clients to analyze files on the server's disk")
+    serve_parser.set_defaults(func=cmd_serve)
+    
+    # Options shared by the job queue commands
+    queue_common = argparse.ArgumentParser(add_help=False)
+    queue_common.add_argument("--queue", type=queue_file, required=True, help="Queue file path (SQLite)")
+    queue_common.add_argument("--journal-mode", type=str, default="WAL", help="SQLite journal mode; use DELETE on network filesystems (default: WAL)")
+    
+    enqueue_parser = subparsers.add_parser("enqueue", parents=[queue_common], help="Add images to a durable job queue")
+    enqueue_parser.add_argument("--image", type=str, help="Image path or URL to enqueue")
+    enqueue_parser.add_argument("--batch", type=str, help="Text file listing image paths or URLs, one per line")
+    enqueue_parser.add_argument("--context", type=str, help="Additional context information applied to every image")
+    enqueue_parser.add_argument("--guess", type=str, help="Location guess applied to every image")
+    enqueue_parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per job before it is marked failed (default: 3)")
+    enqueue_parser.set_defaults(func=cmd_enqueue)
+    
+    worker_parser = subparsers.add_parser("worker", parents=[common, queue_common], help="Process jobs from a queue")
+    worker_parser.add_argument("--processes", type=int, default=1, help="Number of worker processes (default: 1)")
+    worker_parser.add_argument("--threads", type=int, default=1, help="Worker threads per process (default: 1)")
+    worker_parser.add_argument("--visibility-timeout", type=float, default=300, help="Seconds a leased job is hidden from other workers (default: 300)")
+    worker_parser.add_argument("--poll-interval", type=float, default=2, help="Seconds to wait when the queue is empty (default: 2)")
+    worker_parser.add_argument("--retry-delay", type=float, default=30, help="Base delay before retrying a failed job, doubled per attempt (default: 30)")
+    worker_parser.add_argument("--exif", type=str, choices=EXIF_MODES, default="ignore", help="Use embedded EXIF metadata: ignore, context or skip (default: ignore)")
+    worker_parser.add_argument("--exit-when-empty", action="store_true", help="Stop once no queued or leased jobs remain")
+    worker_parser.set_defaults(func=cmd_worker)
+    
+    status_parser = subparsers.add_parser("queue-status", parents=[queue_common], help="Show queue progress and export results")
+    status_parser.add_argument("--export", type=str, help="Export finished results to this file")
+    status_parser.add_argument("--format", type=str, choices=sorted(WRITERS), help="Export format (default: inferred from extension)")
+    status_parser.set_defaults(func=cmd_queue_status)
+    
+    plan_parser = subparsers.add_parser("plan", help="Estimate bytes, tokens and time for a batch without calling the API")
+    plan_parser.add_argument("inputs", nargs="*", help="Image files, directories or URLs")
+    plan_parser.add_argument("--batch", type=str, help="Text file listing image paths or URLs, one per line")
+    plan_parser.add_argument("--context", type=str, help="Additional context that will be sent with every image")
+    plan_parser.add_argument("--guess", type=str, help="Location guess that will be sent with every image")
+    plan_parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once (default: 4)")
+    plan_parser.add_argument("--rpm", type=float, help="API quota in requests per minute")
+    plan_parser.add_argument("--latency", type=float, default=8.0, help="Expected seconds per API call (default: 8)")
+    plan_parser.add_argument("--output-tokens", type=int, default=700, help="Expected output tokens per response (default: 700)")
+    plan_parser.add_argument("--max-dimension", type=int, help="Longest side images will be downscaled to by the pipeline")
+    plan_parser.add_argument("--probe-urls", action="store_true", help="Send HEAD requests to size remote images")
+    plan_parser.add_argument("--json", action="store_true", help="Print the plan as JSON")
+    plan_parser.set_defaults(func=cmd_plan)
+    
+    bench_parser = subparsers.add_parser("bench", parents=[common], help="Measure throughput and latency against a stand-in server or endpoint")
+    bench_parser.add_argument("--requests", type=int, default=100, help="Measured requests (default: 100)")
+    bench_parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once, closed loop (default: 4)")
+    bench_parser.add_argument("--rate", type=float, help="Open loop: start this many requests per second regardless of completions")
+    bench_parser.add_argument("--max-in-flight", type=int, default=256, help="Open loop: cap on concurrent requests (default: 256)")
+    bench_parser.add_argument("--warmup", type=int, default=0, help="Requests sent before measuring (default: 0)")
+    bench_parser.add_argument("--rpm", type=float, help="Client-side rate limit in requests per minute")
+    bench_parser.add_argument("--sizes", type=str, default="640x480,1600x1200,4000x3000", help="Synthetic image sizes (default: 640x480,1600x1200,4000x3000)")
+    bench_parser.add_argument("--per-size", type=int, default=4, help="Distinct synthetic images per size (default: 4)")
+    bench_parser.add_argument("--endpoint", type=str, help="Gemini models base URL to benchmark (default: start a local stand-in server)")
+    bench_parser.add_argument("--stub-latency", type=float, default=1.0, help="Stand-in server mean response time in seconds (default: 1.0)")
+    bench_parser.add_argument("--stub-jitter", type=float, default=0.25, help="Stand-in response time varies by this fraction (default: 0.25)")
+    bench_parser.add_argument("--stub-error-rate", type=float, default=0.0, help="Share of stand-in responses that are 503 (default: 0)")
+    bench_parser.add_argument("--models", type=positive_int, metavar="RESULTS", help="Instead of a load test, compare memory and access time of this many results as dicts, Location models and a LocationBatch")
+    bench_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    bench_parser.add_argument("--output", type=str, help="Also save the JSON report to this file")
+    bench_parser.set_defaults(func=cmd_bench)
+    
+    eval_parser = subparsers.add_parser("eval", parents=[common], help="Measure accuracy on images with known coordinates")
+    eval_parser.add_argument("manifest", help="CSV or JSON-lines file with image, latitude and longitude (optional id, context)")
+    eval_parser.add_argument("--results", type=str, help="Per-image results file, resumed if it exists (default: <manifest>.results.jsonl)")
+    eval_parser.add_argument("--concurrency", type=int, default=4, help="Images analyzed at once (default: 4)")
+    eval_parser.add_argument("--rpm", type=float, help="Maximum Gemini requests per minute")
+    eval_parser.add_argument("--top-k", type=int, default=5, help="Predictions considered for top-k accuracy (default: 5)")
+    eval_parser.add_argument("--thresholds", type=str, default="1,25,200,750,2500", help="Comma-separated accuracy thresholds in km (default: 1,25,200,750,2500)")
+    eval_parser.add_argument("--context", type=str, help="Additional context sent with every image")
+    eval_parser.add_argument("--exif", type=str, choices=EXIF_MODES, default="ignore", help="Use embedded EXIF metadata: ignore, context or skip (default: ignore)")
+    eval_parser.add_argument("--two-pass", action="store_true", help="Evaluate the coarse-to-fine two-pass mode")
+    eval_parser.add_argument("--coarse-dimension", type=int, default=512, help="Longest side of the two-pass preview in pixels (default: 512)")
+    eval_parser.add_argument("--two-pass-confidence", type=str, choices=["Low", "Medium", "High"], default="Medium", help="Lowest preview confidence accepted without a full-resolution pass (default: Medium)")
+    eval_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    eval_parser.add_argument("--output", type=str, help="Also save the JSON report to this file")
+    eval_parser.set_defaults(func=cmd_eval)
+    
     parser.add_argument("--image", type=str, help="Image path or URL to analyze")
+    parser.add_argument("--batch", type=str, help="Text file listing image paths or URLs to analyze, one per line")
     parser.add_argument("--context", type=str, help="Additional context information about the image")
     parser.add_argument("--guess", type=str, help="Your guess of where the image might have been taken")
-    parser.add_argument("--output", type=str, help="Output file path to save the results (JSON format)")
+    parser.add_argument("--output", type=str, help="Output file path to save the results (format inferred from extension)")
+    parser.add_argument("--format", type=str, choices=sorted(WRITERS), help="Output format (default: inferred from --output extension, JSON otherwise)")
     parser.add_argument("--api-key", type=str, help="Custom Gemini API key")
+    parser.add_argument("--exif", type=str, choices=EXIF_MODES, default="ignore", help="Use embedded EXIF metadata: ignore it, add it as context, or skip the API call when GPS is present (default: ignore)")
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL, help=f"Gemini model to use (default: {DEFAULT_MODEL})")
+    parser.add_argument("--cascade", type=str, nargs="?", const="", metavar="MODELS", help=f"Try comma-separated models cheapest first, escalating only low-confidence, conflicting or unparsable answers (default: {','.join(DEFAULT_TIERS)})")
+    parser.add_argument("--sequence", action="store_true", help="Treat the image as an animated GIF/WebP or a directory of frames and analyze representative frames")
+    parser.add_argument("--max-frames", type=positive_int, default=6, help="Maximum frames analyzed in sequence mode (default: 6)")
+    parser.add_argument("--frame-threshold", type=float, default=0.08, help="Minimum frame difference (0-1) to count as a new scene (default: 0.08)")
+    parser.add_argument("--tiles", action="store_true", help="Split large images and panoramas into overlapping tiles analyzed concurrently")
+    parser.add_argument("--tile-size", type=int, default=1024, help="Tile side length in pixels (default: 1024)")
+    parser.add_argument("--tile-overlap", type=float, default=0.2, help="Fraction of each tile shared with its neighbours (default: 0.2)")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Maximum tile requests running at once (default: 4)")
+    parser.add_argument("--no-circuit-breaker", action="store_true", help="Keep retrying every request while Gemini is failing instead of pausing requests")
+    parser.add_argument("--two-pass", action="store_true", help="Send a downscaled preview first and the full-resolution image only when the preview answer is not confident enough (not with --pipeline)")
+    parser.add_argument("--coarse-dimension", type=int, default=512, help="Longest side of the two-pass preview in pixels (default: 512)")
+    parser.add_argument("--two-pass-confidence", type=str, choices=["Low", "Medium", "High"], default="Medium", help="Lowest preview confidence accepted without a full-resolution pass (default: Medium)")
+    parser.add_argument("--upload", action="store_true", help="Upload each image once to the Gemini Files API and send it by reference; re-analyses within 48 hours send only text (not with --pipeline)")
+    parser.add_argument("--handle-cache", type=str, default=DEFAULT_HANDLE_CACHE, help=f"File remembering uploaded images between runs (default: {DEFAULT_HANDLE_CACHE})")
+    parser.add_argument("--ask", type=str, action="append", metavar="QUESTION", help="Follow-up question about --image, answered after the analysis without re-sending the image (repeatable; implies --upload)")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument("--record", type=str, metavar="CASSETTE", help="Also save every HTTP request's response, status and timing to this cassette file (API key omitted)")
+    cassette_group.add_argument("--replay", type=str, metavar="CASSETTE", help="Answer requests from a recorded cassette file instead of the network")
+    parser.add_argument("--replay-latency", type=float, nargs="?", const=1.0, metavar="SCALE", help="With --replay, wait SCALE times each recorded response time (default when given: 1.0)")
+    parser.add_argument("--pipeline", action="store_true", help="Process --batch with the staged pipeline (overlaps reading, preprocessing and API calls)")
+    parser.add_argument("--read-workers", type=int, default=4, help="Pipeline threads reading files and URLs (default: 4)")
+    parser.add_argument("--preprocess-workers", type=int, default=2, help="Pipeline processes decoding, resizing and hashing images (default: 2)")
+    parser.add_argument("--send-workers", type=int, default=4, help="Pipeline threads with API requests in flight (default: 4)")
+    parser.add_argument("--queue-size", type=int, default=16, help="Capacity of each pipeline stage queue (default: 16)")
+    parser.add_argument("--max-dimension", type=int, help="Downscale images so the longest side is at most this many pixels (pipeline only)")
+    parser.add_argument("--stats", type=float, nargs="?", const=10.0, help="Print pipeline stage statistics every N seconds (default: 10) and at the end")
     args = parser.parse_args()
 
-    if args.image:
+    if args.command:
+        args.func(args)
+    elif args.batch:
+        geospy = make_geospy(args)
+        try:
+            run_batch(geospy, args)
+        except Exception as e:
+            print(f"\033[91mError: An unexpected error occurred: {str(e)}\033[0m")
+            sys.exit(1)
+    elif args.image:
         # Initialize GeoSpy with optional API key
-        geospy = GeoSpy(api_key=args.api_key)
+        geospy = make_geospy(args)
         
         # Get results
         print(f"Analyzing image: {args.image}")
@@ -43,11 +752,13 @@ def main():
         print("This may take a few moments...")
         
         try:
-            results = geospy.locate(
-                image_path=args.image,
-                context_info=args.context,
-                location_guess=args.guess
-            )
+            conversation = None
+            if args.ask:
+                # Keep the analysis in the conversation so follow-ups can refer to it
+                conversation = geospy.conversation(args.image)
+                results = conversation.locate(context_info=args.context, location_guess=args.guess)
+            else:
+                results = analyze(geospy, args.image, args)
             
             # Display the results
             if "error" in results:
@@ -58,37 +769,48 @@ def main():
                     print(f"Exception: {results['exception']}")
                 sys.exit(1)
             
-            print("\n\033[92m===== Analysis Results =====\033[0m")
-            print(f"\033[96mInterpretation:\033[0m")
-            print(results.get("interpretation", "No interpretation available"))
+            if results.get("source") == "exif":
+                print("\nUsing GPS coordinates embedded in the image (EXIF); no API call was made.")
+            if "cascade" in results:
+                cascade = results["cascade"]
+                escalated = "".join(f"; {step['model']} escalated ({step['reason'].replace('_', ' ')})"
+                                    for step in cascade["escalations"])
+                print(f"\nAnswered by {cascade['model']} (tier {cascade['tier'] + 1}){escalated}")
+            if "two_pass" in results:
+                two_pass = results["two_pass"]
+                if two_pass["passes"] == 1:
+                    print(f"\nResolved from a {args.coarse_dimension}px preview: {format_bytes(two_pass['bytes_saved'])} upload saved")
+                else:
+                    print(f"\nPreview was inconclusive ({two_pass['reason'].replace('_', ' ')}); analyzed at full resolution")
+            print_results(results)
             
-            print("\n\033[96mPossible Locations:\033[0m")
-            for i, location in enumerate(results.get("locations", [])):
-                confidence = location.get("confidence", "Unknown")
-                confidence_color = "\033[92m" if confidence == "High" else "\033[93m" if confidence == "Medium" else "\033[91m"
-                
-                print(f"\n{i+1}. {location.get('city', 'Unknown city')}, {location.get('state', '')}, {location.get('country', 'Unknown country')}")
-                print(f"   Confidence: {confidence_color}{confidence}\033[0m")
-                
-                if "coordinates" in location and location["coordinates"]:
-                    coords = location["coordinates"]
-                    lat = coords.get("latitude", 0)
-                    lng = coords.get("longitude", 0)
-                    print(f"   Coordinates: {lat}, {lng}")
-                    print(f"   Google Maps: https://www.google.com/maps?q={lat},{lng}")
-                
-                print(f"   Explanation: {location.get('explanation', 'No explanation available')}")
+            if conversation is not None:
+                for question in args.ask:
+                    print(f"\n\033[1mQ: {question}\033[0m")
+                    answer = conversation.ask(question)
+                    print(f"A: {answer['answer']}" if "answer" in answer else f"\033[91mError: {answer['error']}\033[0m")
+            if uses_uploads(args):
+                print()
+                print_upload_stats(geospy)
+            if geospy.cassette is not None:
+                print()
+                print_cassette_stats(geospy)
             
             # Save to file if requested
             if args.output:
-                with open(args.output, 'w') as f:
-                    json.dump(results, f, indent=2)
+                fmt = args.format or infer_format(args.output)
+                if fmt == "json":
+                    with open(args.output, 'w') as f:
+                        json.dump(results, f, indent=2)
+                else:
+                    with open_writer(args.output, fmt) as writer:
+                        writer.write(args.image, results)
                 print(f"\nResults saved to {args.output}")
         except Exception as e:
             print(f"\033[91mError: An unexpected error occurred: {str(e)}\033[0m")
             sys.exit(1)
     else:
-        print("Please provide an image path or URL using the --image argument.")
+        print("Please provide an image path or URL using the --image argument, or a list of images using --batch.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+"""
+Accuracy evaluation for GeoSpy.
+
+Runs a manifest of images with known coordinates through an analysis
+function concurrently and scores the predictions by great-circle distance,
+so prompt, model and preprocessing changes can be compared on accuracy,
+latency and tokens with data.
+
+Every finished image is appended to a JSON-lines results file as soon as it
+completes; re-running with the same file skips images already answered (and
+retries those that failed), so long runs can be interrupted and resumed. Each
+record carries the run configuration (model, prompt options, ...), and records
+made with a different configuration are evaluated again rather than reused.
+Scoring is vectorized with NumPy over all images at once.
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .bench import latency_summary
+from .merge import location_coordinates
+from .models import haversine_km_array
+
+# Accuracy is reported at the usual geolocation scales: street, city, region, country, continent
+DEFAULT_THRESHOLDS_KM = (1, 25, 200, 750, 2500)
+
+LATITUDE_COLUMNS = ("latitude", "lat")
+LONGITUDE_COLUMNS = ("longitude", "lon", "lng")
+
+
+def _column(row: Dict[str, Any], names: Sequence[str]) -> Any:
+    for name in names:
+        if row.get(name) not in (None, ""):
+            return row[name]
+    return None
+
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    """
+    Read a labeled manifest.
+
+    CSV files need an "image" (or "path") column and latitude/longitude
+    columns ("latitude"/"lat", "longitude"/"lon"/"lng"); JSON-lines files use
+    the same keys. Optional columns: "id" (defaults to the image) and
+    "context" (sent as additional context).
+
+    Returns:
+        List of {"id", "image", "latitude", "longitude", "context"} dictionaries
+
+    Raises:
+        ValueError: If a row lacks an image or valid coordinates
+    """
+    with open(path, newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    items = []
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        image = _column(row, ("image", "path"))
+        latitude, longitude = _column(row, LATITUDE_COLUMNS), _column(row, LONGITUDE_COLUMNS)
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            raise ValueError(f"{path}, row {number}: missing or invalid latitude/longitude")
+        if not image:
+            raise ValueError(f"{path}, row {number}: missing image")
+        item_id = str(row.get("id") or image)
+        if item_id in seen:
+            raise ValueError(f"{path}, row {number}: duplicate id {item_id}")
+        seen.add(item_id)
+        items.append({"id": item_id, "image": image, "latitude": latitude, "longitude": longitude,
+                      "context": row.get("context") or None})
+    return items
+
+
+def read_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """Load a results file; for images evaluated more than once the latest record wins."""
+    records: Dict[str, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return records
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by an interrupted run
+                records[record["id"]] = record
+    return records
+
+
+def make_record(item: Dict[str, Any], result: Dict[str, Any], seconds: float, top_k: int,
+                config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Reduce an analysis result to what scoring needs."""
+    predictions = []
+    for location in (result.get("locations") or [])[:top_k]:
+        coords = location_coordinates(location)
+        predictions.append(list(coords) if coords else None)
+    usage = result.get("usage") or {}
+    return {
+        "id": item["id"],
+        "image": item["image"],
+        "latitude": item["latitude"],
+        "longitude": item["longitude"],
+        "predictions": predictions,
+        "error": result.get("error"),
+        "seconds": round(seconds, 3),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+        "model": (result.get("cascade") or {}).get("model"),
+        "source": result.get("source"),
+        "config": config,
+    }
+
+
+def run_eval(items: Sequence[Dict[str, Any]], analyze: Callable[[Dict[str, Any]], Dict[str, Any]],
+             results_path: str, concurrency: int = 4, top_k: int = 5,
+             progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None,
+             config: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Analyze every manifest item not yet answered in the results file.
+
+    Args:
+        items: Manifest items from load_manifest
+        analyze: Function returning a GeoSpy result for a manifest item
+        results_path: JSON-lines file records are appended to (and resumed from)
+        concurrency: Images analyzed at once
+        top_k: Predictions kept per image
+        progress: Optional callback(done, total, record) after each image
+        config: JSON-serializable run configuration stored in every record;
+            earlier records with a different configuration are not reused
+
+    Returns:
+        Latest record per image id (including ones from earlier runs)
+    """
+    records = read_results(results_path)
+    # Round-trip through JSON so tuples and lists compare equal to what was stored
+    config = json.loads(json.dumps(config))
+
+    def answered(item: Dict[str, Any]) -> bool:
+        record = records.get(item["id"])
+        return record is not None and not record.get("error") and record.get("config") == config
+
+    pending = [item for item in items if not answered(item)]
+    lock = threading.Lock()
+    done = 0
+
+    def evaluate(item: Dict[str, Any]) -> None:
+        nonlocal done
+        started = time.perf_counter()
+        try:
+            result = analyze(item)
+        except Exception as e:
+            result = {"error": f"Unexpected error during analysis: {str(e)}"}
+        record = make_record(item, result, time.perf_counter() - started, top_k, config)
+        with lock:
+            with open(results_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            records[item["id"]] = record
+            done += 1
+            if progress is not None:
+                progress(done, len(pending), record)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        list(pool.map(evaluate, pending))
+    return records
+
+
+def score(records: Sequence[Dict[str, Any]], top_k: int = 5,
+          thresholds_km: Sequence[float] = DEFAULT_THRESHOLDS_KM) -> Dict[str, Any]:
+    """
+    Score records by great-circle error.
+
+    Failed images and images without coordinates count as misses at every
+    threshold, so accuracy is always relative to the whole manifest.
+
+    Args:
+        records: Records produced by run_eval
+        top_k: A top-k hit is any of the first k predictions within the threshold
+        thresholds_km: Distances accuracy is reported at
+
+    Returns:
+        Report dictionary with top-1 and top-k accuracy per threshold, error
+        distance statistics, latency percentiles and token totals
+    """
+    n = len(records)
+    predicted = np.full((n, max(1, top_k), 2), np.nan)
+    for row, record in enumerate(records):
+        for column, coords in enumerate((record.get("predictions") or [])[:top_k]):
+            if coords:
+                predicted[row, column] = coords
+    truth = np.array([[record["latitude"], record["longitude"]] for record in records], dtype=float).reshape(n, 2)
+
+    distances = haversine_km_array(truth[:, 0:1], truth[:, 1:2], predicted[:, :, 0], predicted[:, :, 1])
+    top1 = distances[:, 0]
+    # Closest of the first k predictions; rows without any usable prediction stay NaN (a miss)
+    topk = np.where(np.isnan(distances), np.inf, distances).min(axis=1)
+    topk[np.isinf(topk)] = np.nan
+
+    def accuracy(errors: np.ndarray) -> Dict[str, Optional[float]]:
+        return {f"{threshold:g}km": round(float(np.mean(errors <= threshold)), 4) if n else None
+                for threshold in thresholds_km}
+
+    def error_stats(errors: np.ndarray) -> Dict[str, Optional[float]]:
+        valid = errors[~np.isnan(errors)]
+        if not valid.size:
+            return {"median_km": None, "mean_km": None}
+        return {"median_km": round(float(np.median(valid)), 1), "mean_km": round(float(np.mean(valid)), 1)}
+
+    failed = sum(1 for record in records if record.get("error"))
+    answered = [record for record in records if not record.get("error")]
+    prompt_tokens = [record["prompt_tokens"] for record in answered if record.get("prompt_tokens") is not None]
+    output_tokens = [record["output_tokens"] for record in answered if record.get("output_tokens") is not None]
+    return {
+        "images": n,
+        "answered": len(answered),
+        "failed": failed,
+        "without_coordinates": int(np.isnan(top1).sum()) - failed,
+        "top_k": top_k,
+        "top1_accuracy": accuracy(top1),
+        "topk_accuracy": accuracy(topk),
+        "top1_error": error_stats(top1),
+        "topk_error": error_stats(topk),
+        "latency_seconds": latency_summary([record["seconds"] for record in answered]),
+        "prompt_tokens": {"total": sum(prompt_tokens),
+                          "mean": round(sum(prompt_tokens) / len(prompt_tokens), 1) if prompt_tokens else None},
+        "output_tokens": {"total": sum(output_tokens),
+                          "mean": round(sum(output_tokens) / len(output_tokens), 1) if output_tokens else None},
+    }
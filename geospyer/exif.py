@@ -0,0 +1,134 @@
+"""
+EXIF metadata extraction for GeoSpy.
+
+Reads GPS position, capture time, orientation and camera details from an
+image's EXIF block. Only the file header is parsed; pixel data is never
+decoded. The metadata can short-circuit the API call entirely (when GPS is
+present) or be passed to Gemini as extra context.
+"""
+
+import io
+from typing import Any, Dict, Optional
+
+# How embedded metadata is used by GeoSpy
+EXIF_MODES = ("ignore", "context", "skip")
+
+# EXIF tag ids
+_GPS_IFD = 0x8825
+_EXIF_IFD = 0x8769
+_MAKE = 271
+_MODEL = 272
+_ORIENTATION = 274
+_DATETIME = 306
+_DATETIME_ORIGINAL = 36867
+_GPS_LAT_REF, _GPS_LAT, _GPS_LON_REF, _GPS_LON = 1, 2, 3, 4
+_GPS_ALT_REF, _GPS_ALT = 5, 6
+_GPS_DATE = 29
+
+
+def _to_degrees(value) -> float:
+    """Convert an EXIF (degrees, minutes, seconds) rational triple to decimal degrees."""
+    d, m, s = (float(v) for v in value)
+    return d + m / 60.0 + s / 3600.0
+
+
+def read_exif(data: bytes) -> Dict[str, Any]:
+    """
+    Extract location-relevant EXIF metadata from image bytes.
+
+    Args:
+        data: Raw image bytes
+
+    Returns:
+        Dictionary with any of: latitude, longitude, altitude, timestamp,
+        gps_date, orientation, camera. Empty if the image has no usable EXIF.
+    """
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            exif = img.getexif()
+    except Exception:
+        return {}
+    if not exif:
+        return {}
+
+    metadata: Dict[str, Any] = {}
+    camera = " ".join(str(exif[tag]).strip() for tag in (_MAKE, _MODEL) if exif.get(tag))
+    if camera:
+        metadata["camera"] = camera
+    if exif.get(_ORIENTATION):
+        metadata["orientation"] = int(exif[_ORIENTATION])
+
+    timestamp = exif.get_ifd(_EXIF_IFD).get(_DATETIME_ORIGINAL) or exif.get(_DATETIME)
+    if timestamp:
+        metadata["timestamp"] = str(timestamp).strip()
+
+    gps = exif.get_ifd(_GPS_IFD)
+    try:
+        if gps.get(_GPS_LAT) and gps.get(_GPS_LON):
+            lat = _to_degrees(gps[_GPS_LAT])
+            lon = _to_degrees(gps[_GPS_LON])
+            if str(gps.get(_GPS_LAT_REF, "N")).upper().startswith("S"):
+                lat = -lat
+            if str(gps.get(_GPS_LON_REF, "E")).upper().startswith("W"):
+                lon = -lon
+            # Some devices write 0,0 when they have no fix
+            if -90 <= lat <= 90 and -180 <= lon <= 180 and (lat, lon) != (0.0, 0.0):
+                metadata["latitude"] = round(lat, 7)
+                metadata["longitude"] = round(lon, 7)
+        if gps.get(_GPS_ALT) is not None:
+            altitude = float(gps[_GPS_ALT])
+            metadata["altitude"] = -altitude if gps.get(_GPS_ALT_REF) in (1, b"\x01") else altitude
+        if gps.get(_GPS_DATE):
+            metadata["gps_date"] = str(gps[_GPS_DATE])
+    except (TypeError, ValueError, ZeroDivisionError):
+        pass  # Malformed GPS block; keep whatever else was read
+
+    return metadata
+
+
+def has_gps(metadata: Dict[str, Any]) -> bool:
+    return "latitude" in metadata and "longitude" in metadata
+
+
+def exif_context(metadata: Dict[str, Any]) -> Optional[str]:
+    """Describe EXIF metadata as prompt context, or None if there is nothing useful."""
+    lines = []
+    if has_gps(metadata):
+        lines.append(f"Embedded GPS coordinates: {metadata['latitude']}, {metadata['longitude']}")
+    if "altitude" in metadata:
+        lines.append(f"Altitude: {metadata['altitude']:.0f} m")
+    if "timestamp" in metadata:
+        lines.append(f"Capture time: {metadata['timestamp']}")
+    if "camera" in metadata:
+        lines.append(f"Camera: {metadata['camera']}")
+    if not lines:
+        return None
+    return "Image EXIF metadata (may be inaccurate or edited):\n" + "\n".join(lines)
+
+
+def exif_result(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a locate() style result from embedded GPS metadata, without an API call.
+
+    Args:
+        metadata: Output of read_exif containing latitude and longitude
+
+    Returns:
+        Result dictionary with one High confidence location and "source": "exif"
+    """
+    details = ", ".join(f"{key}: {metadata[key]}" for key in ("timestamp", "camera") if key in metadata)
+    return {
+        "interpretation": "Location taken from GPS coordinates embedded in the image's EXIF metadata. "
+                          "No visual analysis was performed." + (f" ({details})" if details else ""),
+        "locations": [{
+            "country": "",
+            "state": "",
+            "city": "",
+            "confidence": "High",
+            "coordinates": {"latitude": metadata["latitude"], "longitude": metadata["longitude"]},
+            "explanation": "Coordinates recorded by the capturing device (EXIF GPS tags)."
+        }],
+        "source": "exif",
+        "exif": metadata,
+    }
@@ -0,0 +1,328 @@
+"""
+Streaming result export for GeoSpy.
+
+Writers in this module append results to disk as they arrive instead of
+collecting a whole batch and dumping it at the end, so memory use stays flat
+no matter how many images are processed.
+
+Supported formats:
+    - csv:     One row per location
+    - ndjson:  One GeoJSON Feature per line (GeoJSONSeq, readable by GDAL/QGIS)
+    - geojson: A single FeatureCollection, streamed feature by feature
+    - parquet: One row per location with typed columns, written in row groups
+    - json:    A JSON array of full results, streamed element by element
+"""
+
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+# Column order shared by every flat (one row per location) format
+FIELDS = [
+    "source",
+    "rank",
+    "country",
+    "state",
+    "city",
+    "confidence",
+    "latitude",
+    "longitude",
+    "explanation",
+    "interpretation",
+    "error",
+]
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Convert a coordinate value to float, returning None if it is missing or invalid."""
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def flatten_result(source: str, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Flatten a locate() result into one row per predicted location.
+
+    Args:
+        source: Image path or URL the result belongs to
+        result: Dictionary returned by GeoSpy.locate
+
+    Returns:
+        List of flat row dictionaries keyed by FIELDS. Failed analyses and
+        results without locations produce a single row carrying the error.
+    """
+    if "error" in result or not result.get("locations"):
+        row = dict.fromkeys(FIELDS)
+        row["source"] = source
+        row["interpretation"] = result.get("interpretation")
+        row["error"] = result.get("error") or "No locations identified"
+        return [row]
+
+    rows = []
+    for i, location in enumerate(result["locations"]):
+        coords = location.get("coordinates") or {}
+        rows.append({
+            "source": source,
+            "rank": i + 1,
+            "country": location.get("country"),
+            "state": location.get("state"),
+            "city": location.get("city"),
+            "confidence": location.get("confidence"),
+            "latitude": _to_float(coords.get("latitude")),
+            "longitude": _to_float(coords.get("longitude")),
+            "explanation": location.get("explanation"),
+            "interpretation": result.get("interpretation"),
+            "error": None,
+        })
+    return rows
+
+
+def row_to_feature(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a flat row into a GeoJSON Feature (null geometry when coordinates are missing)."""
+    lat, lng = row.get("latitude"), row.get("longitude")
+    geometry = None
+    if lat is not None and lng is not None:
+        geometry = {"type": "Point", "coordinates": [lng, lat]}
+    properties = {k: v for k, v in row.items() if k not in ("latitude", "longitude")}
+    return {"type": "Feature", "geometry": geometry, "properties": properties}
+
+
+class ResultWriter(ABC):
+    """
+    Base class for streaming result writers.
+
+    Subclasses implement _open, _write_rows and _close. Writers are context
+    managers; the output file is finalised when the writer is closed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.results_written = 0
+        self.rows_written = 0
+        self._closed = False
+        self._open()
+
+    @abstractmethod
+    def _open(self) -> None:
+        """Create the output file and write any header."""
+
+    @abstractmethod
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """Append rows to the output."""
+
+    @abstractmethod
+    def _close(self) -> None:
+        """Write any footer and close the output file."""
+
+    def write(self, source: str, result: Dict[str, Any]) -> None:
+        """
+        Append one analysis result to the output.
+
+        Args:
+            source: Image path or URL the result belongs to
+            result: Dictionary returned by GeoSpy.locate
+        """
+        rows = flatten_result(source, result)
+        self._write_result(source, result, rows)
+        self.results_written += 1
+        self.rows_written += len(rows)
+
+    def _write_result(self, source: str, result: Dict[str, Any], rows: List[Dict[str, Any]]) -> None:
+        self._write_rows(rows)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CSVWriter(ResultWriter):
+    """Write one CSV row per location."""
+
+    def _open(self) -> None:
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        self._writer.writeheader()
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class NDJSONWriter(ResultWriter):
+    """Write one GeoJSON Feature per line (newline-delimited GeoJSON / GeoJSONSeq)."""
+
+    def _open(self) -> None:
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self._file.write(json.dumps(row_to_feature(row), ensure_ascii=False))
+            self._file.write("\n")
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class GeoJSONWriter(ResultWriter):
+    """Stream a single GeoJSON FeatureCollection, one feature at a time."""
+
+    def _open(self) -> None:
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write('{"type": "FeatureCollection", "features": [\n')
+        self._first = True
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            if not self._first:
+                self._file.write(",\n")
+            self._first = False
+            self._file.write(json.dumps(row_to_feature(row), ensure_ascii=False))
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.write("\n]}\n")
+        self._file.close()
+
+
+class JSONWriter(ResultWriter):
+    """Stream a JSON array of full (nested) results tagged with their source."""
+
+    def _open(self) -> None:
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self._first = True
+
+    def _write_result(self, source: str, result: Dict[str, Any], rows: List[Dict[str, Any]]) -> None:
+        # Each element is the full result, not its flattened rows
+        self._write_rows([{"source": source, **result}])
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            if not self._first:
+                self._file.write(",\n")
+            self._first = False
+            self._file.write(json.dumps(row, indent=2, ensure_ascii=False))
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.write("\n]\n")
+        self._file.close()
+
+
+class ParquetWriter(ResultWriter):
+    """
+    Write one Parquet row per location with typed columns.
+
+    Rows are buffered and flushed as a row group every row_group_size rows,
+    so memory use is bounded by the row group size rather than the batch size.
+    Requires the optional pyarrow dependency.
+    """
+
+    def __init__(self, path: str, row_group_size: int = 1000):
+        self.row_group_size = row_group_size
+        super().__init__(path)
+
+    def _open(self) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow. Install it with: pip install pyarrow")
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("source", pa.string()),
+            ("rank", pa.int32()),
+            ("country", pa.string()),
+            ("state", pa.string()),
+            ("city", pa.string()),
+            ("confidence", pa.string()),
+            ("latitude", pa.float64()),
+            ("longitude", pa.float64()),
+            ("explanation", pa.string()),
+            ("interpretation", pa.string()),
+            ("error", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+        self._buffer: List[Dict[str, Any]] = []
+
+    def _flush(self) -> None:
+        if self._buffer:
+            table = self._pa.Table.from_pylist(self._buffer, schema=self._schema)
+            self._writer.write_table(table)
+            self._buffer = []
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            # Model output is free-form, so coerce text columns to str
+            self._buffer.append({
+                k: (str(v) if v is not None and self._schema.field(k).type == self._pa.string() else v)
+                for k, v in row.items()
+            })
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def _close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+WRITERS = {
+    "csv": CSVWriter,
+    "ndjson": NDJSONWriter,
+    "geojson": GeoJSONWriter,
+    "parquet": ParquetWriter,
+    "json": JSONWriter,
+}
+
+EXTENSIONS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".geojsonl": "ndjson",
+    ".geojsons": "ndjson",
+    ".geojson": "geojson",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".json": "json",
+}
+
+
+def infer_format(path: str) -> str:
+    """Guess the export format from the output file extension, defaulting to JSON."""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), "json")
+
+
+def open_writer(path: str, fmt: Optional[str] = None) -> ResultWriter:
+    """
+    Open a streaming writer for the given output path.
+
+    Args:
+        path: Output file path
+        fmt: Export format name; inferred from the file extension if omitted
+
+    Returns:
+        A ResultWriter instance (use it as a context manager)
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    fmt = (fmt or infer_format(path)).lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}. Choose from: {', '.join(WRITERS)}")
+    return WRITERS[fmt](path)
@@ -1,104 +1,26 @@
+import hashlib
 import json
 import requests
 import base64
 import os
+import threading
 import time
-from typing import Dict, Any, Optional, List, Union
+from collections import Counter
+from typing import BinaryIO, Dict, Any, Optional, List, Tuple, Union
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from . import cancel
+from .cancel import CancellableAdapter
+from .cascade import CONFIDENCE_RANKS, escalation_reason, sum_usage
+from .cassette import Cassette, CassetteAdapter
+from .circuit import Admission
+from .handles import FILES_UPLOAD_URL, DEFAULT_FILE_TTL, Conversation, HandleCache, ImageHandle, parse_timestamp
+from .exif import EXIF_MODES, exif_context, exif_result, has_gps, read_exif
+from .imaging import encode_jpeg, make_preview, prepare_image_bytes, read_buffer
+from .merge import merge_predictions
 
-class GeoSpy:
-    def __init__(self, api_key: Optional[str] = None):
-        self.gemini_api_key = api_key or os.environ.get("GEMINI_API_KEY", "your_api_key_here")
-        self.gemini_api_url = "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash-lite-001:generateContent"
-        
-    def encode_image_to_base64(self, image_path: str) -> str:
-        """
-        Convert an image file to base64 encoding.
-        Supports both local files and URLs.
-        
-        Args:
-            image_path: Path to the image file or URL
-            
-        Returns:
-            Base64 encoded string of the image
-            
-        Raises:
-            ValueError: If the image cannot be loaded or the URL is invalid
-            FileNotFoundError: If the local image file doesn't exist
-        """
-        # Check if the image_path is a URL
-        parsed_url = urlparse(image_path)
-        if parsed_url.scheme in ('http', 'https'):
-            try:
-                response = requests.get(image_path, timeout=10)
-                response.raise_for_status()  # Raise an exception for HTTP errors
-                return base64.b64encode(response.content).decode('utf-8')
-            except requests.exceptions.ConnectionError:
-                raise ValueError(f"Failed to connect to URL: {image_path}. Please check your internet connection.")
-            except requests.exceptions.HTTPError as e:
-                raise ValueError(f"HTTP error when downloading image: {e}")
-            except requests.exceptions.Timeout:
-                raise ValueError(f"Request timed out when downloading image from URL: {image_path}")
-            except requests.exceptions.RequestException as e:
-                raise ValueError(f"Failed to download image from URL: {e}")
-        else:
-            # Assume it's a local file path
-            try:
-                with open(image_path, "rb") as image_file:
-                    return base64.b64encode(image_file.read()).decode('utf-8')
-            except FileNotFoundError:
-                raise FileNotFoundError(f"Image file not found: {image_path}")
-            except PermissionError:
-                raise ValueError(f"Permission denied when accessing image file: {image_path}")
-            except Exception as e:
-                raise ValueError(f"Failed to read image file: {str(e)}")
-    
-    def locate_with_gemini(self, 
-                          image_path: str, 
-                          context_info: Optional[str] = None, 
-                          location_guess: Optional[str] = None) -> Dict[str, Any]:
-        """
-        Use Gemini API to analyze and geolocate an image with higher accuracy.
-        
-        Args:
-            image_path: Path to the image file or URL
-            context_info: Optional additional context about the image
-            location_guess: Optional user's guess of the location
-            
-        Returns:
-            Dictionary containing the analysis and location information with structure:
-            {
-                "interpretation": str,  # Analysis of the image
-                "locations": [          # List of possible locations
-                    {
-                        "country": str,
-                        "state": str,
-                        "city": str,
-                        "confidence": "High"/"Medium"/"Low",
-                        "coordinates": {
-                            "latitude": float,
-                            "longitude": float
-                        },
-                        "explanation": str
-                    }
-                ]
-            }
-            
-            On error, returns:
-            {
-                "error": str,           # Error message
-                "details": str,         # Optional details about the error
-                "exception": str        # Optional exception information
-            }
-        """
-        # Convert image to base64
-        try:
-            image_base64 = self.encode_image_to_base64(image_path)
-        except Exception as e:
-            return {"error": f"Failed to process image: {str(e)}"}
-        
-        # Build the prompt
-        prompt_text = """You are a professional geolocation expert. You MUST respond with a valid JSON object in the following format:
+# Base prompt sent with every image; context and location hints are appended by build_prompt
+BASE_PROMPT = """You are a professional geolocation expert. You MUST respond with a valid JSON object in the following format:
 
 {
   "interpretation": "A comprehensive analysis of the image, including:
@@ -169,6 +91,173 @@ Consider these key aspects for accurate location identification:
    - Consider climate variations within countries
    - Account for historical influences and colonial architecture"""
 
+# Gemini models endpoint and the model used when none is configured
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1/models"
+DEFAULT_MODEL = "gemini-2.0-flash-lite-001"
+
+# Browser-like headers sent with every Gemini request
+REQUEST_HEADERS = {
+    "accept": "*/*",
+    "accept-language": "en-US,en;q=0.6",
+    "content-type": "application/json",
+    "priority": "u=1, i",
+    "sec-ch-ua": "\"Brave\";v=\"137\", \"Chromium\";v=\"137\", \"Not/A)Brand\";v=\"24\"",
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": "\"Windows\"",
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "cross-site",
+    "sec-gpc": "1",
+    "Referer": "https://googleapis.com/",
+    "Referrer-Policy": "strict-origin-when-cross-origin"
+}
+
+class GeoSpy:
+    def __init__(self, api_key: Optional[str] = None,
+                 session: Optional[requests.Session] = None,
+                 pool_size: int = 10,
+                 rate_limiter=None,
+                 exif_mode: str = "ignore",
+                 model: str = DEFAULT_MODEL,
+                 cascade=None,
+                 circuit_breaker=None,
+                 handle_cache: Optional[HandleCache] = None,
+                 cassette: Optional[Cassette] = None,
+                 api_base: Optional[str] = None):
+        """
+        Args:
+            api_key: Gemini API key (defaults to the GEMINI_API_KEY environment variable)
+            session: Optional requests session to share connections with other clients
+            pool_size: Maximum number of pooled keep-alive connections per host
+            rate_limiter: Optional RateLimiter acquired before every API request
+            exif_mode: How embedded EXIF metadata is used: "ignore", "context"
+                (send it to Gemini as extra context) or "skip" (return the EXIF
+                GPS position without calling the API, falling back to "context"
+                for images without GPS)
+            model: Gemini model used for every request (ignored when cascade is set)
+            cascade: Optional CascadePolicy; each request is sent to its cheapest
+                model first and escalated to stronger ones only when needed
+            circuit_breaker: Optional CircuitBreaker; while it is open requests
+                fail (or wait up to its max_wait) instead of retrying
+            handle_cache: Cache of uploaded image handles used by upload_image
+                (defaults to an in-memory cache; pass HandleCache(path) to share
+                handles between processes)
+            cassette: Optional Cassette; in record mode every HTTP exchange is
+                also written to it, in replay mode requests are answered from it
+                without using the network
+            api_base: Base URL of the Gemini models endpoint (defaults to
+                GEMINI_API_BASE; point it at a stand-in server for benchmarks)
+        """
+        if exif_mode not in EXIF_MODES:
+            raise ValueError(f"exif_mode must be one of: {', '.join(EXIF_MODES)}")
+        self.gemini_api_key = api_key or os.environ.get("GEMINI_API_KEY", "your_api_key_here")
+        self.api_base = (api_base or GEMINI_API_BASE).rstrip("/")
+        self.model = model
+        self.gemini_api_url = self.model_url(model)
+        self.cascade = cascade
+        self.circuit_breaker = circuit_breaker
+        self.handle_cache = handle_cache if handle_cache is not None else HandleCache()
+        self.rate_limiter = rate_limiter
+        self.exif_mode = exif_mode
+        
+        # Counters for batch reporting (api_requests, retries, exif_calls_saved, ...)
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        
+        # Reuse keep-alive connections across requests; sessions are safe to share between threads.
+        # The adapter aborts in-flight requests of analyses cancelled via geospyer.cancel.
+        if session is None:
+            session = requests.Session()
+            adapter = CancellableAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        if cassette is not None:
+            for prefix in ("https://", "http://"):
+                session.mount(prefix, CassetteAdapter(cassette, session.get_adapter(prefix)))
+        self.cassette = cassette
+        self.session = session
+        
+    def load_image_bytes(self, image_path: str) -> bytes:
+        """
+        Read the raw bytes of an image.
+        Supports both local files and URLs.
+        
+        Args:
+            image_path: Path to the image file or URL
+            
+        Returns:
+            Raw image bytes
+            
+        Raises:
+            ValueError: If the image cannot be loaded or the URL is invalid
+            FileNotFoundError: If the local image file doesn't exist
+        """
+        # Check if the image_path is a URL
+        parsed_url = urlparse(image_path)
+        if parsed_url.scheme in ('http', 'https'):
+            try:
+                response = self.session.get(image_path, timeout=10)
+                response.raise_for_status()  # Raise an exception for HTTP errors
+                return response.content
+            except requests.exceptions.ConnectionError:
+                raise ValueError(f"Failed to connect to URL: {image_path}. Please check your internet connection.")
+            except requests.exceptions.HTTPError as e:
+                raise ValueError(f"HTTP error when downloading image: {e}")
+            except requests.exceptions.Timeout:
+                raise ValueError(f"Request timed out when downloading image from URL: {image_path}")
+            except requests.exceptions.RequestException as e:
+                raise ValueError(f"Failed to download image from URL: {e}")
+        else:
+            # Assume it's a local file path
+            try:
+                with open(image_path, "rb") as image_file:
+                    return image_file.read()
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Image file not found: {image_path}")
+            except PermissionError:
+                raise ValueError(f"Permission denied when accessing image file: {image_path}")
+            except Exception as e:
+                raise ValueError(f"Failed to read image file: {str(e)}")
+    
+    def model_url(self, model: str) -> str:
+        """Return the generateContent endpoint of a Gemini model."""
+        return f"{self.api_base}/{model}:generateContent"
+    
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += amount
+    
+    def encode_image_to_base64(self, image_path: str) -> str:
+        """
+        Convert an image file to base64 encoding.
+        Supports both local files and URLs.
+        
+        Args:
+            image_path: Path to the image file or URL
+            
+        Returns:
+            Base64 encoded string of the image
+            
+        Raises:
+            ValueError: If the image cannot be loaded or the URL is invalid
+            FileNotFoundError: If the local image file doesn't exist
+        """
+        return base64.b64encode(self.load_image_bytes(image_path)).decode('utf-8')
+    
+    def build_prompt(self, context_info: Optional[str] = None, 
+                     location_guess: Optional[str] = None) -> str:
+        """
+        Build the text prompt sent alongside the image.
+        
+        Args:
+            context_info: Optional additional context about the image
+            location_guess: Optional user's guess of the location
+            
+        Returns:
+            Complete prompt text
+        """
+        prompt_text = BASE_PROMPT
+
         # Add additional context if provided
         if context_info:
             prompt_text += f"\n\nAdditional context provided by the user:\n{context_info}"
@@ -178,24 +267,49 @@ Consider these key aspects for accurate location identification:
             prompt_text += f"\n\nUser suggests this might be in: {location_guess}"
         
         prompt_text += "\n\nRemember: Your response must be a valid JSON object only. No additional text or formatting."
+        return prompt_text
+    
+    def build_request_body(self, prompt_text: str, image_base64: str, 
+                           mime_type: str = "image/jpeg") -> Dict[str, Any]:
+        """
+        Build the generateContent request body for a prompt and base64 image.
         
-        # Prepare the request body
-        request_body = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "text": prompt_text
-                        },
-                        {
-                            "inline_data": {
-                                "mime_type": "image/jpeg",
-                                "data": image_base64
-                            }
+        Args:
+            prompt_text: Prompt returned by build_prompt
+            image_base64: Base64 encoded image data
+            mime_type: MIME type of the image
+            
+        Returns:
+            Request body dictionary ready to be sent as JSON
+        """
+        return self.build_request_body_from_contents([
+            {
+                "parts": [
+                    {
+                        "text": prompt_text
+                    },
+                    {
+                        "inline_data": {
+                            "mime_type": mime_type,
+                            "data": image_base64
                         }
-                    ]
-                }
-            ],
+                    }
+                ]
+            }
+        ])
+    
+    def build_request_body_from_contents(self, contents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build a generateContent request body for prepared conversation turns.
+        
+        Args:
+            contents: Turns in the generateContent "contents" format
+            
+        Returns:
+            Request body dictionary ready to be sent as JSON
+        """
+        return {
+            "contents": contents,
             "generationConfig": {
                 "temperature": 0.4,
                 "topK": 32,
@@ -203,23 +317,91 @@ Consider these key aspects for accurate location identification:
                 "maxOutputTokens": 2048
             }
         }
+    
+    def _acquire_rate_limit(self) -> None:
+        """Wait for the rate limiter, giving up early if the analysis is cancelled."""
+        token = cancel.current_token()
+        if token is None:
+            self.rate_limiter.acquire()
+            return
+        while not self.rate_limiter.acquire(timeout=cancel.POLL_INTERVAL):
+            token.raise_if_cancelled()
+    
+    def _admit_request(self) -> Optional[Admission]:
+        """Wait for the circuit breaker to admit a request, giving up early if the analysis is cancelled."""
+        breaker = self.circuit_breaker
+        token = cancel.current_token()
+        if token is None or breaker.max_wait <= 0:
+            return breaker.allow()
+        deadline = time.monotonic() + breaker.max_wait
+        while True:
+            remaining = deadline - time.monotonic()
+            admission = breaker.allow(timeout=max(0.0, min(remaining, cancel.POLL_INTERVAL)))
+            if admission is not None:
+                return admission
+            token.raise_if_cancelled()
+            if remaining <= cancel.POLL_INTERVAL:
+                return None
+    
+    def _circuit_tripped(self) -> bool:
+        """True if the circuit breaker is open and would refuse a retry without waiting."""
+        breaker = self.circuit_breaker
+        return breaker is not None and breaker.max_wait <= 0 and breaker.retry_after() > 0
+    
+    def _circuit_open_error(self) -> Dict[str, Any]:
+        self._count("circuit_rejections")
+        retry_after = self.circuit_breaker.retry_after()
+        return {"error": "Gemini API is failing; requests are paused by the circuit breaker. Please try again shortly.",
+                "details": f"Circuit open, next probe in {retry_after:.0f} seconds",
+                "circuit_open": True}
+    
+    def _post(self, api_url: str, request_body: Dict[str, Any],
+              admission: Optional[Admission] = None) -> requests.Response:
+        """POST one request to Gemini, reporting its outcome to the circuit breaker that admitted it."""
+        breaker = self.circuit_breaker if admission is not None else None
+        try:
+            response = self.session.post(
+                f"{api_url}?key={self.gemini_api_key}",
+                headers=REQUEST_HEADERS,
+                json=request_body,
+                timeout=30  # 30 second timeout
+            )
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            if breaker is not None:
+                breaker.record(admission, False)
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.record(admission, None)  # Cancelled or unexpected; says nothing about Gemini's health
+            raise
+        if breaker is not None:
+            # Overload, rate limiting and server errors count against the circuit
+            breaker.record(admission, response.status_code != 429 and response.status_code < 500)
+        return response
+    
+    def send_request(self, request_body: Dict[str, Any],
+                     model: Optional[str] = None) -> Tuple[Optional[requests.Response], Optional[Dict[str, Any]]]:
+        """
+        Send a request to the Gemini API, retrying temporary failures.
         
-        # Make the API request
-        headers = {
-            "accept": "*/*",
-            "accept-language": "en-US,en;q=0.6",
-            "content-type": "application/json",
-            "priority": "u=1, i",
-            "sec-ch-ua": "\"Brave\";v=\"137\", \"Chromium\";v=\"137\", \"Not/A)Brand\";v=\"24\"",
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": "\"Windows\"",
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "cross-site",
-            "sec-gpc": "1",
-            "Referer": "https://googleapis.com/",
-            "Referrer-Policy": "strict-origin-when-cross-origin"
-        }
+        Args:
+            request_body: Request body returned by build_request_body
+            model: Model to send it to (defaults to the configured model)
+            
+        Returns:
+            Tuple of (response, error). On success error is None; otherwise
+            response is None and error is an error dictionary as described in
+            locate_with_gemini.
+            
+        Raises:
+            CancelledError: If the CancelToken bound to this thread (see
+                geospyer.cancel) is cancelled while waiting or in flight
+        
+        With a circuit breaker, each attempt first asks it for admission and
+        reports whether Gemini answered; once it opens, the remaining retries
+        are abandoned and the circuit-open error is returned.
+        """
+        api_url = self.gemini_api_url if model is None or model == self.model else self.model_url(model)
         
         # Retry logic for temporary failures
         max_retries = 3
@@ -227,61 +409,91 @@ Consider these key aspects for accurate location identification:
         
         for attempt in range(max_retries):
             try:
-                response = requests.post(
-                    f"{self.gemini_api_url}?key={self.gemini_api_key}",
-                    headers=headers,
-                    json=request_body,
-                    timeout=30  # 30 second timeout
-                )
+                if self.rate_limiter is not None:
+                    self._acquire_rate_limit()
+                admission = None
+                if self.circuit_breaker is not None:
+                    admission = self._admit_request()
+                    if admission is None:
+                        return None, self._circuit_open_error()
+                
+                self._count("api_requests")
+                response = self._post(api_url, request_body, admission)
                 
                 if response.status_code == 200:
-                    break  # Success, exit retry loop
+                    return response, None  # Success, exit retry loop
                 elif response.status_code == 503:
                     # API overloaded, retry with exponential backoff
                     if attempt < max_retries - 1:
+                        if self._circuit_tripped():
+                            return None, self._circuit_open_error()
                         delay = base_delay * (2 ** attempt)  # 2, 4, 8 seconds
                         print(f"API overloaded (503), retrying in {delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                        time.sleep(delay)
+                        self._count("retries")
+                        cancel.sleep(delay)
                         continue
                     else:
-                        return {"error": "API is temporarily overloaded. Please try again in a few minutes.", "details": response.text}
+                        return None, {"error": "API is temporarily overloaded. Please try again in a few minutes.", "details": response.text}
                 elif response.status_code == 429:
                     # Rate limited, retry with longer delay
                     if attempt < max_retries - 1:
+                        if self._circuit_tripped():
+                            return None, self._circuit_open_error()
                         delay = base_delay * (3 ** attempt)  # 2, 6, 18 seconds
                         print(f"Rate limited (429), retrying in {delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                        time.sleep(delay)
+                        self._count("retries")
+                        cancel.sleep(delay)
                         continue
                     else:
-                        return {"error": "Rate limit exceeded. Please wait a moment and try again.", "details": response.text}
+                        return None, {"error": "Rate limit exceeded. Please wait a moment and try again.", "details": response.text}
                 else:
                     # Other HTTP errors
                     print(f"Error: API request failed with status code {response.status_code}")
                     print(f"Response: {response.text}")
-                    return {"error": f"Failed to get response from Gemini API (HTTP {response.status_code})", "details": response.text}
+                    return None, {"error": f"Failed to get response from Gemini API (HTTP {response.status_code})", "details": response.text, "status_code": response.status_code}
                     
             except requests.exceptions.Timeout:
                 if attempt < max_retries - 1:
+                    if self._circuit_tripped():
+                        return None, self._circuit_open_error()
                     delay = base_delay * (2 ** attempt)
                     print(f"Request timeout, retrying in {delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(delay)
+                    self._count("retries")
+                    cancel.sleep(delay)
                     continue
                 else:
-                    return {"error": "Request timed out. Please check your internet connection and try again."}
+                    return None, {"error": "Request timed out. Please check your internet connection and try again."}
             except requests.exceptions.ConnectionError:
                 if attempt < max_retries - 1:
+                    if self._circuit_tripped():
+                        return None, self._circuit_open_error()
                     delay = base_delay * (2 ** attempt)
                     print(f"Connection error, retrying in {delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(delay)
+                    self._count("retries")
+                    cancel.sleep(delay)
                     continue
                 else:
-                    return {"error": "Connection failed. Please check your internet connection and try again."}
+                    return None, {"error": "Connection failed. Please check your internet connection and try again."}
             except Exception as e:
-                return {"error": f"Unexpected error during API request: {str(e)}"}
+                return None, {"error": f"Unexpected error during API request: {str(e)}"}
+        
+        return None, {"error": "Failed to get response from Gemini API"}
+    
+    def parse_response(self, response: requests.Response) -> Dict[str, Any]:
+        """
+        Parse a successful Gemini API response into a location result.
         
-        # Process successful response
+        Args:
+            response: HTTP 200 response returned by send_request
+            
+        Returns:
+            Result dictionary as described in locate_with_gemini; when Gemini
+            reports token usage it is included as "usage" (prompt_tokens,
+            output_tokens, total_tokens)
+        """
         try:
             data = response.json()
+            usage = self.token_usage(data)
             raw_text = data["candidates"][0]["content"]["parts"][0]["text"]
             
             # Strip any markdown formatting and code blocks
@@ -292,7 +504,7 @@ Consider these key aspects for accurate location identification:
                 
                 # Handle potential single location format where the location is not in an array
                 if "city" in parsed_result and "locations" not in parsed_result:
-                    return {
+                    parsed_result = {
                         "interpretation": parsed_result.get("interpretation", ""),
                         "locations": [{
                             "country": parsed_result.get("country", ""),
@@ -304,19 +516,184 @@ Consider these key aspects for accurate location identification:
                         }]
                     }
                 
+                if usage and isinstance(parsed_result, dict):
+                    parsed_result["usage"] = usage
                 return parsed_result
                 
             except json.JSONDecodeError as e:
-                return {
+                error = {
                     "error": "Failed to parse API response",
                     "rawResponse": raw_text,
                     "exception": str(e)
                 }
+                if usage:
+                    error["usage"] = usage
+                return error
         except Exception as e:
             return {
                 "error": "Failed to process API response",
                 "exception": str(e)
             }
+    
+    def token_usage(self, data: Dict[str, Any]) -> Optional[Dict[str, int]]:
+        """
+        Extract token counts from a generateContent response and add them to the stats.
+        
+        Args:
+            data: Decoded response JSON
+            
+        Returns:
+            Dictionary with prompt_tokens, output_tokens and total_tokens, or
+            None if the response has no usageMetadata
+        """
+        metadata = data.get("usageMetadata") if isinstance(data, dict) else None
+        if not metadata:
+            return None
+        usage = {
+            "prompt_tokens": int(metadata.get("promptTokenCount", 0)),
+            "output_tokens": int(metadata.get("candidatesTokenCount", 0)),
+            "total_tokens": int(metadata.get("totalTokenCount", 0)),
+        }
+        self._count("prompt_tokens", usage["prompt_tokens"])
+        self._count("output_tokens", usage["output_tokens"])
+        return usage
+    
+    def apply_exif(self, image_data: bytes, 
+                   context_info: Optional[str] = None) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Apply the configured EXIF mode to an image before it is sent.
+        
+        Args:
+            image_data: Raw image bytes (only the header is parsed)
+            context_info: Context supplied by the caller
+            
+        Returns:
+            Tuple of (context_info, shortcut). shortcut is a finished result
+            when the API call can be skipped, otherwise None and context_info
+            includes the metadata description when there is one.
+        """
+        metadata = read_exif(image_data)
+        if self.exif_mode == "skip" and has_gps(metadata):
+            self._count("exif_calls_saved")
+            return context_info, exif_result(metadata)
+        
+        description = exif_context(metadata)
+        if description:
+            self._count("exif_context_added")
+            context_info = f"{context_info}\n\n{description}" if context_info else description
+        return context_info, None
+    
+    def locate_base64(self, 
+                      image_base64: str, 
+                      context_info: Optional[str] = None, 
+                      location_guess: Optional[str] = None,
+                      mime_type: str = "image/jpeg") -> Dict[str, Any]:
+        """
+        Geolocate an image that is already base64 encoded.
+        
+        Args:
+            image_base64: Base64 encoded image data
+            context_info: Optional additional context about the image
+            location_guess: Optional user's guess of the location
+            mime_type: MIME type of the image
+            
+        Returns:
+            Dictionary containing the analysis and location information.
+            See locate_with_gemini method for detailed return structure.
+            With a cascade, successful results also record the answering
+            tier under "cascade".
+        """
+        prompt_text = self.build_prompt(context_info, location_guess)
+        request_body = self.build_request_body(prompt_text, image_base64, mime_type)
+        
+        if self.cascade is not None:
+            return self.cascade.run(self, request_body)
+        
+        response, error = self.send_request(request_body)
+        if error is not None:
+            return error
+        
+        return self.parse_response(response)
+    
+    def locate_with_gemini(self, 
+                          image_path: str, 
+                          context_info: Optional[str] = None, 
+                          location_guess: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Use Gemini API to analyze and geolocate an image with higher accuracy.
+        
+        Args:
+            image_path: Path to the image file or URL
+            context_info: Optional additional context about the image
+            location_guess: Optional user's guess of the location
+            
+        Returns:
+            Dictionary containing the analysis and location information with structure:
+            {
+                "interpretation": str,  # Analysis of the image
+                "locations": [          # List of possible locations
+                    {
+                        "country": str,
+                        "state": str,
+                        "city": str,
+                        "confidence": "High"/"Medium"/"Low",
+                        "coordinates": {
+                            "latitude": float,
+                            "longitude": float
+                        },
+                        "explanation": str
+                    }
+                ]
+            }
+            
+            On error, returns:
+            {
+                "error": str,           # Error message
+                "details": str,         # Optional details about the error
+                "exception": str        # Optional exception information
+            }
+        """
+        try:
+            raw_data = self.load_image_bytes(image_path)
+        except Exception as e:
+            return {"error": f"Failed to process image: {str(e)}"}
+        
+        return self.locate_bytes(raw_data, context_info, location_guess)
+    
+    def locate_bytes(self, 
+                     data: Union[bytes, bytearray, memoryview, BinaryIO], 
+                     context_info: Optional[str] = None, 
+                     location_guess: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Locate an image held in memory, without writing it to disk.
+        
+        Args:
+            data: Image bytes, any buffer-protocol object (bytearray, memoryview)
+                or a binary file-like object (e.g. an upload or io.BytesIO)
+            context_info: Optional additional context about the image
+            location_guess: Optional user's guess of the location
+            
+        Returns:
+            Dictionary containing the analysis and location information.
+            See locate_with_gemini method for detailed return structure.
+        """
+        # Convert formats Gemini does not accept and encode to base64
+        try:
+            raw_data = read_buffer(data)
+            if not raw_data:
+                return {"error": "Failed to process image: no image data provided"}
+            
+            if self.exif_mode != "ignore":
+                context_info, shortcut = self.apply_exif(raw_data, context_info)
+                if shortcut is not None:
+                    return shortcut
+            
+            image_data, mime_type = prepare_image_bytes(raw_data)
+            image_base64 = base64.b64encode(image_data).decode('utf-8')
+        except Exception as e:
+            return {"error": f"Failed to process image: {str(e)}"}
+        
+        return self.locate_base64(image_base64, context_info, location_guess, mime_type)
             
     def locate(self, image_path: str, context_info: Optional[str] = None, 
               location_guess: Optional[str] = None) -> Dict[str, Any]:
@@ -335,4 +712,416 @@ Consider these key aspects for accurate location identification:
         Note:
             This is an alias for locate_with_gemini for backward compatibility.
         """
-        return self.locate_with_gemini(image_path, context_info, location_guess)
\ No newline at end of file
+        return self.locate_with_gemini(image_path, context_info, location_guess)
+    
+    def locate_sequence(self, 
+                        source: Union[str, List[str], bytes, memoryview, BinaryIO], 
+                        context_info: Optional[str] = None, 
+                        location_guess: Optional[str] = None,
+                        max_frames: int = 6,
+                        threshold: float = 0.08,
+                        max_workers: int = 4) -> Dict[str, Any]:
+        """
+        Locate an animated image (GIF, APNG, WebP) or an image sequence.
+        
+        Near-identical frames are dropped with a cheap thumbnail difference
+        test, the remaining representative frames are analysed concurrently,
+        and their predictions are merged into one ranked result.
+        
+        Args:
+            source: Path or URL of an animated image, a directory of frames, a list of
+                frame image paths, or in-memory image data (bytes, memoryview, file-like)
+            context_info: Optional additional context about the image
+            location_guess: Optional user's guess of the location
+            max_frames: Maximum number of frames sent to the API
+            threshold: Minimum frame difference (0-1) for a frame to count as a new scene
+            max_workers: Maximum number of frames analysed at once
+            
+        Returns:
+            Merged result in the locate_with_gemini format, with "frames"
+            (indices of the analysed frames) and per-location "support" and
+            "agreement" fields.
+            
+        Raises:
+            ValueError: If max_frames is less than 1
+        """
+        from .sequence import frame_files, select_frames
+        
+        if max_frames < 1:
+            raise ValueError("max_frames must be at least 1")
+        
+        try:
+            if isinstance(source, str) and os.path.isdir(source):
+                # A directory holds one frame per image file, in natural name order
+                frames_source = frame_files(source)
+            elif isinstance(source, str):
+                frames_source = self.load_image_bytes(source)
+            elif isinstance(source, (list, tuple)):
+                frames_source = source
+            else:
+                frames_source = read_buffer(source)
+            frames = select_frames(frames_source, max_frames=max_frames, threshold=threshold)
+        except Exception as e:
+            return {"error": f"Failed to process image sequence: {str(e)}"}
+        
+        if not frames:
+            return {"error": "Failed to process image sequence: no frames found"}
+        
+        def analyse(frame):
+            image_base64 = base64.b64encode(frame[1]).decode('utf-8')
+            return self.locate_base64(image_base64, context_info, location_guess, "image/jpeg")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(cancel.bind(analyse), frames))
+        
+        merged = merge_predictions(results, label="frames")
+        if "error" not in merged:
+            merged["frames"] = [index for index, _ in frames]
+        return merged
+    
+    def locate_tiled(self, 
+                     image_path: str, 
+                     context_info: Optional[str] = None, 
+                     location_guess: Optional[str] = None,
+                     tile_size: int = 1024,
+                     overlap: float = 0.2,
+                     max_in_flight: int = 4,
+                     include_overview: bool = True) -> Dict[str, Any]:
+        """
+        Locate a panorama or very large image by analysing overlapping tiles.
+        
+        Tiles are analysed concurrently (at most max_in_flight at a time) and
+        their predictions are merged into one ranked result, weighted by
+        confidence and by how many tiles agree on each place. Images no larger
+        than one tile are analysed normally. The image is downloaded once, and
+        the EXIF mode applies as in locate_bytes.
+        
+        Args:
+            image_path: Path to the image file or URL
+            context_info: Optional additional context about the image
+            location_guess: Optional user's guess of the location
+            tile_size: Tile side length in source pixels
+            overlap: Fraction of each tile shared with its neighbours
+            max_in_flight: Maximum number of tile requests running at once
+            include_overview: Also analyse a downscaled view of the whole image
+            
+        Returns:
+            Merged result in the locate_with_gemini format, with "tiles"
+            (number of requests made) and per-location "support" and
+            "agreement" fields.
+        """
+        from .tiling import encode_tile, open_image, tile_boxes
+        
+        try:
+            raw_data = self.load_image_bytes(image_path)
+            image = open_image(raw_data)
+        except Exception as e:
+            return {"error": f"Failed to process image: {str(e)}"}
+        
+        width, height = image.size
+        if width <= tile_size and height <= tile_size:
+            return self.locate_bytes(raw_data, context_info, location_guess)
+        
+        if self.exif_mode != "ignore":
+            try:
+                context_info, shortcut = self.apply_exif(raw_data, context_info)
+            except Exception as e:
+                return {"error": f"Failed to process image: {str(e)}"}
+            if shortcut is not None:
+                return shortcut
+        del raw_data  # Only the decoded image is needed from here on
+        
+        boxes = tile_boxes(width, height, tile_size, overlap)
+        tile_note = "This image is one section of a larger panorama or high-resolution image."
+        tile_context = f"{context_info}\n\n{tile_note}" if context_info else tile_note
+        
+        def analyse(box):
+            # Crop and encode inside the worker so only in-flight tiles are held in memory
+            if box is None:
+                data = encode_jpeg(image, max_dimension=tile_size)
+                return self.locate_base64(base64.b64encode(data).decode('utf-8'), context_info, location_guess)
+            data = encode_tile(image, box)
+            return self.locate_base64(base64.b64encode(data).decode('utf-8'), tile_context, location_guess)
+        
+        jobs = ([None] if include_overview else []) + boxes
+        weights = [1.0 if box is None else (box[2] - box[0]) * (box[3] - box[1]) / float(tile_size * tile_size)
+                   for box in jobs]
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+            results = list(executor.map(cancel.bind(analyse), jobs))
+        
+        merged = merge_predictions(results, weights=weights, label="tiles")
+        if "error" not in merged:
+            merged["tiles"] = len(jobs)
+        return merged
+    
+    def locate_two_pass(self, 
+                        image: Union[str, bytes, bytearray, memoryview, BinaryIO], 
+                        context_info: Optional[str] = None, 
+                        location_guess: Optional[str] = None,
+                        coarse_dimension: int = 512,
+                        min_confidence: str = "Medium") -> Dict[str, Any]:
+        """
+        Locate an image coarse to fine: a small preview first, full resolution only if needed.
+        
+        Pass one sends a heavily downscaled JPEG. Its answer is accepted when the
+        top location is at least min_confidence and the equally confident
+        predictions agree; otherwise pass two sends the full-resolution image,
+        with pass one's candidate regions as context to confirm or correct.
+        
+        Args:
+            image: Path or URL of the image, or in-memory image data (bytes, memoryview, file-like)
+            context_info: Optional additional context about the image
+            location_guess: Optional user's guess of the location
+            coarse_dimension: Longest side of the pass-one image in pixels
+            min_confidence: Lowest pass-one confidence accepted without a second pass
+            
+        Returns:
+            Result in the locate_with_gemini format with a "two_pass" entry:
+            passes (1 or 2), reason for the second pass, coarse_bytes and
+            full_bytes (image payload sizes), bytes_saved (negative when both
+            passes ran) and coarse_seconds/fine_seconds (API time per pass).
+            Batch totals are in stats (see two_pass_summary).
+        """
+        if min_confidence not in CONFIDENCE_RANKS:
+            raise ValueError(f"min_confidence must be one of: {', '.join(CONFIDENCE_RANKS)}")
+        
+        try:
+            raw_data = self.load_image_bytes(image) if isinstance(image, str) else read_buffer(image)
+            if not raw_data:
+                return {"error": "Failed to process image: no image data provided"}
+            
+            if self.exif_mode != "ignore":
+                context_info, shortcut = self.apply_exif(raw_data, context_info)
+                if shortcut is not None:
+                    return shortcut
+            
+            full_data, mime_type = prepare_image_bytes(raw_data)
+            coarse_data, _ = make_preview(raw_data, max_dimension=coarse_dimension, quality=85, image_format="JPEG")
+        except Exception as e:
+            return {"error": f"Failed to process image: {str(e)}"}
+        
+        full_base64 = base64.b64encode(full_data).decode('utf-8')
+        if len(coarse_data) >= len(full_data):
+            # Already small; a preview would not save anything
+            return self.locate_base64(full_base64, context_info, location_guess, mime_type)
+        
+        started = time.perf_counter()
+        coarse = self.locate_base64(base64.b64encode(coarse_data).decode('utf-8'),
+                                    context_info, location_guess, "image/jpeg")
+        coarse_seconds = time.perf_counter() - started
+        self._count("two_pass_images")
+        
+        reason = escalation_reason(coarse, min_confidence)
+        report = {"passes": 1, "reason": reason, "coarse_bytes": len(coarse_data), "full_bytes": len(full_data),
+                  "bytes_saved": len(full_data) - len(coarse_data), "coarse_seconds": round(coarse_seconds, 3),
+                  "fine_seconds": None}
+        if reason is None:
+            if "error" in coarse:
+                return coarse  # API or network failure; a larger image would not help
+            self._count("two_pass_coarse_accepted")
+            self._count("two_pass_bytes_saved", report["bytes_saved"])
+            coarse["two_pass"] = report
+            return coarse
+        
+        # Pass two: full resolution, told what the preview suggested
+        candidates = "\n".join(
+            f"- {', '.join(str(part) for part in (loc.get('city'), loc.get('state'), loc.get('country')) if part)}"
+            f" ({loc.get('confidence', 'Unknown')} confidence)"
+            for loc in (coarse.get("locations") or [])[:3]
+        )
+        fine_note = "A first look at a low-resolution copy of this image was inconclusive."
+        if candidates:
+            fine_note += f" It suggested these candidate regions:\n{candidates}\n"
+        fine_note += ("Use the fine detail in this full-resolution image (text, signage, plates, "
+                      "vegetation, architecture) to confirm or correct them.")
+        fine_context = f"{context_info}\n\n{fine_note}" if context_info else fine_note
+        
+        started = time.perf_counter()
+        fine = self.locate_base64(full_base64, fine_context, location_guess, mime_type)
+        fine_seconds = time.perf_counter() - started
+        self._count("two_pass_fine_passes")
+        self._count("two_pass_fine_ms", int(fine_seconds * 1000))
+        self._count("two_pass_wasted_ms", int(coarse_seconds * 1000))
+        self._count("two_pass_bytes_saved", -len(coarse_data))
+        
+        report.update(passes=2, bytes_saved=-len(coarse_data), fine_seconds=round(fine_seconds, 3))
+        usage = sum_usage(coarse.get("usage"), fine.get("usage"))
+        if "error" in fine and "error" not in coarse:
+            fine = coarse  # Keep the tentative answer rather than nothing
+        if "error" not in fine:
+            fine["two_pass"] = report
+        if usage:
+            fine["usage"] = usage  # Both passes were billed
+        return fine
+    
+    def two_pass_summary(self) -> Dict[str, Any]:
+        """
+        Summarise the savings of locate_two_pass across every image analysed so far.
+        
+        Latency saved is estimated: each image accepted after pass one is
+        credited with the average duration of the full-resolution passes that
+        did run, minus the pass-one time spent on images that needed both.
+        
+        Returns:
+            Dictionary with images, coarse_accepted, fine_passes, bytes_saved and
+            latency_saved_seconds (None until at least one second pass has run)
+        """
+        with self._stats_lock:
+            stats = dict(self.stats)
+        fine_passes = stats.get("two_pass_fine_passes", 0)
+        accepted = stats.get("two_pass_coarse_accepted", 0)
+        latency_saved = None
+        if fine_passes:
+            average_fine = stats.get("two_pass_fine_ms", 0) / fine_passes
+            latency_saved = round((accepted * average_fine - stats.get("two_pass_wasted_ms", 0)) / 1000, 1)
+        return {
+            "images": stats.get("two_pass_images", 0),
+            "coarse_accepted": accepted,
+            "fine_passes": fine_passes,
+            "bytes_saved": stats.get("two_pass_bytes_saved", 0),
+            "latency_saved_seconds": latency_saved,
+        }
+    
+    def upload_image(self, image: Union[str, bytes, bytearray, memoryview, BinaryIO],
+                     display_name: Optional[str] = None) -> ImageHandle:
+        """
+        Upload an image to the Gemini Files API once and return a reusable handle.
+        
+        Images are identified by content hash; while a previous upload of the
+        same image has not expired, its cached handle is returned without
+        sending anything.
+        
+        Args:
+            image: Path or URL of the image, or in-memory image data (bytes, memoryview, file-like)
+            display_name: Optional name shown for the file in the Files API
+            
+        Returns:
+            ImageHandle referencing the uploaded image
+            
+        Raises:
+            ValueError: If the image cannot be loaded or the upload fails
+        """
+        raw_data = self.load_image_bytes(image) if isinstance(image, str) else read_buffer(image)
+        if not raw_data:
+            raise ValueError("No image data provided")
+        data, mime_type = prepare_image_bytes(raw_data)
+        digest = hashlib.sha256(data).hexdigest()
+        
+        handle = self.handle_cache.get(digest)
+        if handle is not None:
+            self._count("upload_bytes_saved", len(data))
+            return handle
+        
+        # Resumable upload protocol: start a session, then send the bytes and finalize
+        try:
+            start = self.session.post(
+                f"{FILES_UPLOAD_URL}?key={self.gemini_api_key}",
+                headers={
+                    "X-Goog-Upload-Protocol": "resumable",
+                    "X-Goog-Upload-Command": "start",
+                    "X-Goog-Upload-Header-Content-Length": str(len(data)),
+                    "X-Goog-Upload-Header-Content-Type": mime_type,
+                },
+                json={"file": {"display_name": display_name or digest[:16]}},
+                timeout=30
+            )
+            upload_url = start.headers.get("X-Goog-Upload-URL")
+            if start.status_code != 200 or not upload_url:
+                raise ValueError(f"HTTP {start.status_code}: {start.text}")
+            
+            response = self.session.post(
+                upload_url,
+                headers={"X-Goog-Upload-Offset": "0", "X-Goog-Upload-Command": "upload, finalize"},
+                data=data,
+                timeout=120
+            )
+            if response.status_code != 200:
+                raise ValueError(f"HTTP {response.status_code}: {response.text}")
+            info = response.json()["file"]
+        except requests.exceptions.RequestException as e:
+            raise ValueError(f"Failed to upload image: {str(e)}")
+        except (ValueError, KeyError) as e:
+            raise ValueError(f"Failed to upload image: {str(e)}")
+        
+        self._count("uploads")
+        self._count("upload_bytes", len(data))
+        handle = ImageHandle(
+            name=info["name"],
+            uri=info["uri"],
+            mime_type=info.get("mimeType", mime_type),
+            size_bytes=int(info.get("sizeBytes", len(data))),
+            expires_at=parse_timestamp(info.get("expirationTime")) or time.time() + DEFAULT_FILE_TTL,
+            sha256=digest
+        )
+        self.handle_cache.put(handle)
+        return handle
+    
+    def locate_handle(self, 
+                      handle: ImageHandle, 
+                      context_info: Optional[str] = None, 
+                      location_guess: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Geolocate an uploaded image; only the prompt text is sent.
+        
+        Args:
+            handle: Handle returned by upload_image
+            context_info: Optional additional context about the image
+            location_guess: Optional user's guess of the location
+            
+        Returns:
+            Dictionary containing the analysis and location information.
+            See locate_with_gemini method for detailed return structure.
+        """
+        return Conversation(self, handle).locate(context_info, location_guess)
+    
+    def locate_uploaded(self, 
+                        image: Union[str, bytes, bytearray, memoryview, BinaryIO], 
+                        context_info: Optional[str] = None, 
+                        location_guess: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Geolocate an image by reference, uploading it only the first time it is seen.
+        
+        Re-running the same image with different context or hints reuses the
+        cached handle, so only the new text is sent.
+        
+        Args:
+            image: Path or URL of the image, or in-memory image data
+            context_info: Optional additional context about the image
+            location_guess: Optional user's guess of the location
+            
+        Returns:
+            Dictionary containing the analysis and location information.
+            See locate_with_gemini method for detailed return structure.
+        """
+        try:
+            raw_data = self.load_image_bytes(image) if isinstance(image, str) else read_buffer(image)
+            if self.exif_mode != "ignore":
+                context_info, shortcut = self.apply_exif(raw_data, context_info)
+                if shortcut is not None:
+                    return shortcut
+            handle = self.upload_image(raw_data)
+            result = self.locate_handle(handle, context_info, location_guess)
+            if result.get("status_code") in (403, 404):
+                # Gemini no longer has the file (deleted early or uploaded with another key)
+                self.handle_cache.forget(handle.sha256)
+                result = self.locate_handle(self.upload_image(raw_data), context_info, location_guess)
+            return result
+        except Exception as e:
+            return {"error": f"Failed to process image: {str(e)}"}
+    
+    def conversation(self, image: Union[str, bytes, bytearray, memoryview, BinaryIO, ImageHandle]) -> Conversation:
+        """
+        Start a multi-turn conversation about an image (uploaded once, see upload_image).
+        
+        Args:
+            image: An ImageHandle, or an image to upload (path, URL or in-memory data)
+            
+        Returns:
+            Conversation whose locate() and ask() send only new text
+            
+        Raises:
+            ValueError: If the image cannot be loaded or uploaded
+        """
+        handle = image if isinstance(image, ImageHandle) else self.upload_image(image)
+        return Conversation(self, handle)
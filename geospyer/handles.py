@@ -0,0 +1,204 @@
+"""
+Upload-once image handles for GeoSpy.
+
+An image is uploaded to the Gemini Files API once and referenced by its file
+URI afterwards, so re-analysing it with different context or asking follow-up
+questions sends only text. Handles are cached by image content hash until
+shortly before Gemini deletes the file (48 hours after upload), optionally in
+a JSON file so separate command-line runs share them.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Resumable upload endpoint of the Gemini Files API
+FILES_UPLOAD_URL = "https://generativelanguage.googleapis.com/upload/v1beta/files"
+
+# Gemini keeps uploaded files for 48 hours; used when the upload response has no expiry
+DEFAULT_FILE_TTL = 48 * 3600
+
+# Handles this close to expiry are treated as expired, so a request never races the deletion
+EXPIRY_MARGIN = 600
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Convert an RFC 3339 timestamp (as returned by the Files API) to epoch seconds."""
+    if not value:
+        return None
+    try:
+        text = value.rstrip("Z")
+        if "." in text:
+            # Python parses at most microseconds; the API may send nanoseconds
+            whole, fraction = text.split(".", 1)
+            text = f"{whole}.{fraction[:6]}"
+        parsed = datetime.fromisoformat(text)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    except ValueError:
+        return None
+
+
+class ImageHandle:
+    """Reference to an image uploaded to the Gemini Files API."""
+
+    def __init__(self, name: str, uri: str, mime_type: str, size_bytes: int,
+                 expires_at: float, sha256: str):
+        self.name = name
+        self.uri = uri
+        self.mime_type = mime_type
+        self.size_bytes = size_bytes
+        self.expires_at = expires_at
+        self.sha256 = sha256
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at - EXPIRY_MARGIN
+
+    def part(self) -> Dict[str, Any]:
+        """Request part referencing the uploaded image."""
+        return {"file_data": {"mime_type": self.mime_type, "file_uri": self.uri}}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "uri": self.uri, "mime_type": self.mime_type,
+                "size_bytes": self.size_bytes, "expires_at": self.expires_at, "sha256": self.sha256}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ImageHandle":
+        return cls(data["name"], data["uri"], data["mime_type"], int(data["size_bytes"]),
+                   float(data["expires_at"]), data["sha256"])
+
+
+class HandleCache:
+    """
+    Thread-safe cache of uploaded image handles keyed by image content hash.
+
+    With a path, handles are loaded from and saved to a JSON file. Expired
+    handles are dropped when looked up or saved.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Optional JSON file persisting handles between processes
+        """
+        self.path = path
+        self._handles: Dict[str, ImageHandle] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    for data in json.load(f):
+                        handle = ImageHandle.from_dict(data)
+                        if not handle.expired:
+                            self._handles[handle.sha256] = handle
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Warning: ignoring unreadable image handle cache {path}: {str(e)}")
+
+    def get(self, sha256: str) -> Optional[ImageHandle]:
+        """Return the live handle for an image hash, or None."""
+        with self._lock:
+            handle = self._handles.get(sha256)
+            if handle is not None and handle.expired:
+                del self._handles[sha256]
+                return None
+            return handle
+
+    def put(self, handle: ImageHandle) -> None:
+        with self._lock:
+            self._handles[handle.sha256] = handle
+            self._save()
+
+    def forget(self, sha256: str) -> None:
+        """Drop a handle (e.g. when Gemini no longer knows the file)."""
+        with self._lock:
+            if self._handles.pop(sha256, None) is not None:
+                self._save()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        live = [handle.to_dict() for handle in self._handles.values() if not handle.expired]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(live, f)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+
+class Conversation:
+    """
+    Multi-turn analysis of one uploaded image.
+
+    The image is referenced by its file URI in the first turn, so every
+    later request carries only text (the earlier turns and the new question).
+
+    Example:
+        conversation = geospy.conversation("photo.jpg")
+        result = conversation.locate(context_info="Taken in winter")
+        answer = conversation.ask("What language is the shop sign in?")
+        print(answer["answer"])
+    """
+
+    def __init__(self, geospy, handle: ImageHandle):
+        """
+        Args:
+            geospy: GeoSpy client used to send the requests
+            handle: Uploaded image the conversation is about
+        """
+        self.geospy = geospy
+        self.handle = handle
+        self.contents: List[Dict[str, Any]] = []
+
+    def _user_turn(self, text: str) -> Dict[str, Any]:
+        parts: List[Dict[str, Any]] = [{"text": text}]
+        if not self.contents:
+            parts.insert(0, self.handle.part())
+        return {"role": "user", "parts": parts}
+
+    def _send(self, text: str) -> Dict[str, Any]:
+        """Send one user turn; returns {"text": ..., "response": ...} or an error dictionary."""
+        if self.handle.expired:
+            return {"error": "The uploaded image has expired. Start a new conversation to upload it again."}
+        turn = self._user_turn(text)
+        body = self.geospy.build_request_body_from_contents(self.contents + [turn])
+        response, error = self.geospy.send_request(body)
+        if error is not None:
+            return error
+        try:
+            reply = response.json()["candidates"][0]["content"]["parts"][0]["text"]
+        except Exception as e:
+            return {"error": "Failed to process API response", "exception": str(e)}
+        self.contents += [turn, {"role": "model", "parts": [{"text": reply}]}]
+        return {"text": reply, "response": response}
+
+    def locate(self, context_info: Optional[str] = None,
+               location_guess: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Ask for the image's location (again, e.g. with new context).
+
+        Returns:
+            Result in the locate_with_gemini format
+        """
+        sent = self._send(self.geospy.build_prompt(context_info, location_guess))
+        if "error" in sent:
+            return sent
+        return self.geospy.parse_response(sent["response"])
+
+    def ask(self, question: str) -> Dict[str, Any]:
+        """
+        Ask a free-form follow-up question about the image.
+
+        Returns:
+            {"answer": str}, or an error dictionary
+        """
+        sent = self._send(f"{question}\n\nAnswer in plain text; the JSON format only applies to location analysis.")
+        if "error" in sent:
+            return sent
+        return {"answer": sent["text"].strip()}
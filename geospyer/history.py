@@ -0,0 +1,209 @@
+"""
+Persistent analysis history for GeoSpy front ends.
+
+Every finished analysis is stored in a SQLite file with its top prediction
+broken out into indexed columns, so listing, filtering and sorting happen in
+SQL one page at a time. The full result JSON and the thumbnail are only read
+when a single entry is opened; thumbnails live in their own table so list
+queries never touch image data.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .export import _to_float
+
+# Columns the history can be sorted by (public name -> SQL column)
+SORT_COLUMNS = {
+    "created_at": "created_at",
+    "country": "country",
+    "city": "city",
+    "confidence": "confidence_rank",
+    "source": "source",
+}
+
+# Stored with each entry so confidence sorts High > Medium > Low instead of alphabetically
+_CONFIDENCE_RANKS = {"High": 3, "Medium": 2, "Low": 1}
+
+# Columns returned by query(); result and thumbnail are fetched separately
+_LIST_COLUMNS = ("id", "created_at", "source", "status", "country", "state", "city",
+                 "confidence", "latitude", "longitude", "error", "has_thumbnail")
+
+
+class HistoryStore:
+    """
+    Analysis history stored in a single SQLite database file.
+
+    One connection is shared between threads (Streamlit runs each session in
+    its own thread) and serialised with a lock.
+    """
+
+    def __init__(self, path: str, journal_mode: str = "WAL", timeout: float = 30):
+        """
+        Args:
+            path: Path to the SQLite database file (created if missing)
+            journal_mode: SQLite journal mode (WAL for local disks, DELETE for shared filesystems)
+            timeout: Seconds to wait for a database lock held by another process
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                source TEXT NOT NULL,
+                image_hash TEXT,
+                status TEXT NOT NULL,
+                country TEXT,
+                state TEXT,
+                city TEXT,
+                confidence TEXT,
+                confidence_rank INTEGER NOT NULL DEFAULT 0,
+                latitude REAL,
+                longitude REAL,
+                error TEXT,
+                has_thumbnail INTEGER NOT NULL DEFAULT 0,
+                result TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS thumbnails (
+                analysis_id INTEGER PRIMARY KEY REFERENCES analyses (id) ON DELETE CASCADE,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS analyses_created ON analyses (created_at);
+            CREATE INDEX IF NOT EXISTS analyses_country ON analyses (country, created_at);
+            CREATE INDEX IF NOT EXISTS analyses_confidence ON analyses (confidence, created_at);
+            CREATE INDEX IF NOT EXISTS analyses_confidence_rank ON analyses (confidence_rank, created_at);
+        """)
+
+    def add(self, source: str, result: Dict[str, Any], image_hash: Optional[str] = None,
+            thumbnail: Optional[bytes] = None, created_at: Optional[float] = None) -> int:
+        """
+        Store a finished analysis.
+
+        Args:
+            source: Image name, path or URL
+            result: Dictionary returned by GeoSpy (errors are stored too)
+            image_hash: Optional SHA-256 of the image bytes
+            thumbnail: Optional small encoded preview image
+            created_at: Timestamp (defaults to now)
+
+        Returns:
+            The new entry's id
+        """
+        top = (result.get("locations") or [{}])[0] if "error" not in result else {}
+        coords = top.get("coordinates") or {}
+        confidence = top.get("confidence")
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(
+                    "INSERT INTO analyses (created_at, source, image_hash, status, country, state, city, confidence, "
+                    "confidence_rank, latitude, longitude, error, has_thumbnail, result) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (created_at or time.time(), source, image_hash, "failed" if "error" in result else "done",
+                     top.get("country") or None, top.get("state") or None, top.get("city") or None, confidence,
+                     _CONFIDENCE_RANKS.get(confidence, 0), _to_float(coords.get("latitude")),
+                     _to_float(coords.get("longitude")), result.get("error"), int(thumbnail is not None),
+                     json.dumps(result))
+                )
+                entry_id = cursor.lastrowid
+                if thumbnail is not None:
+                    self.conn.execute("INSERT INTO thumbnails (analysis_id, data) VALUES (?, ?)",
+                                      (entry_id, thumbnail))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return entry_id
+
+    def query(self, country: Optional[str] = None, confidence: Optional[List[str]] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              failed: Optional[bool] = None, sort: str = "created_at", descending: bool = True,
+              limit: int = 25, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Return one page of history entries and the total number of matches.
+
+        Args:
+            country: Only entries whose top prediction is in this country
+            confidence: Only entries whose top prediction has one of these confidence levels
+            since: Only entries created at or after this timestamp
+            until: Only entries created before this timestamp
+            failed: True for failed analyses only, False for successful ones only
+            sort: One of SORT_COLUMNS
+            descending: Sort order
+            limit: Page size
+            offset: Number of matching entries to skip
+
+        Returns:
+            Tuple of (entries without result or thumbnail data, total matches)
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of: {', '.join(SORT_COLUMNS)}")
+
+        clauses, params = [], []
+        if country:
+            clauses.append("country = ?")
+            params.append(country)
+        if confidence:
+            clauses.append(f"confidence IN ({', '.join('?' * len(confidence))})")
+            params.extend(confidence)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if failed is not None:
+            clauses.append("status = ?")
+            params.append("failed" if failed else "done")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "DESC" if descending else "ASC"
+        # Ties are broken newest first, matching the (column, created_at) indexes
+        order_by = f"{SORT_COLUMNS[sort]} {order}, "
+        if sort != "created_at":
+            order_by += f"created_at {order}, "
+
+        with self._lock:
+            total = self.conn.execute(f"SELECT COUNT(*) FROM analyses {where}", params).fetchone()[0]
+            rows = self.conn.execute(
+                f"SELECT {', '.join(_LIST_COLUMNS)} FROM analyses {where} "
+                f"ORDER BY {order_by}id {order} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [dict(zip(_LIST_COLUMNS, row)) for row in rows], total
+
+    def countries(self) -> List[str]:
+        """Distinct top-prediction countries, for filter options."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT country FROM analyses WHERE country IS NOT NULL ORDER BY country"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_result(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """Load the full stored result of one entry."""
+        with self._lock:
+            row = self.conn.execute("SELECT result FROM analyses WHERE id = ?", (entry_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_thumbnail(self, entry_id: int) -> Optional[bytes]:
+        """Load the thumbnail of one entry, if it has one."""
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM thumbnails WHERE analysis_id = ?", (entry_id,)).fetchone()
+        return row[0] if row else None
+
+    def delete(self, entry_id: int) -> bool:
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("DELETE FROM thumbnails WHERE analysis_id = ?", (entry_id,))
+            cursor = self.conn.execute("DELETE FROM analyses WHERE id = ?", (entry_id,))
+            self.conn.execute("COMMIT")
+        return cursor.rowcount == 1
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,164 @@
+"""
+Image helpers for GeoSpy.
+
+Format sniffing and re-encoding used to make sure the bytes sent to Gemini
+are labelled with the right MIME type and are in a format the API accepts.
+Pillow is only imported when an image actually has to be re-encoded.
+"""
+
+import io
+from typing import BinaryIO, Optional, Tuple, Union
+
+# Formats Gemini accepts inline; anything else is converted to JPEG before upload
+SUPPORTED_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/heic", "image/heif"}
+
+
+def read_buffer(data: Union[bytes, bytearray, memoryview, BinaryIO]) -> bytes:
+    """
+    Return the bytes of an in-memory image.
+
+    Args:
+        data: bytes, any buffer-protocol object (bytearray, memoryview) or a
+            binary file-like object, which is read from its current position
+
+    Returns:
+        Image bytes (bytes objects are returned without copying)
+    """
+    if isinstance(data, bytes):
+        return data
+    if hasattr(data, "read"):
+        return data.read()
+    return bytes(memoryview(data))
+
+
+def detect_mime_type(data: bytes) -> Optional[str]:
+    """
+    Identify an image format from its leading magic bytes.
+
+    Args:
+        data: The image bytes (only the first 16 bytes are inspected)
+
+    Returns:
+        MIME type string, or None if the format is not recognised
+    """
+    head = bytes(data[:16])
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"BM"):
+        return "image/bmp"
+    if head.startswith((b"II*\x00", b"MM\x00*")):
+        return "image/tiff"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "image/heic"
+    return None
+
+
+def encode_jpeg(image, quality: int = 85, max_dimension: Optional[int] = None) -> bytes:
+    """
+    Encode a PIL image as JPEG, optionally downscaling it first.
+
+    Args:
+        image: PIL Image
+        quality: JPEG quality (1-95)
+        max_dimension: Longest side in pixels after resizing (None keeps the size)
+
+    Returns:
+        JPEG encoded bytes
+    """
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    if max_dimension and max(image.size) > max_dimension:
+        image = image.copy()
+        image.thumbnail((max_dimension, max_dimension))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def prepare_image_bytes(data: bytes) -> Tuple[bytes, str]:
+    """
+    Return image bytes in a Gemini-supported format along with their MIME type.
+
+    Supported formats pass through untouched; others (GIF, BMP, TIFF, unknown)
+    are decoded and re-encoded as JPEG. For animated images only the first
+    frame is kept; use sequence mode to analyse several frames.
+
+    Args:
+        data: Raw image bytes
+
+    Returns:
+        Tuple of (image bytes, MIME type)
+
+    Raises:
+        ValueError: If the data cannot be decoded as an image
+    """
+    mime_type = detect_mime_type(data)
+    if mime_type in SUPPORTED_MIME_TYPES:
+        return data, mime_type
+
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            return encode_jpeg(img), "image/jpeg"
+    except Exception as e:
+        raise ValueError(f"Unsupported or corrupt image data: {str(e)}")
+
+
+def make_preview(data: bytes, max_dimension: int = 800, quality: int = 80,
+                 image_format: str = "WEBP") -> Tuple[bytes, str]:
+    """
+    Encode a bounded-size preview of an image for display.
+
+    JPEGs are decoded at reduced resolution (draft mode), so even large photos
+    are cheap to preview. Animated images use their first frame. Falls back to
+    JPEG when Pillow was built without WebP support.
+
+    Args:
+        data: Raw image bytes
+        max_dimension: Longest side of the preview in pixels
+        quality: Encoder quality (1-95)
+        image_format: "WEBP" or "JPEG"
+
+    Returns:
+        Tuple of (encoded bytes, MIME type)
+
+    Raises:
+        ValueError: If the data cannot be decoded as an image
+    """
+    try:
+        from PIL import Image, features
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("RGB", (max_dimension, max_dimension))
+            if image_format.upper() != "WEBP" or not features.check("webp"):
+                return encode_jpeg(img, quality=quality, max_dimension=max_dimension), "image/jpeg"
+            img = img.convert("RGB")
+            img.thumbnail((max_dimension, max_dimension))
+            buffer = io.BytesIO()
+            img.save(buffer, format="WEBP", quality=quality, method=4)
+            return buffer.getvalue(), "image/webp"
+    except Exception as e:
+        raise ValueError(f"Unsupported or corrupt image data: {str(e)}")
+
+
+def make_thumbnail(data: bytes, max_dimension: int = 256, quality: int = 80) -> bytes:
+    """
+    Encode a small JPEG thumbnail of an image (see make_preview).
+
+    Args:
+        data: Raw image bytes
+        max_dimension: Longest side of the thumbnail in pixels
+        quality: JPEG quality (1-95)
+
+    Returns:
+        JPEG encoded bytes
+
+    Raises:
+        ValueError: If the data cannot be decoded as an image
+    """
+    return make_preview(data, max_dimension=max_dimension, quality=quality, image_format="JPEG")[0]
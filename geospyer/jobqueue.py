@@ -0,0 +1,483 @@
+"""
+Durable job queue for large GeoSpy backlogs.
+
+Images are enqueued into a persistent queue and processed by any number of
+worker processes, on one machine or several sharing the queue file. Workers
+lease jobs for a visibility timeout; a job whose worker dies is leased again
+once the timeout expires. Failed analyses are retried with exponential
+backoff up to a per-job attempt limit, and results are written back into the
+queue so they can be exported at any point.
+
+Backends:
+    - SQLiteQueue: a single SQLite file, no broker required (default)
+    - MemoryQueue: an in-process stand-in with the same interface, for
+      library use and tests (its jobs are lost when the process exits, so
+      the CLI queue commands do not accept it)
+"""
+
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .cascade import CascadePolicy
+from .circuit import CircuitBreaker
+from .geospy import DEFAULT_MODEL, GeoSpy
+
+# Job states
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+def is_retryable(result: Dict[str, Any]) -> bool:
+    """Return True if a failed result looks transient (API, network or parsing) rather than a bad input."""
+    return not str(result.get("error", "")).startswith("Failed to process image")
+
+
+class QueueBackend(ABC):
+    """
+    Interface implemented by job queue backends.
+
+    Leased jobs are dictionaries with the keys id, image, context, guess,
+    attempts and max_attempts.
+    """
+
+    @abstractmethod
+    def enqueue(self, images: Iterable[str], context_info: Optional[str] = None,
+                location_guess: Optional[str] = None, max_attempts: int = 3) -> int:
+        """Add images to the queue, returning how many jobs were created."""
+
+    @abstractmethod
+    def lease(self, worker_id: str, visibility_timeout: float, limit: int = 1) -> List[Dict[str, Any]]:
+        """Lease up to limit available jobs for visibility_timeout seconds."""
+
+    @abstractmethod
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Store a successful result. Returns False if the lease was lost to another worker."""
+
+    @abstractmethod
+    def fail(self, job_id: int, worker_id: str, result: Dict[str, Any],
+             retry: bool = True, base_delay: float = 30) -> str:
+        """Record a failed attempt, requeueing with backoff if attempts remain. Returns the new status."""
+
+    @abstractmethod
+    def release(self, job_id: int, worker_id: str, delay: float = 0) -> bool:
+        """
+        Return a leased job to the queue without counting the attempt (nothing was sent).
+
+        Returns False if the lease was lost to another worker.
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Return the number of jobs in each state."""
+
+    @abstractmethod
+    def iter_results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (image, result) for every finished job, successful or failed."""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteQueue(QueueBackend):
+    """
+    Job queue stored in a single SQLite database file.
+
+    Leasing runs inside a write transaction, so any number of processes can
+    share the file safely. WAL mode is used by default; pass
+    journal_mode="DELETE" when the file lives on a network filesystem shared
+    between hosts, where WAL is not supported.
+    """
+
+    def __init__(self, path: str, journal_mode: str = "WAL", timeout: float = 60):
+        """
+        Args:
+            path: Path to the SQLite database file (created if missing)
+            journal_mode: SQLite journal mode (WAL for local disks, DELETE for shared filesystems)
+            timeout: Seconds to wait for a database lock held by another worker
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                image TEXT NOT NULL,
+                context TEXT,
+                guess TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                lease_owner TEXT,
+                lease_expires REAL,
+                available_at REAL NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+        """)
+
+    def enqueue(self, images: Iterable[str], context_info: Optional[str] = None,
+                location_guess: Optional[str] = None, max_attempts: int = 3,
+                chunk_size: int = 1000) -> int:
+        count = 0
+        chunk = []
+
+        def flush():
+            now = time.time()
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "INSERT INTO jobs (image, context, guess, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(image, context_info, location_guess, max_attempts, now, now, now) for image in chunk]
+            )
+            self.conn.execute("COMMIT")
+
+        # Insert in chunks so huge batch files never sit in memory
+        for image in images:
+            chunk.append(image)
+            count += 1
+            if len(chunk) >= chunk_size:
+                flush()
+                chunk = []
+        if chunk:
+            flush()
+        return count
+
+    def lease(self, worker_id: str, visibility_timeout: float, limit: int = 1) -> List[Dict[str, Any]]:
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Leases that expired on their final attempt are given up on
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Lease expired after final attempt', updated_at = ? "
+                "WHERE status = ? AND lease_expires <= ? AND attempts >= max_attempts",
+                (FAILED, now, LEASED, now)
+            )
+            rows = self.conn.execute(
+                "SELECT id, image, context, guess, attempts, max_attempts FROM jobs "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires <= ?) "
+                "ORDER BY id LIMIT ?",
+                (QUEUED, now, LEASED, now, limit)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                [(LEASED, worker_id, now + visibility_timeout, now, row[0]) for row in rows]
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return [
+            {"id": row[0], "image": row[1], "context": row[2], "guess": row[3],
+             "attempts": row[4] + 1, "max_attempts": row[5]}
+            for row in rows
+        ]
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = ?",
+            (DONE, json.dumps(result), time.time(), job_id, worker_id, LEASED)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, result: Dict[str, Any],
+             retry: bool = True, base_delay: float = 30) -> str:
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ? AND status = ?",
+                (job_id, worker_id, LEASED)
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return LEASED  # Lease lost; another worker owns the job now
+            attempts, max_attempts = row
+            status = QUEUED if retry and attempts < max_attempts else FAILED
+            delay = base_delay * (2 ** (attempts - 1))
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_owner = NULL, lease_expires = NULL, "
+                "available_at = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result), result.get("error"), now + delay, now, job_id)
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return status
+
+    def release(self, job_id: int, worker_id: str, delay: float = 0) -> bool:
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, lease_expires = NULL, "
+            "available_at = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+            (QUEUED, now + delay, now, job_id, worker_id, LEASED)
+        )
+        return cursor.rowcount == 1
+
+    def stats(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for status, count in self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def iter_results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Page by id so exporting a huge queue never loads every result at once
+        last_id = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT id, image, result, error FROM jobs WHERE status IN (?, ?) AND id > ? ORDER BY id LIMIT 500",
+                (DONE, FAILED, last_id)
+            ).fetchall()
+            if not rows:
+                break
+            for job_id, image, result, error in rows:
+                yield image, json.loads(result) if result else {"error": error or "Unknown error"}
+            last_id = rows[-1][0]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class MemoryQueue(QueueBackend):
+    """
+    In-process queue with the same semantics as SQLiteQueue.
+
+    Nothing is persisted and jobs cannot be shared between processes, so it
+    is only suitable as a local stand-in (for example with threaded workers).
+    """
+
+    def __init__(self):
+        self._jobs: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def enqueue(self, images: Iterable[str], context_info: Optional[str] = None,
+                location_guess: Optional[str] = None, max_attempts: int = 3) -> int:
+        count = 0
+        now = time.time()
+        with self._lock:
+            for image in images:
+                self._jobs[self._next_id] = {
+                    "id": self._next_id, "image": image, "context": context_info, "guess": location_guess,
+                    "status": QUEUED, "attempts": 0, "max_attempts": max_attempts,
+                    "lease_owner": None, "lease_expires": None, "available_at": now, "result": None,
+                }
+                self._next_id += 1
+                count += 1
+        return count
+
+    def lease(self, worker_id: str, visibility_timeout: float, limit: int = 1) -> List[Dict[str, Any]]:
+        now = time.time()
+        leased = []
+        with self._lock:
+            for job in self._jobs.values():
+                if len(leased) >= limit:
+                    break
+                expired = job["status"] == LEASED and job["lease_expires"] <= now
+                if expired and job["attempts"] >= job["max_attempts"]:
+                    job["status"] = FAILED
+                    job["result"] = {"error": "Lease expired after final attempt"}
+                    continue
+                if (job["status"] == QUEUED and job["available_at"] <= now) or expired:
+                    job.update(status=LEASED, lease_owner=worker_id,
+                               lease_expires=now + visibility_timeout, attempts=job["attempts"] + 1)
+                    leased.append({k: job[k] for k in ("id", "image", "context", "guess", "attempts", "max_attempts")})
+        return leased
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["lease_owner"] != worker_id or job["status"] != LEASED:
+                return False
+            job.update(status=DONE, result=result, lease_owner=None, lease_expires=None)
+            return True
+
+    def fail(self, job_id: int, worker_id: str, result: Dict[str, Any],
+             retry: bool = True, base_delay: float = 30) -> str:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["lease_owner"] != worker_id or job["status"] != LEASED:
+                return LEASED
+            status = QUEUED if retry and job["attempts"] < job["max_attempts"] else FAILED
+            job.update(status=status, result=result, lease_owner=None, lease_expires=None,
+                       available_at=time.time() + base_delay * (2 ** (job["attempts"] - 1)))
+            return status
+
+    def release(self, job_id: int, worker_id: str, delay: float = 0) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["lease_owner"] != worker_id or job["status"] != LEASED:
+                return False
+            job.update(status=QUEUED, attempts=max(job["attempts"] - 1, 0), lease_owner=None,
+                       lease_expires=None, available_at=time.time() + delay)
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+        return counts
+
+    def iter_results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            finished = [(job["image"], job["result"]) for job in self._jobs.values()
+                        if job["status"] in (DONE, FAILED)]
+        return iter(finished)
+
+
+_memory_queues: Dict[str, MemoryQueue] = {}
+
+
+def open_queue(spec: str, journal_mode: str = "WAL") -> QueueBackend:
+    """
+    Open a queue backend from a specification string.
+
+    Args:
+        spec: "memory://<name>" for an in-process queue, otherwise a path to
+            an SQLite file (optionally prefixed with "sqlite://")
+        journal_mode: SQLite journal mode (use DELETE on shared network filesystems)
+
+    Returns:
+        A QueueBackend instance
+    """
+    if spec.startswith("memory://"):
+        return _memory_queues.setdefault(spec, MemoryQueue())
+    if spec.startswith("sqlite://"):
+        spec = spec[len("sqlite://"):]
+    return SQLiteQueue(spec, journal_mode=journal_mode)
+
+
+def run_worker(queue_spec: str, api_key: Optional[str] = None, worker_id: Optional[str] = None,
+               visibility_timeout: float = 300, poll_interval: float = 2, retry_delay: float = 30,
+               exit_when_empty: bool = False, journal_mode: str = "WAL",
+               exif_mode: str = "ignore", model: str = DEFAULT_MODEL,
+               cascade_models: Optional[List[str]] = None,
+               circuit_breaker: Union[bool, CircuitBreaker] = True) -> int:
+    """
+    Process jobs from a queue until interrupted (or until it is empty).
+
+    Args:
+        queue_spec: Queue specification passed to open_queue
+        api_key: Gemini API key (defaults to GEMINI_API_KEY)
+        worker_id: Unique lease owner name (defaults to host:pid:thread)
+        visibility_timeout: Seconds a leased job stays hidden from other workers
+        poll_interval: Seconds to wait when no job is available
+        retry_delay: Base delay in seconds before a failed job is retried
+        exit_when_empty: Stop once no queued or leased jobs remain
+        journal_mode: SQLite journal mode
+        exif_mode: How embedded EXIF metadata is used (see GeoSpy)
+        model: Gemini model used when not cascading
+        cascade_models: Optional model tiers, cheapest first (see CascadePolicy)
+        circuit_breaker: Pause leasing while Gemini is failing instead of burning
+            through job attempts; pass a CircuitBreaker to share one between threads
+
+    Returns:
+        Number of jobs processed by this worker
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    backend = open_queue(queue_spec, journal_mode=journal_mode)
+    cascade = CascadePolicy(cascade_models) if cascade_models else None
+    geospy = GeoSpy(api_key=api_key, pool_size=1, exif_mode=exif_mode, model=model, cascade=cascade,
+                    circuit_breaker=circuit_breaker if isinstance(circuit_breaker, CircuitBreaker)
+                    else CircuitBreaker() if circuit_breaker else None)
+    processed = 0
+
+    try:
+        while True:
+            jobs = backend.lease(worker_id, visibility_timeout)
+            if not jobs:
+                if exit_when_empty:
+                    stats = backend.stats()
+                    if stats[QUEUED] == 0 and stats[LEASED] == 0:
+                        break
+                time.sleep(poll_interval)
+                continue
+
+            for job in jobs:
+                try:
+                    result = geospy.locate(job["image"], job["context"], job["guess"])
+                except Exception as e:
+                    result = {"error": f"Unexpected error during analysis: {str(e)}"}
+
+                if result.get("circuit_open"):
+                    # Nothing was sent, so the attempt does not count; leave the queue alone
+                    # until the circuit lets probes through
+                    wait = geospy.circuit_breaker.retry_after()
+                    backend.release(job["id"], worker_id, delay=wait)
+                    print(f"[{worker_id}] job {job['id']} released: circuit open, pausing {wait:.0f} seconds")
+                    time.sleep(wait)
+                    continue
+                if "error" in result:
+                    status = backend.fail(job["id"], worker_id, result,
+                                          retry=is_retryable(result), base_delay=retry_delay)
+                    print(f"[{worker_id}] job {job['id']} attempt {job['attempts']}/{job['max_attempts']} "
+                          f"failed ({status}): {result['error']}")
+                else:
+                    backend.complete(job["id"], worker_id, result)
+                    print(f"[{worker_id}] job {job['id']} done: {job['image']}")
+                processed += 1
+    except KeyboardInterrupt:
+        pass  # Unfinished leases expire and are picked up by other workers
+    finally:
+        backend.close()
+    return processed
+
+
+def _run_threads(queue_spec: str, threads: int, kwargs: Dict[str, Any]) -> None:
+    """Run several workers as threads inside one process (the network call dominates, so threads scale well)."""
+    if kwargs.get("circuit_breaker", True) is True:
+        # One breaker per process, so an outage is detected once and probed by a single client
+        kwargs = dict(kwargs, circuit_breaker=CircuitBreaker())
+    if threads <= 1:
+        run_worker(queue_spec, **kwargs)
+        return
+    workers = [threading.Thread(target=run_worker, args=(queue_spec,), kwargs=kwargs, daemon=True)
+               for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def run_workers(queue_spec: str, processes: int = 1, threads: int = 1, **kwargs) -> None:
+    """
+    Start worker processes (each running one or more worker threads) and wait for them.
+
+    Args:
+        queue_spec: Queue specification passed to open_queue
+        processes: Number of worker processes
+        threads: Worker threads per process
+        **kwargs: Passed through to run_worker
+    """
+    if queue_spec.startswith("memory://") and processes > 1:
+        raise ValueError("The in-memory queue cannot be shared between processes; use an SQLite queue file")
+    if processes <= 1:
+        _run_threads(queue_spec, threads, kwargs)
+        return
+
+    workers = [multiprocessing.Process(target=_run_threads, args=(queue_spec, threads, kwargs))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.join(timeout=10)
@@ -0,0 +1,129 @@
+"""
+Merging of several location predictions into one ranked result.
+
+Used when one input is analysed as several requests (frames of an animation,
+tiles of a panorama). Locations from every partial result are clustered by
+great-circle distance (or by country/city when coordinates are missing), and
+each cluster is scored by the confidence and rank of its members, so places
+that several parts agree on rise to the top.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+CONFIDENCE_WEIGHTS = {"High": 3.0, "Medium": 2.0, "Low": 1.0}
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def location_coordinates(location: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """Return (lat, lng) for a location, or None if missing, invalid or the 0,0 placeholder."""
+    coords = location.get("coordinates") or {}
+    try:
+        lat, lng = float(coords.get("latitude")), float(coords.get("longitude"))
+    except (TypeError, ValueError):
+        return None
+    if lat == 0 and lng == 0:
+        return None
+    return lat, lng
+
+
+def _place_key(location: Dict[str, Any]) -> Tuple[str, str]:
+    return (str(location.get("country") or "").strip().lower(),
+            str(location.get("city") or "").strip().lower())
+
+
+def merge_predictions(results: Sequence[Dict[str, Any]],
+                      weights: Optional[Sequence[float]] = None,
+                      radius_km: float = 50.0,
+                      max_locations: int = 5,
+                      label: str = "parts") -> Dict[str, Any]:
+    """
+    Merge several locate() results into one ranked result.
+
+    Args:
+        results: Results from analysing parts of the same input
+        weights: Optional weight per result (e.g. tile area); defaults to 1.0
+        radius_km: Locations closer than this are treated as the same place
+        max_locations: Maximum number of merged locations returned
+        label: Name of the parts in the merged interpretation ("frames", "tiles")
+
+    Returns:
+        A result dictionary in the usual locate() format. Each location gains
+        "support" (number of parts that predicted it) and "agreement" (share
+        of successful parts). If every part failed, the first error is returned.
+    """
+    weights = list(weights) if weights is not None else [1.0] * len(results)
+    successful = [(i, r) for i, r in enumerate(results) if "error" not in r and r.get("locations")]
+    if not successful:
+        errors = [r for r in results if "error" in r]
+        return errors[0] if errors else {"error": f"No locations identified in any of the {len(results)} {label}"}
+
+    clusters: List[Dict[str, Any]] = []
+    for index, result in successful:
+        for rank, location in enumerate(result["locations"]):
+            # Higher confidence and higher rank within its own result count for more
+            score = weights[index] * CONFIDENCE_WEIGHTS.get(location.get("confidence"), 1.0) / (rank + 1)
+            coords = location_coordinates(location)
+            cluster = None
+            for candidate in clusters:
+                if coords and candidate["lat"] is not None:
+                    if haversine_km(coords[0], coords[1], candidate["lat"], candidate["lng"]) <= radius_km:
+                        cluster = candidate
+                        break
+                elif _place_key(location) == candidate["key"] and any(_place_key(location)):
+                    cluster = candidate
+                    break
+
+            if cluster is None:
+                cluster = {"key": _place_key(location), "lat": None, "lng": None, "coord_weight": 0.0,
+                           "score": 0.0, "sources": set(), "best": location, "best_score": 0.0}
+                clusters.append(cluster)
+
+            if coords:
+                # Keep a score-weighted centroid so the merged point follows agreeing predictions
+                total = cluster["coord_weight"] + score
+                if cluster["lat"] is None:
+                    cluster["lat"], cluster["lng"] = coords
+                else:
+                    cluster["lat"] = (cluster["lat"] * cluster["coord_weight"] + coords[0] * score) / total
+                    cluster["lng"] = (cluster["lng"] * cluster["coord_weight"] + coords[1] * score) / total
+                cluster["coord_weight"] = total
+            cluster["score"] += score
+            cluster["sources"].add(index)
+            if score > cluster["best_score"]:
+                cluster["best"], cluster["best_score"] = location, score
+
+    clusters.sort(key=lambda c: (len(c["sources"]), c["score"]), reverse=True)
+
+    locations = []
+    for cluster in clusters[:max_locations]:
+        merged = dict(cluster["best"])
+        if cluster["lat"] is not None:
+            merged["coordinates"] = {"latitude": round(cluster["lat"], 6), "longitude": round(cluster["lng"], 6)}
+        merged["support"] = len(cluster["sources"])
+        merged["agreement"] = round(len(cluster["sources"]) / len(successful), 3)
+        merged["score"] = round(cluster["score"], 3)
+        locations.append(merged)
+
+    # Use the interpretation of the part that backs the winning location most strongly
+    top_sources = clusters[0]["sources"]
+    lead = max((r for i, r in successful if i in top_sources),
+               key=lambda r: CONFIDENCE_WEIGHTS.get(r["locations"][0].get("confidence"), 1.0))
+    interpretation = lead.get("interpretation", "")
+
+    return {
+        "interpretation": f"[Merged from {len(successful)} of {len(results)} {label}] {interpretation}",
+        "locations": locations,
+        "merged_from": len(successful),
+        "failed_parts": len(results) - len(successful),
+    }
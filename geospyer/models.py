@@ -0,0 +1,283 @@
+"""
+Typed result models for GeoSpy.
+
+GeoSpy returns plain dictionaries (as described in locate_with_gemini); these
+classes wrap them for code that handles many results. Location and
+LocationResult use __slots__, so each location is one small object instead of
+two dictionaries, and their fields are validated and normalized once:
+confidence is one of High/Medium/Low and coordinates are floats in range, or
+None when missing, invalid or the 0,0 placeholder. to_dict() returns the
+original dictionary format.
+
+LocationBatch stores the locations of many results column-wise in NumPy
+arrays (latitude, longitude, confidence rank, result and rank indices) for
+vectorized filtering, centring and distance calculations over a whole batch.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .cascade import CONFIDENCE_RANKS
+from .merge import EARTH_RADIUS_KM
+
+_LOCATION_FIELDS = ("country", "state", "city", "confidence", "coordinates", "explanation")
+_CONFIDENCE_NAMES = {name.lower(): name for name in CONFIDENCE_RANKS}
+
+
+def haversine_km_array(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Great-circle distances in km between arrays of points (broadcasting; NaN propagates).
+
+    Args:
+        lat1, lon1: Coordinates in degrees, e.g. shape (n, 1) for the true positions
+        lat2, lon2: Coordinates in degrees, e.g. shape (n, k) for the top-k predictions
+
+    Returns:
+        Array of distances in kilometres
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _text(value: Any) -> str:
+    return str(value).strip() if value is not None else ""
+
+
+def _coordinate(value: Any, limit: float) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number or abs(number) > limit:  # NaN or out of range
+        return None
+    return number
+
+
+class Location:
+    """One predicted location."""
+
+    __slots__ = ("country", "state", "city", "confidence", "latitude", "longitude", "explanation", "extra")
+
+    def __init__(self, country: str = "", state: str = "", city: str = "", confidence: str = "Medium",
+                 latitude: Optional[float] = None, longitude: Optional[float] = None,
+                 explanation: str = "", extra: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            country, state, city: Place names (stripped; None becomes "")
+            confidence: "High", "Medium" or "Low" in any case; anything else becomes "Medium"
+            latitude, longitude: Degrees; invalid, out-of-range or 0,0 coordinates become None
+            explanation: The model's reasoning
+            extra: Any other keys of the location dictionary (e.g. "support" of merged results)
+        """
+        self.country = _text(country)
+        self.state = _text(state)
+        self.city = _text(city)
+        self.confidence = _CONFIDENCE_NAMES.get(_text(confidence).lower(), "Medium")
+        lat, lng = _coordinate(latitude, 90.0), _coordinate(longitude, 180.0)
+        if lat is None or lng is None or (lat == 0 and lng == 0):
+            lat = lng = None
+        self.latitude = lat
+        self.longitude = lng
+        self.explanation = _text(explanation)
+        self.extra = extra or None  # Usually empty; saves a dict per object
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Location":
+        coords = data.get("coordinates") or {}
+        return cls(
+            country=data.get("country"),
+            state=data.get("state"),
+            city=data.get("city"),
+            confidence=data.get("confidence"),
+            latitude=coords.get("latitude") if isinstance(coords, dict) else None,
+            longitude=coords.get("longitude") if isinstance(coords, dict) else None,
+            explanation=data.get("explanation"),
+            extra={key: value for key, value in data.items() if key not in _LOCATION_FIELDS}
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the location in the locate_with_gemini format (0, 0 when there are no coordinates)."""
+        return {
+            "country": self.country,
+            "state": self.state,
+            "city": self.city,
+            "confidence": self.confidence,
+            "coordinates": {"latitude": self.latitude if self.latitude is not None else 0,
+                            "longitude": self.longitude if self.longitude is not None else 0},
+            "explanation": self.explanation,
+            **(self.extra or {}),
+        }
+
+    @property
+    def coordinates(self) -> Optional[Tuple[float, float]]:
+        """(lat, lng), or None when the model gave no usable coordinates."""
+        return (self.latitude, self.longitude) if self.latitude is not None else None
+
+    @property
+    def confidence_rank(self) -> int:
+        return CONFIDENCE_RANKS[self.confidence]
+
+    @property
+    def label(self) -> str:
+        """Human-readable place name, e.g. "Paris, Île-de-France, France"."""
+        return ", ".join(part for part in (self.city, self.state, self.country) if part) or "Unknown location"
+
+    def __repr__(self) -> str:
+        return f"Location({self.label!r}, {self.confidence}, {self.coordinates})"
+
+
+class LocationResult:
+    """A GeoSpy result: the interpretation and ranked locations, or an error."""
+
+    __slots__ = ("interpretation", "locations", "error", "extra")
+
+    def __init__(self, interpretation: str = "", locations: Optional[List[Location]] = None,
+                 error: Optional[str] = None, extra: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            interpretation: The model's description of the image
+            locations: Ranked predictions, most likely first
+            error: Error message of a failed analysis
+            extra: Any other keys of the result (details, cascade, two_pass, usage, ...)
+        """
+        self.interpretation = _text(interpretation)
+        self.locations = locations or []
+        self.error = error
+        self.extra = extra or None  # Usually empty; saves a dict per object
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LocationResult":
+        return cls(
+            interpretation=data.get("interpretation"),
+            locations=[Location.from_dict(location) for location in data.get("locations") or []
+                       if isinstance(location, dict)],
+            error=data.get("error"),
+            extra={key: value for key, value in data.items() if key not in ("interpretation", "locations", "error")}
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the result in the locate_with_gemini format."""
+        if self.error is not None:
+            return {"error": self.error, **(self.extra or {})}
+        return {"interpretation": self.interpretation,
+                "locations": [location.to_dict() for location in self.locations],
+                **(self.extra or {})}
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def top(self) -> Optional[Location]:
+        """The most likely location, if any."""
+        return self.locations[0] if self.locations else None
+
+    def __repr__(self) -> str:
+        if self.error is not None:
+            return f"LocationResult(error={self.error!r})"
+        return f"LocationResult({len(self.locations)} locations, top={self.top!r})"
+
+
+def located(locations: Iterable[Union[Location, Dict[str, Any]]]) -> List[Location]:
+    """Convert location dictionaries to Location objects, keeping only those with coordinates."""
+    converted = (location if isinstance(location, Location) else Location.from_dict(location)
+                 for location in locations)
+    return [location for location in converted if location.coordinates is not None]
+
+
+class LocationBatch:
+    """
+    Column-wise store of the locations of many results.
+
+    Each row is one predicted location; rows without coordinates hold NaN.
+
+    Example:
+        batch = LocationBatch.from_results(results)
+        top = batch.top()
+        print(top.center(), (top.distances_to(48.85, 2.35) < 25).mean())
+    """
+
+    __slots__ = ("latitude", "longitude", "confidence", "result_index", "rank")
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray, confidence: np.ndarray,
+                 result_index: np.ndarray, rank: np.ndarray):
+        """
+        Args:
+            latitude, longitude: float64 degrees (NaN when missing)
+            confidence: int8 confidence rank (1 Low, 2 Medium, 3 High)
+            result_index: int32 position of the result each location belongs to
+            rank: int16 position of the location within its result (0 = top)
+        """
+        self.latitude = latitude
+        self.longitude = longitude
+        self.confidence = confidence
+        self.result_index = result_index
+        self.rank = rank
+
+    @classmethod
+    def from_results(cls, results: Iterable[Union[LocationResult, Dict[str, Any]]],
+                     max_rank: Optional[int] = None) -> "LocationBatch":
+        """
+        Build a batch from result dictionaries or LocationResult objects.
+
+        Args:
+            results: Results in order; failed results contribute no rows
+            max_rank: Keep only this many locations per result (e.g. 1 for the top predictions)
+        """
+        latitude: List[float] = []
+        longitude: List[float] = []
+        confidence: List[int] = []
+        result_index: List[int] = []
+        rank: List[int] = []
+        for index, result in enumerate(results):
+            if isinstance(result, LocationResult):
+                locations: Sequence[Any] = result.locations
+            else:
+                locations = (result.get("locations") or []) if "error" not in result else []
+            for position, location in enumerate(locations[:max_rank]):
+                if not isinstance(location, Location):
+                    location = Location.from_dict(location)
+                latitude.append(location.latitude if location.latitude is not None else np.nan)
+                longitude.append(location.longitude if location.longitude is not None else np.nan)
+                confidence.append(location.confidence_rank)
+                result_index.append(index)
+                rank.append(position)
+        return cls(np.array(latitude, dtype=np.float64), np.array(longitude, dtype=np.float64),
+                   np.array(confidence, dtype=np.int8), np.array(result_index, dtype=np.int32),
+                   np.array(rank, dtype=np.int16))
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def select(self, mask: np.ndarray) -> "LocationBatch":
+        """Rows where a boolean mask (or index array) selects them."""
+        return LocationBatch(*(getattr(self, name)[mask] for name in self.__slots__))
+
+    def top(self) -> "LocationBatch":
+        """The most likely location of every result."""
+        return self.select(self.rank == 0)
+
+    def with_coordinates(self) -> "LocationBatch":
+        return self.select(~np.isnan(self.latitude))
+
+    def at_least(self, confidence: str) -> "LocationBatch":
+        """Locations at least this confident ("Low", "Medium" or "High")."""
+        return self.select(self.confidence >= CONFIDENCE_RANKS[confidence])
+
+    def center(self) -> Optional[Tuple[float, float]]:
+        """Mean (lat, lng) of the rows with coordinates, or None."""
+        valid = ~np.isnan(self.latitude)
+        if not valid.any():
+            return None
+        return float(self.latitude[valid].mean()), float(self.longitude[valid].mean())
+
+    def distances_to(self, latitude: float, longitude: float) -> np.ndarray:
+        """Great-circle distance of every row to a point in km (NaN where coordinates are missing)."""
+        return haversine_km_array(latitude, longitude, self.latitude, self.longitude)
@@ -0,0 +1,285 @@
+"""
+Memory-bounded staged pipeline for large GeoSpy batches.
+
+A batch is processed as a chain of stages (read -> preprocess -> send ->
+parse -> write). Each stage has its own worker count and reads from a
+bounded queue, so a slow stage applies backpressure to the ones before it
+and the number of images held in memory is capped by the queue sizes, not
+by the batch size. I/O stages run in threads; CPU stages (decode, resize,
+hash, encode) run in a process pool so they do not compete for the GIL with
+the network stages.
+
+Records flowing through the pipeline are dictionaries. Once a record has a
+"result" (a finished analysis or an error) later stages pass it through
+untouched.
+"""
+
+import base64
+import hashlib
+import io
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .geospy import GeoSpy
+from .imaging import encode_jpeg, prepare_image_bytes
+
+_DONE = object()  # End-of-stream marker passed between stages
+
+Record = Dict[str, Any]
+
+
+class Stage:
+    """One step of a pipeline."""
+
+    def __init__(self, name: str, func: Callable[[Record], Record], workers: int = 1,
+                 kind: str = "thread", queue_size: int = 32, always: bool = False):
+        """
+        Args:
+            name: Stage name used in statistics
+            func: Function transforming a record (must be picklable for process stages)
+            workers: Number of concurrent workers
+            kind: "thread" for I/O bound work, "process" for CPU bound work
+            queue_size: Capacity of the queue feeding this stage
+            always: Run even for records that already have a result (e.g. a writer)
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError("Stage kind must be 'thread' or 'process'")
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.kind = kind
+        self.queue_size = queue_size
+        self.always = always
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def _record(self, elapsed: float, failed: bool) -> None:
+        with self._lock:
+            self.processed += 1
+            self.errors += int(failed)
+            self.busy_seconds += elapsed
+
+
+class Pipeline:
+    """
+    Run records through a chain of stages with bounded queues between them.
+
+    Example:
+        pipeline = Pipeline([Stage("read", read, workers=4), ...])
+        for record in pipeline.run(items):
+            ...
+        print(pipeline.stats())
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        self._queues: List[queue.Queue] = []
+        self.started_at: Optional[float] = None
+
+    def _worker(self, index: int, executor: Optional[ProcessPoolExecutor], remaining: List[int],
+                lock: threading.Lock) -> None:
+        stage = self.stages[index]
+        inbox, outbox = self._queues[index], self._queues[index + 1]
+        while True:
+            record = inbox.get()
+            if record is _DONE:
+                break
+            if stage.always or "result" not in record:
+                started = time.perf_counter()
+                try:
+                    if executor is not None:
+                        record = executor.submit(stage.func, record).result()
+                    else:
+                        record = stage.func(record)
+                    failed = False
+                except Exception as e:
+                    # Drop payloads so failed records stay small on their way to the writer
+                    for key in ("data", "image_base64", "response"):
+                        record.pop(key, None)
+                    record["result"] = {"error": f"Failed in pipeline stage '{stage.name}': {str(e)}"}
+                    failed = True
+                stage._record(time.perf_counter() - started, failed)
+            outbox.put(record)
+            if index + 1 < len(self.stages):
+                self.stages[index + 1].max_depth = max(self.stages[index + 1].max_depth, outbox.qsize())
+
+        # The last worker of a stage to finish closes the next stage's queue
+        with lock:
+            remaining[index] -= 1
+            last = remaining[index] == 0
+        if last:
+            followers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            for _ in range(followers):
+                outbox.put(_DONE)
+
+    def run(self, items: Iterable[Record]) -> Iterator[Record]:
+        """
+        Feed records through every stage, yielding them as they leave the last one.
+
+        Records are yielded in completion order, not input order.
+        """
+        self.started_at = time.time()
+        self._queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        self._queues.append(queue.Queue(maxsize=max(1, self.stages[-1].queue_size)))
+        remaining = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+
+        executors = []
+        for index, stage in enumerate(self.stages):
+            executor = None
+            if stage.kind == "process":
+                # Spawned (not forked) workers: forking a process that already runs threads is unsafe
+                executor = ProcessPoolExecutor(max_workers=stage.workers,
+                                               mp_context=multiprocessing.get_context("spawn"))
+                executors.append(executor)
+            for n in range(stage.workers):
+                threading.Thread(target=self._worker, args=(index, executor, remaining, lock),
+                                 name=f"pipeline-{stage.name}-{n}", daemon=True).start()
+
+        def feed():
+            for item in items:
+                self._queues[0].put(item)
+                self.stages[0].max_depth = max(self.stages[0].max_depth, self._queues[0].qsize())
+            for _ in range(self.stages[0].workers):
+                self._queues[0].put(_DONE)
+
+        feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+        feeder.start()
+
+        try:
+            output = self._queues[-1]
+            while True:
+                record = output.get()
+                if record is _DONE:
+                    break
+                yield record
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-stage counters and current queue depth."""
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        snapshot = []
+        for index, stage in enumerate(self.stages):
+            depth = self._queues[index].qsize() if self._queues else 0
+            snapshot.append({
+                "stage": stage.name,
+                "kind": stage.kind,
+                "workers": stage.workers,
+                "queue_depth": depth,
+                "queue_capacity": stage.queue_size,
+                "max_queue_depth": stage.max_depth,
+                "processed": stage.processed,
+                "errors": stage.errors,
+                "busy_seconds": round(stage.busy_seconds, 2),
+                # Share of the stage's worker capacity spent busy since the run started
+                "utilization": round(stage.busy_seconds / (elapsed * stage.workers), 3) if elapsed else 0.0,
+            })
+        return snapshot
+
+
+def preprocess_record(record: Record, max_dimension: Optional[int] = None) -> Record:
+    """
+    CPU stage: hash, convert/resize and base64-encode an image record.
+
+    Runs in a worker process, so it only uses module-level functions.
+    """
+    data = record.pop("data")
+    record["sha256"] = hashlib.sha256(data).hexdigest()
+    record["original_bytes"] = len(data)
+    if max_dimension:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            if max(img.size) > max_dimension:
+                data, mime_type = encode_jpeg(img, max_dimension=max_dimension), "image/jpeg"
+            else:
+                data, mime_type = prepare_image_bytes(data)
+    else:
+        data, mime_type = prepare_image_bytes(data)
+    record["mime_type"] = mime_type
+    record["upload_bytes"] = len(data)
+    record["image_base64"] = base64.b64encode(data).decode("utf-8")
+    return record
+
+
+def build_geolocation_pipeline(geospy: GeoSpy,
+                               writer=None,
+                               context_info: Optional[str] = None,
+                               location_guess: Optional[str] = None,
+                               read_workers: int = 4,
+                               preprocess_workers: int = 2,
+                               send_workers: int = 4,
+                               queue_size: int = 16,
+                               max_dimension: Optional[int] = None) -> Pipeline:
+    """
+    Build the standard read -> preprocess -> send -> parse -> write pipeline.
+
+    Args:
+        geospy: Client used to load images, send requests and parse responses
+        writer: Optional ResultWriter; results are written in the final stage
+        context_info: Optional context sent with every image
+        location_guess: Optional location hint sent with every image
+        read_workers: Threads reading files and downloading URLs
+        preprocess_workers: Processes hashing, converting and resizing images
+        send_workers: Threads with requests in flight to the API
+        queue_size: Capacity of each inter-stage queue
+        max_dimension: Downscale images so their longest side is at most this many pixels
+
+    Returns:
+        A Pipeline whose run() accepts records of the form {"source": path_or_url}
+    """
+    def read(record: Record) -> Record:
+        data = geospy.load_image_bytes(record["source"])
+        if geospy.exif_mode != "ignore":
+            record["context"], shortcut = geospy.apply_exif(data, context_info)
+            if shortcut is not None:
+                record["result"] = shortcut
+                return record
+        record["data"] = data
+        return record
+
+    def send(record: Record) -> Record:
+        prompt_text = geospy.build_prompt(record.get("context", context_info), location_guess)
+        body = geospy.build_request_body(prompt_text, record.pop("image_base64"), record["mime_type"])
+        started = time.perf_counter()
+        if geospy.cascade is not None:
+            # The cascade parses each answer to decide whether to escalate
+            record["result"] = geospy.cascade.run(geospy, body)
+            record["latency"] = time.perf_counter() - started
+            return record
+        response, error = geospy.send_request(body)
+        record["latency"] = time.perf_counter() - started
+        if error is not None:
+            record["result"] = error
+        else:
+            record["response"] = response
+        return record
+
+    def parse(record: Record) -> Record:
+        record["result"] = geospy.parse_response(record.pop("response"))
+        return record
+
+    def write(record: Record) -> Record:
+        if writer is not None:
+            writer.write(record["source"], record["result"])
+        return record
+
+    stages = [
+        Stage("read", read, workers=read_workers, queue_size=queue_size),
+        Stage("preprocess", partial(preprocess_record, max_dimension=max_dimension),
+              workers=preprocess_workers, kind="process", queue_size=queue_size),
+        Stage("send", send, workers=send_workers, queue_size=queue_size),
+        Stage("parse", parse, workers=1, queue_size=queue_size),
+        # Records finished early (EXIF shortcut, read errors) must still be written
+        Stage("write", write, workers=1, queue_size=queue_size, always=True),
+    ]
+    return Pipeline(stages)
@@ -0,0 +1,195 @@
+"""
+Batch preflight planning for GeoSpy.
+
+Estimates what a batch will cost before any quota is spent: total upload
+bytes, input/output tokens and wall-clock time under a requests-per-minute
+quota at a given concurrency. Images are scanned in parallel reading only
+their headers (dimensions and format), never decoding pixels, and the
+request size is measured with the same prompt and request body construction
+used by GeoSpy.locate_with_gemini. No Gemini API calls are made.
+"""
+
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from .geospy import GeoSpy
+from .sequence import IMAGE_EXTENSIONS
+
+# Gemini bills images at 258 tokens each up to 384px, larger images as 768px tiles of 258 tokens
+IMAGE_TOKENS_PER_TILE = 258
+SMALL_IMAGE_MAX_SIDE = 384
+IMAGE_TILE_SIDE = 768
+
+# Rough English text density used for prompt token estimates
+CHARS_PER_TOKEN = 4
+
+
+def iter_image_paths(inputs: Iterable[str]) -> Iterator[str]:
+    """Expand directories into the image files they contain; URLs and files pass through."""
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        yield os.path.join(root, name)
+        else:
+            yield item
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Estimate the input tokens Gemini charges for an image of the given size."""
+    if width <= SMALL_IMAGE_MAX_SIDE and height <= SMALL_IMAGE_MAX_SIDE:
+        return IMAGE_TOKENS_PER_TILE
+    tiles = math.ceil(width / IMAGE_TILE_SIDE) * math.ceil(height / IMAGE_TILE_SIDE)
+    return tiles * IMAGE_TOKENS_PER_TILE
+
+
+def scan_image(image_path: str, probe_urls: bool = False) -> Dict[str, Any]:
+    """
+    Read an image's size and header without decoding its pixels.
+
+    Args:
+        image_path: Path to the image file or URL
+        probe_urls: Send a HEAD request to learn the size of remote images
+
+    Returns:
+        Dictionary with source, bytes, width, height, format, frames and error
+        (unknown values are None)
+    """
+    info = {"source": image_path, "bytes": None, "width": None, "height": None,
+            "format": None, "animated": False, "error": None}
+
+    if urlparse(image_path).scheme in ("http", "https"):
+        if probe_urls:
+            try:
+                response = requests.head(image_path, allow_redirects=True, timeout=10)
+                length = response.headers.get("Content-Length")
+                info["bytes"] = int(length) if length else None
+            except (requests.exceptions.RequestException, ValueError) as e:
+                info["error"] = str(e)
+        return info
+
+    try:
+        info["bytes"] = os.path.getsize(image_path)
+        from PIL import Image
+        # Image.open only parses the header; pixel data is decoded lazily and never loaded here
+        with Image.open(image_path) as img:
+            info["width"], info["height"] = img.size
+            info["format"] = img.format
+            info["animated"] = bool(getattr(img, "is_animated", False))
+    except Exception as e:
+        info["error"] = str(e)
+    return info
+
+
+def plan_batch(images: Iterable[str],
+               context_info: Optional[str] = None,
+               location_guess: Optional[str] = None,
+               concurrency: int = 4,
+               requests_per_minute: Optional[float] = None,
+               avg_latency: float = 8.0,
+               output_tokens: int = 700,
+               scan_workers: int = 16,
+               probe_urls: bool = False,
+               max_dimension: Optional[int] = None,
+               geospy: Optional[GeoSpy] = None) -> Dict[str, Any]:
+    """
+    Estimate bytes, tokens and duration for a batch without calling the API.
+
+    Args:
+        images: Image paths, directories or URLs
+        context_info: Optional context that will be sent with every image
+        location_guess: Optional location hint that will be sent with every image
+        concurrency: Number of requests in flight at once
+        requests_per_minute: Optional API quota limiting throughput
+        avg_latency: Expected seconds per API call
+        output_tokens: Expected output tokens per response
+        scan_workers: Threads used to scan image headers
+        probe_urls: Send HEAD requests to size remote images
+        max_dimension: Longest side images will be downscaled to by the pipeline
+            (bytes are assumed to shrink with the pixel count)
+        geospy: Client whose prompt construction is used (a default one otherwise)
+
+    Returns:
+        Dictionary with image counts, byte, token and time estimates
+
+    Raises:
+        ValueError: If concurrency is below 1 or avg_latency is not positive
+
+    Upload bytes are estimated from the file sizes. GIF, BMP and TIFF images
+    are re-encoded to JPEG before upload (see prepare_image_bytes), usually
+    much smaller, so their upload bytes are overstated.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if avg_latency <= 0:
+        raise ValueError("avg_latency must be greater than 0 seconds")
+    geospy = geospy or GeoSpy(api_key="preflight")
+    prompt_text = geospy.build_prompt(context_info, location_guess)
+    # Request JSON without image data; the base64 payload is added per image
+    request_overhead = len(json.dumps(geospy.build_request_body(prompt_text, "")).encode("utf-8"))
+    prompt_tokens = math.ceil(len(prompt_text) / CHARS_PER_TOKEN)
+
+    with ThreadPoolExecutor(max_workers=scan_workers) as executor:
+        scans: List[Dict[str, Any]] = list(executor.map(
+            lambda path: scan_image(path, probe_urls), iter_image_paths(images)
+        ))
+
+    if max_dimension:
+        for scan in scans:
+            longest = max(scan["width"] or 0, scan["height"] or 0)
+            if longest > max_dimension:
+                scale = max_dimension / longest
+                scan["width"] = max(1, int(scan["width"] * scale))
+                scan["height"] = max(1, int(scan["height"] * scale))
+                scan["bytes"] = int(scan["bytes"] * scale * scale)
+
+    sized = [s for s in scans if s["bytes"] is not None and s["error"] is None]
+    measured = [s for s in sized if s["width"]]
+    unreadable = [s for s in scans if s["error"] is not None]
+    remote_unknown = [s for s in scans if s["bytes"] is None and s["error"] is None]
+
+    # Image bytes after preprocessing (downscaling when max_dimension is set)
+    raw_bytes = sum(s["bytes"] for s in sized)
+    image_tokens = sum(estimate_image_tokens(s["width"], s["height"]) for s in measured)
+
+    # Images we could not size (remote, or sized but not measured) are assumed to be average
+    avg_bytes = raw_bytes / len(sized) if sized else 0
+    avg_image_tokens = image_tokens / len(measured) if measured else IMAGE_TOKENS_PER_TILE
+    raw_bytes += avg_bytes * len(remote_unknown)
+    image_tokens += avg_image_tokens * (len(remote_unknown) + len(sized) - len(measured))
+
+    requests_count = len(scans) - len(unreadable)
+    upload_bytes = int(sum(4 * math.ceil(s["bytes"] / 3) for s in sized)
+                       + 4 * math.ceil(avg_bytes / 3) * len(remote_unknown)
+                       + request_overhead * requests_count)
+
+    # Throughput is bounded by concurrency / latency and by the quota, whichever is lower
+    throughput = concurrency / avg_latency
+    if requests_per_minute:
+        throughput = min(throughput, requests_per_minute / 60.0)
+    seconds = requests_count / throughput if throughput > 0 else 0
+
+    return {
+        "images": len(scans),
+        "requests": requests_count,
+        "unreadable": len(unreadable),
+        "remote_unsized": len(remote_unknown),
+        "animated": sum(1 for s in scans if s["animated"]),
+        "raw_bytes": int(raw_bytes),
+        "upload_bytes": upload_bytes,
+        "input_tokens": int(image_tokens + prompt_tokens * requests_count),
+        "output_tokens": output_tokens * requests_count,
+        "prompt_tokens_per_request": prompt_tokens,
+        "concurrency": concurrency,
+        "requests_per_minute": requests_per_minute,
+        "throughput_per_minute": round(throughput * 60, 2),
+        "estimated_seconds": round(seconds, 1),
+        "errors": [{"source": s["source"], "error": s["error"]} for s in unreadable[:20]],
+    }
@@ -0,0 +1,171 @@
+"""
+Fair scheduling of analyses from many users sharing one process.
+
+FairScheduler runs submitted tasks on a fixed number of worker threads (the
+global concurrency ceiling). Waiting tasks are kept in one queue per user
+and dispatched round robin, so a user who submits hundreds of images only
+gets one turn in each round and cannot starve everyone else. Interactive
+tasks (a single image someone is waiting on) are always dispatched before
+bulk tasks, again round robin between users.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+
+class ScheduledTask:
+    """Handle for a task submitted to a FairScheduler."""
+
+    def __init__(self, func: Callable[[], Any], user: str, priority: str):
+        self.func = func
+        self.user = user
+        self.priority = priority
+        self.started = False
+
+
+class FairScheduler:
+    """
+    Per-user round-robin task queue with interactive priority and a worker ceiling.
+
+    Example:
+        scheduler = FairScheduler(workers=4)
+        task = scheduler.submit(run, user=session_id, interactive=True)
+        scheduler.position(task)  # Tasks dispatched before this one, None once started
+    """
+
+    def __init__(self, workers: int = 4):
+        """
+        Args:
+            workers: Maximum number of tasks running at once
+        """
+        self.workers = max(1, workers)
+        self._queues: Dict[str, "OrderedDict[str, Deque[ScheduledTask]]"] = {
+            INTERACTIVE: OrderedDict(), BULK: OrderedDict()
+        }
+        self._cond = threading.Condition()
+        self._running = 0
+        self._stopped = False
+        self.dispatched = 0
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"geospy-scheduler-{i}", daemon=True).start()
+
+    def submit(self, func: Callable[[], Any], user: str, interactive: bool = False) -> ScheduledTask:
+        """
+        Queue a task for a user.
+
+        Args:
+            func: Callable run on a worker thread (exceptions are the caller's to handle)
+            user: Identity used for fair sharing (e.g. a session id)
+            interactive: Dispatch ahead of all bulk tasks
+
+        Returns:
+            Task handle for position(), promote() and cancel()
+        """
+        task = ScheduledTask(func, user, INTERACTIVE if interactive else BULK)
+        with self._cond:
+            self._queues[task.priority].setdefault(user, deque()).append(task)
+            self._cond.notify()
+        return task
+
+    def cancel(self, task: ScheduledTask) -> bool:
+        """Remove a task that has not started yet. Returns False if it already started."""
+        with self._cond:
+            return self._remove(task)
+
+    def promote(self, task: ScheduledTask) -> None:
+        """Move a waiting bulk task to the interactive queue (someone is now waiting on it)."""
+        with self._cond:
+            if task.priority == BULK and self._remove(task):
+                task.priority = INTERACTIVE
+                self._queues[INTERACTIVE].setdefault(task.user, deque()).appendleft(task)
+
+    def _remove(self, task: ScheduledTask) -> bool:
+        users = self._queues[task.priority]
+        queue = users.get(task.user)
+        if task.started or queue is None or task not in queue:
+            return False
+        queue.remove(task)
+        if not queue:
+            del users[task.user]
+        return True
+
+    def position(self, task: ScheduledTask) -> Optional[int]:
+        """
+        Number of waiting tasks that will be dispatched before this one.
+
+        Returns:
+            0 for the next task to run, or None if the task is not waiting
+        """
+        with self._cond:
+            users = self._queues[task.priority]
+            queue = users.get(task.user)
+            if task.started or queue is None or task not in queue:
+                return None
+            index = queue.index(task)
+            # Round robin: each user ahead of this one in the rotation gets index + 1 turns first,
+            # each user behind it gets index turns
+            ahead = index
+            before = True
+            for user, other in users.items():
+                if user == task.user:
+                    before = False
+                    continue
+                ahead += min(len(other), index + 1 if before else index)
+            if task.priority == BULK:
+                ahead += sum(len(other) for other in self._queues[INTERACTIVE].values())
+            return ahead
+
+    def _next(self) -> Optional[ScheduledTask]:
+        for priority in (INTERACTIVE, BULK):
+            users = self._queues[priority]
+            if users:
+                user, queue = next(iter(users.items()))
+                task = queue.popleft()
+                # The user goes to the back of the rotation (or leaves it when idle)
+                if queue:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                return task
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                task = self._next()
+                while task is None and not self._stopped:
+                    self._cond.wait()
+                    task = self._next()
+                if task is None:
+                    return
+                task.started = True
+                self._running += 1
+                self.dispatched += 1
+            try:
+                task.func()
+            finally:
+                with self._cond:
+                    self._running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "waiting_interactive": sum(len(q) for q in self._queues[INTERACTIVE].values()),
+                "waiting_bulk": sum(len(q) for q in self._queues[BULK].values()),
+                "waiting_users": len(set(self._queues[INTERACTIVE]) | set(self._queues[BULK])),
+                "dispatched": self.dispatched,
+            }
+
+    def shutdown(self) -> None:
+        """Drop waiting tasks and stop the workers once their current task finishes."""
+        with self._cond:
+            for users in self._queues.values():
+                users.clear()
+            self._stopped = True
+            self._cond.notify_all()
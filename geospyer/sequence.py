@@ -0,0 +1,114 @@
+"""
+Frame sampling for animated images and image sequences.
+
+Analysing every frame of a short animated capture wastes quota because
+consecutive frames are usually near-identical. Frames are first reduced to
+tiny grayscale thumbnails and compared with a mean absolute difference; only
+frames that differ enough from the last kept frame (a cheap scene-change
+test) are decoded at full size and sent for analysis.
+"""
+
+import io
+import os
+import re
+from typing import Iterator, List, Sequence, Tuple, Union
+
+from .imaging import encode_jpeg
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".tif", ".tiff", ".heic"}
+
+# Side length of the grayscale thumbnails compared between frames
+THUMBNAIL_SIZE = 32
+
+
+def natural_key(name: str) -> List[Union[int, str]]:
+    """Sort key ordering embedded numbers by value, so frame2 comes before frame10."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+
+def frame_files(directory: str) -> List[str]:
+    """List the image files of a frame directory in natural name order (other files are ignored)."""
+    names = [name for name in os.listdir(directory)
+             if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+             and os.path.isfile(os.path.join(directory, name))]
+    return [os.path.join(directory, name) for name in sorted(names, key=natural_key)]
+
+
+def _thumbnail(frame) -> bytes:
+    return frame.convert("L").resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE)).tobytes()
+
+
+def frame_difference(a: bytes, b: bytes) -> float:
+    """Mean absolute difference between two thumbnails, from 0.0 (identical) to 1.0."""
+    return sum(abs(x - y) for x, y in zip(a, b)) / (255.0 * len(a))
+
+
+def is_animated(data: bytes) -> bool:
+    """Return True if the image bytes contain more than one frame."""
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            return bool(getattr(img, "is_animated", False))
+    except Exception:
+        return False
+
+
+def _iter_frames(source: Union[bytes, Sequence[str]]) -> Iterator:
+    """Yield PIL frames from animated image bytes or from a list of image files."""
+    from PIL import Image, ImageSequence
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        with Image.open(io.BytesIO(bytes(source))) as img:
+            for frame in ImageSequence.Iterator(img):
+                yield frame
+    else:
+        for path in source:
+            with Image.open(path) as img:
+                yield img
+
+
+def select_frames(source: Union[bytes, Sequence[str]],
+                  max_frames: int = 6,
+                  threshold: float = 0.08) -> List[Tuple[int, bytes]]:
+    """
+    Pick representative frames and encode them as JPEG.
+
+    The first frame is always kept; later frames are kept when they differ
+    from the last kept frame by at least threshold. If more than max_frames
+    survive, an evenly spaced subset is used so the whole clip stays covered.
+
+    Args:
+        source: Animated image bytes, or a list of frame image paths
+        max_frames: Maximum number of frames returned
+        threshold: Minimum mean thumbnail difference (0-1) to count as a new scene
+
+    Returns:
+        List of (frame index, JPEG bytes)
+
+    Raises:
+        ValueError: If max_frames is less than 1
+    """
+    if max_frames < 1:
+        raise ValueError("max_frames must be at least 1")
+
+    # Pass 1: compare cheap thumbnails only, never holding full frames in memory
+    kept: List[int] = []
+    last = None
+    for index, frame in enumerate(_iter_frames(source)):
+        thumb = _thumbnail(frame)
+        if last is None or frame_difference(thumb, last) >= threshold:
+            kept.append(index)
+            last = thumb
+
+    if len(kept) > max_frames:
+        step = len(kept) / max_frames
+        kept = [kept[int(i * step)] for i in range(max_frames)]
+
+    # Pass 2: decode and encode only the selected frames
+    wanted = set(kept)
+    selected = []
+    for index, frame in enumerate(_iter_frames(source)):
+        if index in wanted:
+            selected.append((index, encode_jpeg(frame)))
+        if len(selected) == len(wanted):
+            break
+    return selected
@@ -0,0 +1,409 @@
+"""
+GeoSpy HTTP analysis service.
+
+Runs a long-lived process that exposes image geolocation over a small JSON
+HTTP API. All requests share one GeoSpy client (pooled keep-alive
+connections, one rate limiter and one result cache) and are executed by a
+fixed set of worker threads fed from a bounded queue. When the queue is full
+new submissions are rejected with HTTP 429 instead of piling up.
+
+Endpoints:
+    GET  /health        Service, queue, cache and circuit breaker status
+    POST /jobs          Submit an analysis, returns a job id (202)
+    GET  /jobs/<id>     Poll a submitted job
+    DELETE /jobs/<id>   Cancel a queued or running job
+    POST /locate        Submit and wait for the result (synchronous)
+
+Request body (JSON):
+    {
+        "image": "https://example.com/photo.jpg",   # URL (or local path if enabled)
+        "image_base64": "...",                       # or inline image data
+        "mime_type": "image/jpeg",                   # optional, for image_base64
+        "context": "...",                            # optional
+        "guess": "..."                               # optional
+    }
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from .cache import ResultCache, make_cache_key
+from .cancel import CancelledError, CancelToken, cancel_scope
+from .cascade import CascadePolicy
+from .circuit import CircuitBreaker
+from .geospy import DEFAULT_MODEL, GeoSpy
+from .ratelimit import RateLimiter
+
+
+class Job:
+    """A single analysis request tracked by the service."""
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+        self.token = CancelToken()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.done.is_set():
+            data["result"] = self.result
+        return data
+
+
+class AnalysisService:
+    """
+    Bounded work queue and worker pool around a shared GeoSpy client.
+
+    Jobs are kept in memory for job_ttl seconds after they finish (and at most
+    max_jobs are retained) so clients have time to poll for results.
+    """
+
+    def __init__(self, geospy: GeoSpy, workers: int = 4, queue_size: int = 64,
+                 cache: Optional[ResultCache] = None, job_ttl: float = 3600,
+                 max_jobs: int = 10000, allow_local_paths: bool = False):
+        """
+        Args:
+            geospy: Shared client used by every worker
+            workers: Number of worker threads processing jobs concurrently
+            queue_size: Maximum number of jobs waiting for a worker
+            cache: Optional result cache shared by all requests
+            job_ttl: Seconds finished jobs are kept for polling
+            max_jobs: Maximum number of jobs kept in memory
+            allow_local_paths: Allow clients to reference files on the server's disk
+        """
+        self.geospy = geospy
+        self.workers = workers
+        self.cache = cache
+        self.job_ttl = job_ttl
+        self.max_jobs = max_jobs
+        self.allow_local_paths = allow_local_paths
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=queue_size)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._threads = []
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"geospy-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def validate(self, payload: Dict[str, Any]) -> None:
+        """
+        Check that a request payload references an image the service may read.
+
+        Raises:
+            ValueError: If the payload is missing an image, has non-string
+                fields or references a local path while local paths are disabled
+        """
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        for field in ("context", "guess", "mime_type"):
+            if payload.get(field) is not None and not isinstance(payload[field], str):
+                raise ValueError(f"'{field}' must be a string")
+        if payload.get("image_base64"):
+            try:
+                base64.b64decode(payload["image_base64"], validate=True)
+            except (binascii.Error, TypeError):
+                raise ValueError("image_base64 is not valid base64 data")
+            return
+        image = payload.get("image")
+        if not image or not isinstance(image, str):
+            raise ValueError("Request must include 'image' (URL) or 'image_base64'")
+        if urlparse(image).scheme not in ("http", "https") and not self.allow_local_paths:
+            raise ValueError("Local image paths are disabled on this server; send a URL or image_base64")
+
+    def submit(self, payload: Dict[str, Any]) -> Job:
+        """
+        Queue an analysis request.
+
+        Raises:
+            ValueError: If the payload is invalid
+            queue.Full: If the work queue is full
+        """
+        self.validate(payload)
+        job = Job(payload)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            self._prune_jobs()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._jobs_lock:
+                self._jobs.pop(job.id, None)
+            self.rejected += 1
+            raise
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job, aborting its in-flight request. Queued jobs are skipped by the workers.
+
+        Returns:
+            The job, or None if it is unknown
+        """
+        job = self.get(job_id)
+        if job is not None and not job.done.is_set():
+            job.token.cancel()
+        return job
+
+    def _prune_jobs(self) -> None:
+        # Drop finished jobs past their TTL, then the oldest jobs beyond max_jobs
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values()
+                       if j.finished_at is not None and now - j.finished_at > self.job_ttl]:
+            del self._jobs[job_id]
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                with cancel_scope(job.token):
+                    job.token.raise_if_cancelled()
+                    job.result = self.analyze(job.payload)
+                job.status = "failed" if "error" in job.result else "done"
+            except CancelledError:
+                job.result = {"error": "Analysis cancelled", "cancelled": True}
+                job.status = "cancelled"
+            except Exception as e:
+                job.result = {"error": f"Unexpected error during analysis: {str(e)}"}
+                job.status = "failed"
+            job.finished_at = time.time()
+            job.done.set()
+            self.completed += 1
+
+    def analyze(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one analysis through the shared client, consulting the result cache first."""
+        context_info = payload.get("context") or None
+        location_guess = payload.get("guess") or None
+
+        if payload.get("image_base64"):
+            image_base64 = payload["image_base64"]
+            digest = hashlib.sha256(base64.b64decode(image_base64)).hexdigest()
+        else:
+            image_base64 = None
+            digest = payload["image"]
+
+        key = make_cache_key(digest, context_info, location_guess)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if image_base64 is not None:
+            result = self.geospy.locate_base64(image_base64, context_info, location_guess,
+                                               mime_type=payload.get("mime_type") or "image/jpeg")
+        else:
+            result = self.geospy.locate(payload["image"], context_info, location_guess)
+
+        if self.cache is not None and "error" not in result:
+            self.cache.put(key, result)
+        return result
+
+    def health(self) -> Dict[str, Any]:
+        with self._jobs_lock:
+            tracked = len(self._jobs)
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "model": self.geospy.model if self.geospy.cascade is None else None,
+            "cascade": self.geospy.cascade.models if self.geospy.cascade is not None else None,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "jobs_tracked": tracked,
+            "jobs_completed": self.completed,
+            "jobs_rejected": self.rejected,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "circuit": self.geospy.circuit_breaker.stats() if self.geospy.circuit_breaker is not None else None,
+        }
+
+
+def make_handler(service: AnalysisService, max_body_bytes: int, sync_timeout: float):
+    """Build a request handler class bound to the given service."""
+
+    class GeoSpyRequestHandler(BaseHTTPRequestHandler):
+        server_version = "GeoSpy"
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _reject_unread_body(self, status: int, data: Dict[str, Any]) -> None:
+            # The body was not read, so the connection cannot be reused for another request
+            self.close_connection = True
+            self._send_json(status, data, headers={"Connection": "close"})
+
+        def _read_json(self) -> Optional[Dict[str, Any]]:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._reject_unread_body(400, {"error": "Invalid Content-Length header"})
+                return None
+            if length > max_body_bytes:
+                self._reject_unread_body(413, {"error": f"Request body exceeds {max_body_bytes} bytes"})
+                return None
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:  # Invalid JSON or not UTF-8
+                self._send_json(400, {"error": "Invalid JSON body", "exception": str(e)})
+                return None
+            if not isinstance(payload, dict):
+                self._send_json(400, {"error": "Request body must be a JSON object"})
+                return None
+            return payload
+
+        def _submit(self) -> Optional[Job]:
+            payload = self._read_json()
+            if payload is None:
+                return None
+            try:
+                return service.submit(payload)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+            except queue.Full:
+                self._send_json(429, {"error": "Server is busy, queue is full. Please retry shortly."},
+                                headers={"Retry-After": "5"})
+            return None
+
+        def do_GET(self):
+            path = self.path.rstrip("/")
+            if path == "/health":
+                self._send_json(200, service.health())
+            elif path.startswith("/jobs/"):
+                job = service.get(path[len("/jobs/"):])
+                if job is None:
+                    self._send_json(404, {"error": "Job not found"})
+                else:
+                    self._send_json(200, job.to_dict())
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            path = self.path.rstrip("/")
+            if path == "/jobs":
+                job = self._submit()
+                if job is not None:
+                    self._send_json(202, job.to_dict(), headers={"Location": f"/jobs/{job.id}"})
+            elif path == "/locate":
+                job = self._submit()
+                if job is not None:
+                    if job.done.wait(sync_timeout):
+                        self._send_json(200, job.result)
+                    else:
+                        # Still running; let the client fall back to polling
+                        self._send_json(202, job.to_dict(), headers={"Location": f"/jobs/{job.id}"})
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_DELETE(self):
+            path = self.path.rstrip("/")
+            if path.startswith("/jobs/"):
+                job = service.cancel(path[len("/jobs/"):])
+                if job is None:
+                    self._send_json(404, {"error": "Job not found"})
+                else:
+                    self._send_json(202, job.to_dict())
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def log_message(self, format, *args):
+            print(f"[{self.log_date_time_string()}] {self.address_string()} {format % args}")
+
+    return GeoSpyRequestHandler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, api_key: Optional[str] = None,
+          workers: int = 4, queue_size: int = 64, requests_per_minute: Optional[float] = None,
+          cache_size: int = 1024, cache_ttl: float = 3600, max_body_mb: float = 25,
+          sync_timeout: float = 120, allow_local_paths: bool = False,
+          model: str = DEFAULT_MODEL, cascade_models: Optional[List[str]] = None,
+          circuit_breaker: bool = True) -> None:
+    """
+    Start the analysis service and block until interrupted.
+
+    Args:
+        host: Interface to bind
+        port: Port to listen on
+        api_key: Gemini API key (defaults to GEMINI_API_KEY)
+        workers: Number of concurrent analysis workers
+        queue_size: Maximum number of queued jobs before returning 429
+        requests_per_minute: Optional shared ceiling on Gemini requests
+        cache_size: Maximum number of cached results (0 disables caching)
+        cache_ttl: Seconds cached results stay valid
+        max_body_mb: Maximum accepted request body size in megabytes
+        sync_timeout: Seconds POST /locate waits before returning a job to poll
+        allow_local_paths: Allow clients to reference files on the server's disk
+        model: Gemini model used when not cascading
+        cascade_models: Optional model tiers, cheapest first (see CascadePolicy)
+        circuit_breaker: Fail requests fast while Gemini is failing (state in GET /health)
+    """
+    limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+    cascade = CascadePolicy(cascade_models) if cascade_models else None
+    geospy = GeoSpy(api_key=api_key, pool_size=workers, rate_limiter=limiter, model=model, cascade=cascade,
+                    circuit_breaker=CircuitBreaker() if circuit_breaker else None)
+    cache = ResultCache(max_entries=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+    service = AnalysisService(geospy, workers=workers, queue_size=queue_size, cache=cache,
+                              allow_local_paths=allow_local_paths)
+    service.start()
+
+    handler = make_handler(service, int(max_body_mb * 1024 * 1024), sync_timeout)
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    print(f"GeoSpy service listening on http://{host}:{port} ({workers} workers, queue size {queue_size})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        httpd.server_close()
+        service.stop()
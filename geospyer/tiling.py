@@ -0,0 +1,60 @@
+"""
+Tiling for panoramas and very large images.
+
+A large image is split into overlapping tiles so each request stays small
+and fine detail (signage, architecture) survives instead of being lost when
+the whole frame is scaled down by the API. Tiles are cut and encoded lazily,
+one per in-flight request, so only max_in_flight tile payloads exist at once.
+"""
+
+import io
+from typing import List, Tuple
+
+from .imaging import encode_jpeg
+
+Box = Tuple[int, int, int, int]
+
+
+def _starts(length: int, tile: int, step: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, step))
+    starts.append(length - tile)  # Last tile is flush with the edge
+    return starts
+
+
+def tile_boxes(width: int, height: int, tile_size: int = 1024, overlap: float = 0.2) -> List[Box]:
+    """
+    Compute overlapping tile boxes covering an image.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        tile_size: Tile side length in pixels
+        overlap: Fraction of a tile shared with its neighbour (0 to 0.9)
+
+    Returns:
+        List of (left, upper, right, lower) boxes in row-major order
+    """
+    if tile_size <= 0:
+        raise ValueError("tile_size must be positive")
+    overlap = min(max(overlap, 0.0), 0.9)
+    step = max(1, int(tile_size * (1 - overlap)))
+    return [
+        (left, top, min(left + tile_size, width), min(top + tile_size, height))
+        for top in _starts(height, tile_size, step)
+        for left in _starts(width, tile_size, step)
+    ]
+
+
+def open_image(data: bytes):
+    """Decode image bytes into a fully loaded RGB PIL image."""
+    from PIL import Image
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return img.convert("RGB") if img.mode != "RGB" else img
+
+
+def encode_tile(image, box: Box, quality: int = 85) -> bytes:
+    """Crop one tile from a loaded image and encode it as JPEG."""
+    return encode_jpeg(image.crop(box), quality=quality)
@@ -7,7 +7,8 @@ predictions with detailed AI reasoning and interactive visualizations.
 
 Features:
 - Dark theme UI with professional styling
-- Image upload via file or URL
+- Image upload via files or URLs, analysed concurrently in the background
+- Live progress table with per-image drill-down
 - Top 3 location predictions with AI reasoning
 - Interactive maps with location markers
 - Analytics dashboard with confidence distribution
@@ -27,8 +28,24 @@ import io
 import base64
 from dotenv import load_dotenv
 from geospyer import GeoSpy
+from geospyer.background import JobManager
+from geospyer.cache import PreviewCache, ResultCache, make_cache_key
+from geospyer.cascade import CascadePolicy
+from geospyer.circuit import CircuitBreaker
+from geospyer.export import infer_format
+from geospyer.geospy import DEFAULT_MODEL
+from geospyer.history import HistoryStore
+from geospyer.imaging import make_preview, make_thumbnail
+from geospyer.models import Location, LocationBatch, located
+from geospyer.ratelimit import RateLimiter
+from geospyer.sequence import is_animated
+import hashlib
+import html
+import uuid
+import time
 import folium
 from streamlit_folium import st_folium
+import streamlit.components.v1 as components
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
@@ -38,6 +55,38 @@ from datetime import datetime
 # Load environment variables from .env file
 load_dotenv()
 
+# Result memoization limits (shared by every session in this server process)
+RESULT_CACHE_SIZE = int(os.environ.get("GEOSPY_RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL = float(os.environ.get("GEOSPY_RESULT_CACHE_TTL", "3600"))
+
+# Gemini model, or comma-separated models tried cheapest first (escalating only unreliable answers)
+GEMINI_MODEL = os.environ.get("GEOSPY_MODEL", DEFAULT_MODEL)
+CASCADE_MODELS = [m.strip() for m in os.environ.get("GEOSPY_CASCADE", "").split(",") if m.strip()]
+
+# Background analysis workers (shared by every session) and progress table refresh interval
+ANALYSIS_WORKERS = int(os.environ.get("GEOSPY_ANALYSIS_WORKERS", "4"))
+PROGRESS_REFRESH_SECONDS = 1.0
+
+# Gemini request ceiling for the whole server process (0 disables it)
+REQUESTS_PER_MINUTE = float(os.environ.get("GEOSPY_REQUESTS_PER_MINUTE", "0"))
+
+# Rendered maps, charts and tables kept per result (shared by every session)
+ARTIFACT_CACHE_SIZE = int(os.environ.get("GEOSPY_ARTIFACT_CACHE_SIZE", "64"))
+
+# Case map limits: individual (clustered) markers up to AGGREGATE_MAX_MARKERS points,
+# beyond that at most AGGREGATE_MAX_CELLS grid cells
+AGGREGATE_MAX_MARKERS = int(os.environ.get("GEOSPY_MAX_MAP_MARKERS", "5000"))
+AGGREGATE_MAX_CELLS = 1000
+AGGREGATE_COLUMNS = ["source", "rank", "country", "state", "city", "confidence", "latitude", "longitude"]
+
+# Analysis history database and page sizes offered on the history page
+HISTORY_DB = os.environ.get("GEOSPY_HISTORY_DB", "geospy_history.db")
+HISTORY_PAGE_SIZES = [25, 50, 100]
+
+# Image previews shown in the app: longest side in pixels and total cache size (shared by every session)
+PREVIEW_MAX_DIMENSION = 800
+PREVIEW_CACHE_MB = int(os.environ.get("GEOSPY_PREVIEW_CACHE_MB", "128"))
+
 # Configure Streamlit page settings
 st.set_page_config(
     page_title="GeoSpy - AI Image Geolocation",
@@ -478,15 +527,12 @@ def create_interactive_map(locations):
     if not locations:
         return None
     
-    # Calculate center point
-    lats = [loc.get("coordinates", {}).get("latitude", 0) for loc in locations if loc.get("coordinates", {}).get("latitude", 0) != 0]
-    lngs = [loc.get("coordinates", {}).get("longitude", 0) for loc in locations if loc.get("coordinates", {}).get("longitude", 0) != 0]
-    
-    if not lats or not lngs:
+    # Calculate center point of the locations with usable coordinates
+    center = LocationBatch.from_results([{"locations": locations}]).center()
+    if center is None:
         return None
     
-    center_lat = sum(lats) / len(lats)
-    center_lng = sum(lngs) / len(lngs)
+    center_lat, center_lng = center
     
     # Create map
     m = folium.Map(
@@ -513,11 +559,10 @@ def create_interactive_map(locations):
     
     # Add location markers
     for i, location in enumerate(locations):
-        coords = location.get("coordinates", {})
-        lat = coords.get("latitude", 0)
-        lng = coords.get("longitude", 0)
+        coords = Location.from_dict(location).coordinates
         
-        if lat != 0 and lng != 0:
+        if coords:
+            lat, lng = coords
             # Get ranking color and icon
             rank = i + 1
             color, icon = ranking_colors.get(rank, ("blue", "info-circle"))
@@ -545,10 +590,7 @@ def create_interactive_map(locations):
     
     # Add heatmap if multiple locations
     if len(locations) > 1:
-        heatmap_data = [[loc.get("coordinates", {}).get("latitude", 0), 
-                        loc.get("coordinates", {}).get("longitude", 0)] 
-                       for loc in locations 
-                       if loc.get("coordinates", {}).get("latitude", 0) != 0]
+        heatmap_data = [list(location.coordinates) for location in located(locations)]
         
         if heatmap_data:
             folium.plugins.HeatMap(
@@ -632,15 +674,15 @@ def create_ranking_comparison(locations):
     # Prepare data for comparison
     comparison_data = []
     for i, location in enumerate(locations):
-        coords = location.get("coordinates", {})
+        coords = Location.from_dict(location).coordinates
         comparison_data.append({
             "Rank": f"#{i+1}",
             "City": location.get("city", "Unknown"),
             "State/Region": location.get("state", "Unknown"),
             "Country": location.get("country", "Unknown"),
             "Confidence": location.get("confidence", "Medium"),
-            "Latitude": f"{coords.get('latitude', 0):.4f}",
-            "Longitude": f"{coords.get('longitude', 0):.4f}"
+            "Latitude": f"{coords[0]:.4f}" if coords else "N/A",
+            "Longitude": f"{coords[1]:.4f}" if coords else "N/A"
         })
     
     df = pd.DataFrame(comparison_data)
@@ -670,6 +712,7 @@ def display_location_ranking(locations):
     
     for i, location in enumerate(top_locations):
         rank = i + 1
+        coords = Location.from_dict(location).coordinates
         
         # Create ranking card without confidence
         st.markdown(f"""
@@ -682,7 +725,7 @@ def display_location_ranking(locations):
                 </div>
             </div>
             <div style="margin-left: 3.5rem;">
-                <p><strong>📍 Coordinates:</strong> {location.get('coordinates', {}).get('latitude', 0):.6f}, {location.get('coordinates', {}).get('longitude', 0):.6f}</p>
+                <p><strong>📍 Coordinates:</strong> {f"{coords[0]:.6f}, {coords[1]:.6f}" if coords else "Not available"}</p>
                 <details>
                     <summary><strong>💡 AI Reasoning</strong></summary>
                     <p style="margin-top: 0.5rem; color: #666;">{location.get('explanation', 'No explanation provided')}</p>
@@ -691,6 +734,898 @@ def display_location_ranking(locations):
         </div>
         """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner=False)
+def get_geospy(api_key, exif_mode):
+    """
+    Return a GeoSpy client shared across reruns and sessions.
+    
+    Args:
+        api_key (str): Gemini API key
+        exif_mode (str): EXIF handling mode passed to GeoSpy
+        
+    Returns:
+        GeoSpy: Cached client with a pooled HTTP session, the shared rate limiter and
+        circuit breaker, and the model (or model cascade) configured for the server
+    """
+    cascade = CascadePolicy(CASCADE_MODELS) if CASCADE_MODELS else None
+    return GeoSpy(api_key=api_key, exif_mode=exif_mode, rate_limiter=get_rate_limiter(),
+                  model=GEMINI_MODEL, cascade=cascade, circuit_breaker=get_circuit_breaker())
+
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter():
+    """
+    Return the rate limiter shared by every client in this server process.
+    
+    One ceiling for the whole team keeps a shared API key out of 429s, instead of
+    each session discovering the quota through its own retries.
+    
+    Returns:
+        RateLimiter or None: None when GEOSPY_REQUESTS_PER_MINUTE is not set
+    """
+    return RateLimiter(REQUESTS_PER_MINUTE) if REQUESTS_PER_MINUTE > 0 else None
+
+@st.cache_resource(show_spinner=False)
+def get_circuit_breaker():
+    """
+    Return the Gemini circuit breaker shared by every client in this server process.
+    
+    When Gemini keeps failing, every session's requests fail fast until a few probe
+    requests succeed, instead of each tying up a worker in retries and timeouts.
+    
+    Returns:
+        CircuitBreaker: Shared breaker
+    """
+    return CircuitBreaker()
+
+@st.cache_resource(show_spinner=False)
+def get_result_cache():
+    """
+    Return the process-wide result cache.
+    
+    Returns:
+        ResultCache: Bounded LRU cache of successful analyses with a TTL
+    """
+    return ResultCache(max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+
+def image_key(image_bytes, image_url):
+    """
+    Identify an image: uploads by content hash (so re-uploading the same photo under
+    another name still matches), URLs by the URL itself.
+    
+    Returns:
+        str: SHA-256 hex digest or URL
+    """
+    return hashlib.sha256(image_bytes).hexdigest() if image_bytes is not None else image_url
+
+def result_fingerprint(result):
+    """
+    Identify a result by its content, so rendered artifacts follow the result
+    rather than the request (a request analysed again can produce a different one).
+    
+    Returns:
+        str: SHA-256 hex digest of the result's locations
+    """
+    locations = json.dumps(result.get("locations") or [], sort_keys=True, default=str)
+    return hashlib.sha256(locations.encode("utf-8")).hexdigest()
+
+def analysis_cache_key(digest, context_info, location_guess, exif_mode, sample_frames):
+    """
+    Build the memoization key for an analysis request from the image key and the
+    options that change the result.
+    
+    Returns:
+        str: Cache key
+    """
+    return make_cache_key(f"{digest}|exif={exif_mode}|frames={sample_frames}", context_info, location_guess)
+
+@st.cache_resource(show_spinner=False)
+def get_preview_cache():
+    """
+    Return the preview cache shared by every session.
+    
+    Returns:
+        PreviewCache: Encoded previews keyed by image key, bounded by PREVIEW_CACHE_MB
+    """
+    return PreviewCache(max_bytes=PREVIEW_CACHE_MB * 1024 * 1024)
+
+def cache_preview(previews, key, data):
+    """
+    Return the cached preview of an image, encoding it on first use.
+    
+    Args:
+        previews (PreviewCache): Shared preview cache
+        key (str): Image key (see image_key)
+        data (bytes): Full image bytes
+        
+    Returns:
+        tuple or None: (preview bytes, MIME type), or None if the image cannot be decoded
+    """
+    try:
+        return previews.get_or_create(key, lambda: make_preview(data, max_dimension=PREVIEW_MAX_DIMENSION))
+    except ValueError:
+        return None
+
+@st.cache_resource(show_spinner=False)
+def get_job_manager():
+    """
+    Return the background job manager shared by every session.
+    
+    ANALYSIS_WORKERS caps the number of images being analysed by this server
+    process at once. The workers are shared round robin between sessions, with
+    single-image requests ahead of batches, and identical requests in flight are
+    shared between sessions.
+    
+    Returns:
+        JobManager: Shared pool of cancellable analysis jobs
+    """
+    return JobManager(max_workers=ANALYSIS_WORKERS)
+
+@st.cache_resource(max_entries=ARTIFACT_CACHE_SIZE, show_spinner=False)
+def get_result_artifacts(result_id, _locations):
+    """
+    Build the map, confidence chart and comparison table for a result once.
+    
+    Only result_id is hashed, so reruns (including unrelated widget changes)
+    reuse the same objects instead of rebuilding folium and plotly figures.
+    The cached objects are shared and must be treated as read-only.
+    
+    Args:
+        result_id (str): Identifier unique to the result (see result_fingerprint)
+        _locations (list): The result's locations (not hashed)
+        
+    Returns:
+        dict: "map" (folium.Map or None), "chart" (Figure or None) and "table" (DataFrame or None)
+    """
+    return {
+        "map": create_interactive_map(_locations),
+        "chart": create_confidence_chart(_locations),
+        "table": create_ranking_comparison(_locations),
+    }
+
+@st.cache_resource(max_entries=ARTIFACT_CACHE_SIZE, show_spinner=False)
+def get_map_html(result_id, _locations):
+    """
+    Render a result's map to a standalone HTML document once.
+    
+    Returns:
+        str or None: Map HTML, or None if the result has no coordinates
+    """
+    map_obj = get_result_artifacts(result_id, _locations)["map"]
+    return map_obj.get_root().render() if map_obj else None
+
+def run_analysis(geospy, result_cache, previews, item, context_info, location_guess, sample_frames):
+    """
+    Analyze one uploaded image or URL. Runs on a background job thread, so it must
+    not call Streamlit APIs.
+    
+    URLs are downloaded once here; the same bytes are analysed and used for the
+    preview, so the page never has to fetch the full-size image.
+    
+    Args:
+        geospy (GeoSpy): Shared client
+        result_cache (ResultCache): Shared result cache
+        previews (PreviewCache): Shared preview cache, filled for this image
+        item (dict): Analysis item built by submit_analyses
+        context_info (str): Optional additional context
+        location_guess (str): Optional location hint
+        sample_frames (bool): Analyze animated uploads frame by frame
+        
+    Returns:
+        dict: Analysis result (error results carry an "error" key)
+    """
+    data = item["data"]
+    if data is None:
+        try:
+            data = geospy.load_image_bytes(item["url"])
+        except Exception as e:
+            return {"error": f"Failed to process image: {str(e)}"}
+    cache_preview(previews, item["image_key"], data)
+    
+    if item["data"] is not None and sample_frames and is_animated(data):
+        result = geospy.locate_sequence(
+            data,
+            context_info=context_info if context_info else None,
+            location_guess=location_guess if location_guess else None
+        )
+    else:
+        result = geospy.locate_bytes(
+            data,
+            context_info=context_info if context_info else None,
+            location_guess=location_guess if location_guess else None
+        )
+    
+    # Only successful analyses are memoized; errors should be retried
+    if "error" not in result:
+        result_cache.put(item["cache_key"], result)
+    return result
+
+def submit_analyses(api_key, uploaded_files, image_urls, context_info, location_guess, exif_mode, sample_frames):
+    """
+    Start background analyses for every uploaded file and URL.
+    
+    Cached results are returned immediately; everything else becomes a
+    background job. Uploads are analysed straight from memory; nothing is
+    written to disk.
+    
+    Returns:
+        list: Analysis items (dicts) holding the source, cache key and job handle
+    """
+    geospy = get_geospy(api_key, exif_mode)
+    result_cache = get_result_cache()
+    previews = get_preview_cache()
+    manager = get_job_manager()
+    
+    sources = [(f.name, f.getvalue(), None) for f in uploaded_files]
+    sources += [(url, None, url) for url in image_urls]
+    
+    # A single image is interactive: someone is waiting on it, so it runs before queued batches
+    user = st.session_state.setdefault("user_id", uuid.uuid4().hex)
+    interactive = len(sources) == 1
+    
+    items = []
+    for name, data, url in sources:
+        digest = image_key(data, url)
+        item = {
+            "name": name,
+            "data": data,
+            "url": url,
+            "image_key": digest,
+            "cache_key": analysis_cache_key(digest, context_info, location_guess, exif_mode, sample_frames),
+            "job": None,
+            "result": None,
+            "finished": None,
+        }
+        item["result"] = result_cache.get(item["cache_key"])
+        item["from_cache"] = item["result"] is not None
+        if item["from_cache"]:
+            item["finished"] = time.time()
+        else:
+            item["job"] = manager.submit(
+                item["cache_key"], run_analysis,
+                geospy, result_cache, previews, item, context_info, location_guess, sample_frames,
+                user=user, interactive=interactive
+            )
+        items.append(item)
+    return items
+
+def release_analyses(items):
+    """
+    Give up on unfinished analyses (cancel button, or a new batch replacing them).
+    
+    A job shared with another session keeps running for that session; otherwise
+    its queued work is dropped and any in-flight request and backoff are aborted.
+    """
+    manager = get_job_manager()
+    for item in items:
+        job = item["job"]
+        if job is not None and not item.get("released"):
+            item["released"] = True
+            manager.release(job)
+
+def analysis_pending(item):
+    """Whether an analysis item is still waiting for its result."""
+    return item["job"] is not None and not item["job"].finished and not item.get("released")
+
+def analysis_result(item):
+    """Return the result of a finished analysis item, or None while it is still running."""
+    if item["result"] is None and item["job"] is not None:
+        if item["job"].finished:
+            item["result"] = item["job"].result
+            item["finished"] = item["job"].finished_at
+        elif item.get("released"):
+            item["result"] = {"error": "Analysis cancelled", "cancelled": True}
+            item["finished"] = time.time()
+    
+    # Each analysis that actually ran is saved to the history once; results served
+    # from the cache were recorded when they were produced
+    if item["result"] is not None and not item.get("recorded"):
+        item["recorded"] = True
+        if not item["result"].get("cancelled") and not item.get("from_cache"):
+            record_history(item)
+    return item["result"]
+
+def analysis_status(item):
+    """Describe an analysis item's state for the progress table."""
+    result = analysis_result(item)
+    if result is None:
+        position = get_job_manager().position(item["job"])
+        return f"⏳ Queued (#{position + 1})" if position is not None else "🔄 Analyzing"
+    if result.get("cancelled"):
+        return "⏹️ Cancelled"
+    if "error" in result:
+        return "❌ Failed"
+    return "✅ Cached" if item["from_cache"] else "✅ Done"
+
+def create_progress_table(items):
+    """
+    Create a pandas DataFrame summarising a batch of analyses.
+    
+    Args:
+        items (list): Analysis items from submit_analyses
+        
+    Returns:
+        pandas.DataFrame: One row per image with status, top prediction and timing
+    """
+    now = time.time()
+    rows = []
+    for i, item in enumerate(items):
+        result = analysis_result(item)
+        top = (result or {}).get("locations") or [{}]
+        if result is not None and "error" in result:
+            prediction = result["error"]
+        elif result is not None:
+            prediction = ", ".join(part for part in (top[0].get("city"), top[0].get("country")) if part) or "Unknown"
+        else:
+            prediction = ""
+        started = item["job"].started_at if item["job"] is not None else None
+        elapsed = (item["finished"] or now) - started if started else None
+        rows.append({
+            "#": i + 1,
+            "Image": item["name"],
+            "Status": analysis_status(item),
+            "Top Prediction": prediction,
+            "Confidence": top[0].get("confidence", "") if result is not None else "",
+            "Time (s)": f"{elapsed:.1f}" if elapsed is not None else "",
+        })
+    return pd.DataFrame(rows)
+
+def display_progress(items):
+    """
+    Render the live progress table for a batch of analyses.
+    
+    Called inside a fragment that refreshes on a timer while work is pending, so only
+    the table is redrawn. When another image finishes, the whole app is rerun so the
+    drill-down picks it up.
+    """
+    done = sum(1 for item in items if not analysis_pending(item))
+    st.progress(done / len(items), text=f"{done} of {len(items)} images analyzed")
+    st.dataframe(create_progress_table(items), use_container_width=True, hide_index=True)
+    load = get_job_manager().stats()
+    st.caption(f"Server: {load['running']} of {load['workers']} workers busy, "
+               f"{load['waiting_interactive'] + load['waiting_bulk']} images waiting "
+               f"from {load['waiting_users']} users")
+    display_circuit_state()
+    if done != st.session_state.get("analyses_done", done):
+        st.session_state.analyses_done = done
+        st.rerun()
+
+def display_circuit_state():
+    """Warn while the Gemini circuit breaker is refusing or probing requests."""
+    circuit = get_circuit_breaker().stats()
+    if circuit["state"] == "open":
+        st.warning(f"⛔ Gemini API is failing ({circuit['recent_failure_rate']:.0%} of recent requests); "
+                   f"requests are paused, retrying in {circuit['retry_after']:.0f}s")
+    elif circuit["state"] == "half_open":
+        st.info("🔄 Gemini API recovering: sending test requests before resuming")
+
+def display_error(error_msg, details=None):
+    """
+    Show an analysis error with troubleshooting tips for common API failures.
+    
+    Args:
+        error_msg (str): Error message
+        details (str): Optional technical details
+    """
+    text = f"{error_msg} {details or ''}".lower()
+    
+    # Handle specific API errors
+    if "circuit breaker" in text:
+        st.error(f"""
+        ⛔ **Gemini API Paused**
+        
+        Recent requests to the Gemini API kept failing, so new requests are paused
+        instead of each waiting through its own retries and timeouts.
+        
+        **Solutions:**
+        - ⏱️ **Retry in a moment**: a few test requests are sent automatically and
+          analysis resumes as soon as they succeed ({details or 'shortly'})
+        - 💾 **Cached results** are still available
+        """)
+    elif "503" in text or "overloaded" in text or "unavailable" in text:
+        st.error("""
+        🔄 **API Temporarily Overloaded**
+        
+        The Gemini API is experiencing high traffic right now. This is a temporary issue.
+        
+        **Solutions:**
+        - ⏱️ **Wait 1-2 minutes** and try again
+        - 🔄 **Refresh the page** and retry
+        - 🌙 **Try during off-peak hours** (late night/early morning)
+        
+        This is not a problem with your setup - it's a server-side issue.
+        """)
+    elif "quota" in text or "429" in text:
+        st.error("""
+        📊 **API Quota Exceeded**
+        
+        You've reached your Gemini API usage limit.
+        
+        **Solutions:**
+        - 💳 **Check your API quota** at [Google AI Studio](https://makersuite.google.com/app/apikey)
+        - 🔄 **Wait for quota reset** (usually daily)
+        - 📈 **Upgrade your plan** if needed
+        """)
+    elif "invalid" in text and "key" in text:
+        st.error("""
+        🔑 **Invalid API Key**
+        
+        The API key you provided is not valid.
+        
+        **Solutions:**
+        - 🔑 **Check your API key** at [Google AI Studio](https://makersuite.google.com/app/apikey)
+        - 📋 **Copy the key carefully** (no extra spaces)
+        - 🔄 **Generate a new key** if needed
+        """)
+    else:
+        st.error(f"❌ Analysis failed: {error_msg}")
+    
+    # Show technical details in expander
+    with st.expander("🔧 Technical Details"):
+        st.code(f"Error: {error_msg}" + (f"\n\n{details}" if details else ""))
+        st.info("If this error persists, please check your internet connection and API key.")
+
+def display_result(result, result_id, from_cache=False, completed_at=None, static_map=False):
+    """
+    Display one analysis: interpretation, metrics, ranking, map, table and charts.
+    
+    Args:
+        result (dict): Result returned by GeoSpy
+        result_id (str): Identifier unique to the result, used to reuse rendered artifacts
+        from_cache (bool): Whether the result was served from the result cache
+        completed_at (datetime): When the analysis finished
+        static_map (bool): Embed the map as static HTML instead of a folium component
+    """
+    if result.get("cancelled"):
+        st.warning("⏹️ Analysis cancelled")
+        return
+    if "error" in result:
+        display_error(result["error"], result.get("details"))
+        return
+    
+    # Display interpretation
+    if "interpretation" in result:
+        with st.expander("🔍 Image Analysis", expanded=True):
+            st.markdown(result["interpretation"])
+    
+    # Display locations
+    if "locations" in result and result["locations"]:
+        locations = result["locations"]
+        
+        # Create metrics row
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-value">{len(locations)}</div>
+                <div class="metric-label">Predictions</div>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col_b:
+            high_conf = sum(1 for loc in locations if loc.get('confidence') == 'High')
+            st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-value">{high_conf}</div>
+                <div class="metric-label">High Confidence</div>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col_c:
+            center = LocationBatch.from_results([{"locations": locations}]).center()
+            st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-value">{f"{center[0]:.2f}°" if center else "N/A"}</div>
+                <div class="metric-label">Avg Latitude</div>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        # Display location rankings
+        display_location_ranking(locations)
+        
+        # Maps, charts and tables are built once per result and reused on reruns
+        artifacts = get_result_artifacts(result_id, locations)
+        
+        # Interactive Map
+        st.markdown('<h3 class="section-header">🗺️ Interactive Map</h3>', unsafe_allow_html=True)
+        if not artifacts["map"]:
+            st.warning("⚠️ No valid coordinates found for mapping")
+        elif static_map:
+            # Plain HTML: no map state is sent back, so panning and zooming never rerun the app
+            components.html(get_map_html(result_id, locations), height=500)
+        else:
+            # Don't return map interactions to the server; they would trigger a rerun each time
+            st_folium(artifacts["map"], width=700, height=500, returned_objects=[], key=f"map-{result_id}")
+        
+        # Location Comparison Table
+        st.markdown('<h3 class="section-header">📊 Location Comparison</h3>', unsafe_allow_html=True)
+        comparison_df = artifacts["table"]
+        if comparison_df is not None:
+            st.dataframe(comparison_df, use_container_width=True, hide_index=True)
+        
+        # Analytics Charts
+        st.markdown('<h3 class="section-header">📈 Analytics</h3>', unsafe_allow_html=True)
+        
+        col_chart1, col_chart2 = st.columns(2)
+        
+        with col_chart1:
+            conf_chart = artifacts["chart"]
+            if conf_chart:
+                st.plotly_chart(conf_chart, use_container_width=True)
+        
+        # Analysis timestamp
+        if completed_at is not None:
+            cache_note = " (served from cache, no API call)" if from_cache else ""
+            st.caption(f"Analysis completed at: {completed_at.strftime('%Y-%m-%d %H:%M:%S')}{cache_note}")
+        if "cascade" in result:
+            cascade = result["cascade"]
+            escalated = "".join(f", escalated from {step['model']} ({step['reason'].replace('_', ' ')})"
+                                for step in cascade["escalations"])
+            st.caption(f"Answered by {cascade['model']} (tier {cascade['tier'] + 1}){escalated}")
+    else:
+        st.warning("⚠️ No locations identified in the analysis")
+
+def results_frame(records):
+    """
+    Flatten many results into one DataFrame with a row per predicted location.
+    
+    Args:
+        records (list): (source, result) pairs; failed results are skipped
+        
+    Returns:
+        pandas.DataFrame: Columns source, rank, country, state, city, confidence,
+        latitude and longitude (coordinates as floats, NaN when missing)
+    """
+    records = [{"source": source, "locations": result["locations"]}
+               for source, result in records if result and result.get("locations")]
+    if not records:
+        return pd.DataFrame(columns=AGGREGATE_COLUMNS)
+    
+    frame = pd.json_normalize(records, record_path="locations", meta=["source"], errors="ignore")
+    frame = frame.rename(columns={"coordinates.latitude": "latitude", "coordinates.longitude": "longitude"})
+    frame["rank"] = frame.groupby("source", sort=False).cumcount() + 1
+    return frame.reindex(columns=AGGREGATE_COLUMNS)
+
+def load_export_frame(name, data):
+    """
+    Read a file exported by the geospyer CLI into the results_frame layout.
+    
+    Args:
+        name (str): File name; the extension selects the format
+        data (bytes): File contents
+        
+    Returns:
+        pandas.DataFrame: One row per predicted location
+        
+    Raises:
+        ValueError: If the format is not supported or the file cannot be parsed
+    """
+    fmt = infer_format(name)
+    if fmt == "csv":
+        frame = pd.read_csv(io.BytesIO(data))
+    elif fmt == "parquet":
+        frame = pd.read_parquet(io.BytesIO(data))
+    elif fmt in ("ndjson", "geojson"):
+        if fmt == "ndjson":
+            features = [json.loads(line) for line in data.splitlines() if line.strip()]
+        else:
+            features = json.loads(data)["features"]
+        frame = pd.json_normalize(features)
+        frame.columns = [column.replace("properties.", "", 1) for column in frame.columns]
+        # GeoJSON points are [longitude, latitude]; null geometries become NaN
+        coordinates = frame.get("geometry.coordinates", pd.Series(index=frame.index, dtype=object))
+        frame["longitude"] = coordinates.str[0]
+        frame["latitude"] = coordinates.str[1]
+    else:
+        records = json.loads(data)
+        return results_frame([(record.get("source", name), record) for record in records])
+    
+    return frame.reindex(columns=AGGREGATE_COLUMNS)
+
+def map_points(frame, top_only=True):
+    """
+    Select mappable predictions from a results DataFrame (vectorized).
+    
+    Args:
+        frame (pandas.DataFrame): Output of results_frame or load_export_frame
+        top_only (bool): Keep only each image's highest-ranked prediction
+        
+    Returns:
+        pandas.DataFrame: Rows with valid, non-zero coordinates
+    """
+    lat = pd.to_numeric(frame["latitude"], errors="coerce")
+    lon = pd.to_numeric(frame["longitude"], errors="coerce")
+    valid = lat.between(-90, 90) & lon.between(-180, 180) & ((lat != 0) | (lon != 0))
+    if top_only:
+        valid &= pd.to_numeric(frame["rank"], errors="coerce") == 1
+    points = frame[valid].copy()
+    points["latitude"], points["longitude"] = lat[valid], lon[valid]
+    return points
+
+def bin_coordinates(lat, lon, max_cells):
+    """
+    Aggregate points into a regular lat/lon grid with at most max_cells occupied cells.
+    
+    The cell size starts at 0.1 degrees and doubles until the cap is met, so the
+    payload sent to the browser stays bounded however many points there are.
+    
+    Args:
+        lat (numpy.ndarray): Latitudes
+        lon (numpy.ndarray): Longitudes
+        max_cells (int): Maximum number of cells returned
+        
+    Returns:
+        pandas.DataFrame: latitude/longitude centroid and count per occupied cell
+    """
+    cell = 0.1
+    while True:
+        keys = np.column_stack([np.floor((lat + 90) / cell), np.floor((lon + 180) / cell)]).astype(np.int64)
+        cells, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        if len(cells) <= max_cells or cell >= 90:
+            break
+        cell *= 2
+    inverse = inverse.ravel()
+    return pd.DataFrame({
+        "latitude": np.bincount(inverse, weights=lat) / counts,
+        "longitude": np.bincount(inverse, weights=lon) / counts,
+        "count": counts,
+    })
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def create_aggregate_map_html(points):
+    """
+    Render a map of many predictions as standalone HTML.
+    
+    Up to AGGREGATE_MAX_MARKERS points are drawn as client-side clustered markers
+    whose popups are only built when opened; larger sets are binned on the server
+    into at most AGGREGATE_MAX_CELLS grid cells. A weighted heat layer is always
+    added from binned data, so the page size is capped either way.
+    
+    Args:
+        points (pandas.DataFrame): Output of map_points
+        
+    Returns:
+        str or None: Map HTML, or None if there is nothing to plot
+    """
+    if points.empty:
+        return None
+    from folium.plugins import FastMarkerCluster, HeatMap
+    
+    lat = points["latitude"].to_numpy(dtype=float)
+    lon = points["longitude"].to_numpy(dtype=float)
+    
+    m = folium.Map(location=[float(np.median(lat)), float(np.median(lon))], zoom_start=3,
+                   tiles='OpenStreetMap', prefer_canvas=True)
+    folium.TileLayer(
+        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Satellite View'
+    ).add_to(m)
+    
+    if len(points) <= AGGREGATE_MAX_MARKERS:
+        # Short escaped labels travel with the coordinates; popup HTML is created on click
+        places = (points["city"].fillna("Unknown").astype(str) + ", " + points["country"].fillna("Unknown").astype(str)
+                  + " (" + points["confidence"].fillna("?").astype(str) + ")")
+        labels = (places.map(html.escape) + "<br>"
+                  + points["source"].fillna("").astype(str).str.slice(-80).map(html.escape))
+        data = [[a, b, c] for a, b, c in zip(lat.round(5).tolist(), lon.round(5).tolist(), labels.tolist())]
+        FastMarkerCluster(data, name="Predictions", callback="""
+            function (row) {
+                var marker = L.marker(new L.LatLng(row[0], row[1]));
+                marker.bindPopup(function () { return row[2]; });
+                return marker;
+            }
+        """).add_to(m)
+    else:
+        cells = bin_coordinates(lat, lon, AGGREGATE_MAX_CELLS)
+        group = folium.FeatureGroup(name=f"Predictions ({len(points):,} binned)")
+        scale = np.sqrt(cells["count"].to_numpy() / cells["count"].max())
+        for row, radius in zip(cells.itertuples(index=False), 4 + 16 * scale):
+            folium.CircleMarker(
+                [row.latitude, row.longitude], radius=float(radius), weight=1,
+                color='#764ba2', fill=True, fill_opacity=0.6,
+                tooltip=f"{row.count:,} predictions"
+            ).add_to(group)
+        group.add_to(m)
+    
+    heat = bin_coordinates(lat, lon, AGGREGATE_MAX_CELLS)
+    HeatMap(
+        heat[["latitude", "longitude", "count"]].to_numpy().tolist(),
+        name="Density", radius=20, blur=15, show=False
+    ).add_to(m)
+    
+    folium.LayerControl().add_to(m)
+    return m.get_root().render()
+
+def display_case_map(items):
+    """
+    Show every finished result of the current batch, plus any loaded export files, on one map.
+    
+    Args:
+        items (list): Analysis items from submit_analyses
+    """
+    st.markdown('<h2 class="section-header">🌐 Case Map</h2>', unsafe_allow_html=True)
+    
+    col_files, col_options = st.columns([2, 1])
+    with col_files:
+        export_files = st.file_uploader(
+            "Load exported results",
+            type=['csv', 'ndjson', 'jsonl', 'geojson', 'json', 'parquet'],
+            accept_multiple_files=True,
+            help="Files written by the geospyer command line tool (--output)"
+        )
+    with col_options:
+        top_only = st.checkbox("Top prediction per image only", value=True)
+    
+    frames = [results_frame([(item["name"], analysis_result(item)) for item in items])]
+    for export_file in export_files or []:
+        try:
+            frames.append(load_export_frame(export_file.name, export_file.getvalue()))
+        except Exception as e:
+            st.warning(f"⚠️ Could not read {export_file.name}: {str(e)}")
+    
+    points = map_points(pd.concat(frames, ignore_index=True), top_only)
+    if points.empty:
+        st.info("Finished analyses and loaded exports will appear here.")
+        return
+    
+    st.caption(f"{len(points):,} predictions from {points['source'].nunique():,} images")
+    components.html(create_aggregate_map_html(points), height=550)
+
+@st.cache_resource(show_spinner=False)
+def get_history_store():
+    """
+    Return the analysis history database shared by every session.
+    
+    Returns:
+        HistoryStore: SQLite-backed history at GEOSPY_HISTORY_DB
+    """
+    return HistoryStore(HISTORY_DB)
+
+def display_image(item):
+    """
+    Show the cached preview of an analysis image, and the full-size image only on request.
+    
+    Args:
+        item (dict): Analysis item built by submit_analyses
+    """
+    previews = get_preview_cache()
+    if item["data"] is not None:
+        preview = cache_preview(previews, item["image_key"], item["data"])
+    else:
+        preview = previews.get(item["image_key"])  # Filled once the analysis has downloaded the URL
+    
+    if preview is None:
+        if item["data"] is None:
+            st.caption(f"Preview of {item['name']} will appear once the image has been downloaded.")
+        else:
+            st.image(item["data"], caption=item["name"], use_container_width=True)
+        return
+    
+    if st.toggle("🔍 Full resolution", key=f"full_resolution_{item['image_key']}"):
+        st.image(item["data"] if item["data"] is not None else item["url"],
+                 caption=item["name"], use_container_width=True)
+    else:
+        st.image(preview[0], caption=item["name"], use_container_width=True)
+
+def record_history(item):
+    """
+    Save a finished analysis (with a small thumbnail when the image could be decoded) to the history.
+    
+    Args:
+        item (dict): Analysis item whose result is available
+    """
+    # Downloaded URLs are not kept, so their thumbnail comes from the cached preview
+    source = item["data"]
+    if source is None:
+        preview = get_preview_cache().get(item["image_key"])
+        source = preview[0] if preview else None
+    thumbnail = None
+    if source is not None:
+        try:
+            thumbnail = make_thumbnail(source)
+        except ValueError:
+            pass  # Undecodable image; the entry is still recorded
+    image_hash = item["image_key"] if item["data"] is not None else None
+    try:
+        get_history_store().add(item["name"], item["result"], image_hash=image_hash,
+                                thumbnail=thumbnail, created_at=item["finished"])
+    except Exception as e:
+        print(f"Warning: could not save analysis to history: {str(e)}")
+
+def toggle_history_entry(entry_id):
+    """Expand or collapse one history row (button callback)."""
+    expanded = st.session_state.setdefault("history_expanded", set())
+    expanded.symmetric_difference_update({entry_id})
+
+def display_history():
+    """
+    Render the analysis history: filters, sorting and one page of entries.
+    
+    Only the current page's summary rows are read from the database. Thumbnails
+    and full results are loaded when a row is expanded, so the page stays fast
+    however many analyses are stored.
+    """
+    st.markdown('<h2 class="section-header">🗂️ Analysis History</h2>', unsafe_allow_html=True)
+    store = get_history_store()
+    
+    # Filters and sorting
+    sort_options = {
+        "Newest first": ("created_at", True),
+        "Oldest first": ("created_at", False),
+        "Country (A-Z)": ("country", False),
+        "Confidence (high first)": ("confidence", True),
+        "Image name": ("source", False),
+    }
+    col_country, col_conf, col_from, col_to, col_sort, col_size = st.columns([2, 2, 1.5, 1.5, 2, 1])
+    with col_country:
+        country = st.selectbox("Country", ["All countries"] + store.countries())
+    with col_conf:
+        confidence = st.multiselect("Confidence", ["High", "Medium", "Low"])
+    with col_from:
+        since = st.date_input("From", value=None)
+    with col_to:
+        until = st.date_input("To", value=None)
+    with col_sort:
+        sort_label = st.selectbox("Sort by", list(sort_options))
+    with col_size:
+        page_size = st.selectbox("Per page", HISTORY_PAGE_SIZES)
+    
+    # Go back to the first page whenever the filters change
+    filters = (country, tuple(confidence), since, until, sort_label, page_size)
+    if st.session_state.get("history_filters") != filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_page = 1
+    
+    sort, descending = sort_options[sort_label]
+    query = dict(
+        country=None if country == "All countries" else country,
+        confidence=confidence or None,
+        since=time.mktime(since.timetuple()) if since else None,
+        until=time.mktime(until.timetuple()) + 86400 if until else None,
+        sort=sort,
+        descending=descending,
+        limit=page_size,
+    )
+    page = st.session_state.get("history_page", 1)
+    entries, total = store.query(offset=(page - 1) * page_size, **query)
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        # Entries were removed or filters narrowed; show the last page instead
+        page = st.session_state.history_page = pages
+        entries, total = store.query(offset=(page - 1) * page_size, **query)
+    
+    col_count, col_page = st.columns([4, 1])
+    with col_count:
+        st.caption(f"{total:,} analyses · page {page} of {pages}")
+    with col_page:
+        st.number_input("Page", min_value=1, max_value=pages, step=1, key="history_page")
+    
+    if not entries:
+        st.info("No analyses match these filters yet.")
+        return
+    
+    expanded = st.session_state.setdefault("history_expanded", set())
+    for entry in entries:
+        is_open = entry["id"] in expanded
+        place = ", ".join(part for part in (entry["city"], entry["country"]) if part)
+        col_date, col_source, col_place, col_conf, col_toggle = st.columns([2, 4, 3, 1, 1])
+        col_date.write(datetime.fromtimestamp(entry["created_at"]).strftime('%Y-%m-%d %H:%M'))
+        col_source.write(entry["source"])
+        col_place.write(f"❌ {entry['error']}" if entry["status"] == "failed" else place or "Unknown")
+        col_conf.write(entry["confidence"] or "")
+        col_toggle.button("Hide" if is_open else "Details", key=f"history-toggle-{entry['id']}",
+                          on_click=toggle_history_entry, args=(entry["id"],))
+        
+        # Thumbnail and full result are only read for expanded rows
+        if is_open:
+            with st.container(border=True):
+                if entry["has_thumbnail"]:
+                    st.image(store.get_thumbnail(entry["id"]), caption=entry["source"])
+                result = store.get_result(entry["id"])
+                if result is not None:
+                    display_result(result, f"history-{entry['id']}",
+                                   completed_at=datetime.fromtimestamp(entry["created_at"]), static_map=True)
+
 def main():
     """
     Main Streamlit application entry point.
@@ -715,6 +1650,15 @@ def main():
     st.markdown('<p class="subtitle">AI-Powered Image Geolocation with **Top 3 Location Predictions**</p>', unsafe_allow_html=True)
     
     # Sidebar for configuration
+    with st.sidebar:
+        page = st.radio("View", ["🔍 Analyze", "🗂️ History"], horizontal=True, label_visibility="collapsed")
+        if page == "🗂️ History":
+            st.caption("Past analyses from everyone using this server.")
+    
+    if page == "🗂️ History":
+        display_history()
+        return
+    
     with st.sidebar:
         st.header("⚙️ Configuration")
         
@@ -736,6 +1680,7 @@ def main():
             """)
             return
         
+        display_circuit_state()
         st.divider()
         
         # Additional context
@@ -753,6 +1698,39 @@ def main():
             help="Provide a hint about the possible location"
         )
         
+        # EXIF metadata handling
+        exif_labels = {
+            "ignore": "Ignore",
+            "context": "Use as context",
+            "skip": "Use GPS directly (skip AI when present)"
+        }
+        exif_mode = st.selectbox(
+            "EXIF Metadata",
+            options=list(exif_labels),
+            format_func=exif_labels.get,
+            help="Photos often embed GPS, capture time and camera details. Use them as extra context, or return the embedded GPS position without an API call."
+        )
+        
+        # Frame sampling for animated uploads
+        sample_frames = st.checkbox(
+            "Analyze animated images frame by frame",
+            value=True,
+            help="For animated GIFs, analyze a few representative frames (near-duplicates are skipped) and merge their predictions"
+        )
+        
+        # Map rendering
+        map_labels = {
+            "interactive": "Interactive",
+            "static": "Static (fastest)"
+        }
+        map_mode = st.radio(
+            "Map Display",
+            options=list(map_labels),
+            format_func=map_labels.get,
+            horizontal=True,
+            help="Static maps are embedded as plain HTML: still pannable and zoomable, but they never send events back to the app"
+        )
+        
         st.divider()
         
         # About section
@@ -779,195 +1757,82 @@ def main():
     col1, col2 = st.columns([1, 1])
     
     with col1:
-        st.markdown('<h2 class="section-header">📸 Upload Image</h2>', unsafe_allow_html=True)
+        st.markdown('<h2 class="section-header">📸 Upload Images</h2>', unsafe_allow_html=True)
         
         # File uploader with better styling
-        uploaded_file = st.file_uploader(
-            "Choose an image file",
+        uploaded_files = st.file_uploader(
+            "Choose image files",
             type=['png', 'jpg', 'jpeg', 'gif', 'bmp'],
-            help="Upload an image to analyze its location"
+            accept_multiple_files=True,
+            help="Upload one or more images to analyze their locations"
         )
         
         # URL input as alternative
         st.markdown("---")
-        st.subheader("Or enter image URL")
-        image_url = st.text_input(
-            "Image URL",
+        st.subheader("Or enter image URLs")
+        url_text = st.text_area(
+            "Image URLs",
             placeholder="https://example.com/image.jpg",
-            help="Provide a direct link to an image"
+            help="Provide direct links to images, one per line"
         )
+        image_urls = [line.strip() for line in url_text.splitlines() if line.strip()]
         
         # Process button
-        if uploaded_file or image_url:
-            if st.button("🔍 Analyze Location", type="primary", use_container_width=True):
-                with st.spinner("Analyzing image with AI..."):
-                    try:
-                        # Initialize GeoSpy
-                        geospy = GeoSpy(api_key=api_key)
-                        
-                        # Process image
-                        if uploaded_file:
-                            # Save uploaded file temporarily
-                            temp_path = f"temp_{uploaded_file.name}"
-                            with open(temp_path, "wb") as f:
-                                f.write(uploaded_file.getbuffer())
-                            
-                            result = geospy.locate(
-                                image_path=temp_path,
-                                context_info=context_info if context_info else None,
-                                location_guess=location_guess if location_guess else None
-                            )
-                            
-                            # Clean up temp file
-                            os.remove(temp_path)
-                        else:
-                            result = geospy.locate(
-                                image_path=image_url,
-                                context_info=context_info if context_info else None,
-                                location_guess=location_guess if location_guess else None
-                            )
-                        
-                        # Store result in session state
-                        st.session_state.result = result
-                        st.session_state.image_source = uploaded_file if uploaded_file else image_url
-                        st.session_state.analysis_time = datetime.now()
-                        
-                    except Exception as e:
-                        error_msg = str(e)
-                        
-                        # Handle specific API errors
-                        if "503" in error_msg or "overloaded" in error_msg.lower() or "unavailable" in error_msg.lower():
-                            st.error("""
-                            🔄 **API Temporarily Overloaded**
-                            
-                            The Gemini API is experiencing high traffic right now. This is a temporary issue.
-                            
-                            **Solutions:**
-                            - ⏱️ **Wait 1-2 minutes** and try again
-                            - 🔄 **Refresh the page** and retry
-                            - 🌙 **Try during off-peak hours** (late night/early morning)
-                            
-                            This is not a problem with your setup - it's a server-side issue.
-                            """)
-                        elif "quota" in error_msg.lower() or "limit" in error_msg.lower():
-                            st.error("""
-                            📊 **API Quota Exceeded**
-                            
-                            You've reached your Gemini API usage limit.
-                            
-                            **Solutions:**
-                            - 💳 **Check your API quota** at [Google AI Studio](https://makersuite.google.com/app/apikey)
-                            - 🔄 **Wait for quota reset** (usually daily)
-                            - 📈 **Upgrade your plan** if needed
-                            """)
-                        elif "invalid" in error_msg.lower() and "key" in error_msg.lower():
-                            st.error("""
-                            🔑 **Invalid API Key**
-                            
-                            The API key you provided is not valid.
-                            
-                            **Solutions:**
-                            - 🔑 **Check your API key** at [Google AI Studio](https://makersuite.google.com/app/apikey)
-                            - 📋 **Copy the key carefully** (no extra spaces)
-                            - 🔄 **Generate a new key** if needed
-                            """)
-                        else:
-                            st.error(f"❌ **Analysis Error:** {error_msg}")
-                        
-                        # Show technical details in expander
-                        with st.expander("🔧 Technical Details"):
-                            st.code(f"Error: {error_msg}")
-                            st.info("If this error persists, please check your internet connection and API key.")
+        if uploaded_files or image_urls:
+            count = len(uploaded_files) + len(image_urls)
+            label = "🔍 Analyze Location" if count == 1 else f"🔍 Analyze {count} Images"
+            if st.button(label, type="primary", use_container_width=True):
+                # Analyses run as background jobs; the page stays responsive.
+                # Unfinished work from a previous batch is abandoned, so free its workers.
+                release_analyses(st.session_state.get("analyses", []))
+                st.session_state.analyses = submit_analyses(
+                    api_key, uploaded_files, image_urls, context_info, location_guess, exif_mode, sample_frames
+                )
+                st.session_state.analyses_done = 0
+                st.session_state.selected_analysis = 0
     
     with col2:
         st.markdown('<h2 class="section-header">📍 Results</h2>', unsafe_allow_html=True)
         
-        # Display image
-        if 'image_source' in st.session_state:
-            if isinstance(st.session_state.image_source, str):  # URL
-                st.image(st.session_state.image_source, caption="Uploaded Image", use_container_width=True)
-            else:  # Uploaded file
-                st.image(st.session_state.image_source, caption="Uploaded Image", use_container_width=True)
-        
-        # Display results
-        if 'result' in st.session_state:
-            result = st.session_state.result
+        items = st.session_state.get("analyses", [])
+        if items:
+            pending = any(analysis_pending(item) for item in items)
+            if pending and st.button("⏹️ Cancel", use_container_width=True,
+                                     help="Stop the unfinished analyses, aborting requests in flight"):
+                release_analyses(items)
+                pending = False
+            
+            # Live progress table, refreshed on a timer only while work is pending
+            if len(items) > 1 or pending:
+                st.fragment(run_every=PROGRESS_REFRESH_SECONDS if pending else None)(display_progress)(items)
             
-            if "error" in result:
-                st.error(f"❌ Analysis failed: {result['error']}")
-                if "details" in result:
-                    with st.expander("Error Details"):
-                        st.text(result["details"])
+            # Per-image drill-down
+            if len(items) > 1:
+                selected = st.selectbox(
+                    "Show details for",
+                    options=range(len(items)),
+                    format_func=lambda i: f"{i + 1}. {items[i]['name']}",
+                    key="selected_analysis"
+                )
             else:
-                # Display interpretation
-                if "interpretation" in result:
-                    with st.expander("🔍 Image Analysis", expanded=True):
-                        st.markdown(result["interpretation"])
-                
-                # Display locations
-                if "locations" in result and result["locations"]:
-                    locations = result["locations"]
-                    
-                    # Create metrics row
-                    col_a, col_b, col_c = st.columns(3)
-                    with col_a:
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-value">{len(locations)}</div>
-                            <div class="metric-label">Predictions</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col_b:
-                        high_conf = sum(1 for loc in locations if loc.get('confidence') == 'High')
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-value">{high_conf}</div>
-                            <div class="metric-label">High Confidence</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col_c:
-                        avg_lat = np.mean([loc.get("coordinates", {}).get("latitude", 0) for loc in locations if loc.get("coordinates", {}).get("latitude", 0) != 0])
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-value">{avg_lat:.2f}°</div>
-                            <div class="metric-label">Avg Latitude</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Display location rankings
-                    display_location_ranking(locations)
-                    
-                    # Interactive Map
-                    st.markdown('<h3 class="section-header">🗺️ Interactive Map</h3>', unsafe_allow_html=True)
-                    map_obj = create_interactive_map(locations)
-                    if map_obj:
-                        st_folium(map_obj, width=700, height=500)
-                    else:
-                        st.warning("⚠️ No valid coordinates found for mapping")
-                    
-                    # Location Comparison Table
-                    st.markdown('<h3 class="section-header">📊 Location Comparison</h3>', unsafe_allow_html=True)
-                    comparison_df = create_ranking_comparison(locations)
-                    if comparison_df is not None:
-                        st.dataframe(comparison_df, use_container_width=True, hide_index=True)
-                    
-                    # Analytics Charts
-                    st.markdown('<h3 class="section-header">📈 Analytics</h3>', unsafe_allow_html=True)
-                    
-                    col_chart1, col_chart2 = st.columns(2)
-                    
-                    with col_chart1:
-                        conf_chart = create_confidence_chart(locations)
-                        if conf_chart:
-                            st.plotly_chart(conf_chart, use_container_width=True)
-                    
-                    # Analysis timestamp
-                    if 'analysis_time' in st.session_state:
-                        st.caption(f"Analysis completed at: {st.session_state.analysis_time.strftime('%Y-%m-%d %H:%M:%S')}")
-                else:
-                    st.warning("⚠️ No locations identified in the analysis")
+                selected = 0
+            item = items[selected]
+            
+            # Display image preview (URLs that failed to load are not shown)
+            result = analysis_result(item)
+            if item["data"] is not None or result is None or "error" not in result:
+                display_image(item)
+            
+            # Display results
+            if result is None:
+                st.info("⏳ Analysis in progress...")
+            else:
+                display_result(result, result_fingerprint(result), item["from_cache"],
+                               datetime.fromtimestamp(item["finished"]), static_map=map_mode == "static")
+    
+    # Aggregate view of the whole case
+    st.divider()
+    display_case_map(st.session_state.get("analyses", []))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from geospyer import cancel
+from geospyer.background import JobManager
+from geospyer.scheduler import FairScheduler
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = FairScheduler(workers=1)
+    yield scheduler
+    scheduler.shutdown()
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def block(submit):
+    """Occupy the only worker until the returned event is set."""
+    started, gate = threading.Event(), threading.Event()
+
+    def blocker():
+        started.set()
+        gate.wait(TIMEOUT)
+        return {"locations": []}
+
+    submit(blocker)
+    assert started.wait(TIMEOUT)
+    return gate
+
+
+def test_round_robin_between_users_with_interactive_first(scheduler):
+    gate = block(lambda func: scheduler.submit(func, user="blocker"))
+    order = []
+    finished = threading.Event()
+    for name, user, interactive in [("a1", "a", False), ("a2", "a", False), ("a3", "a", False),
+                                    ("b1", "b", False), ("c1", "c", True)]:
+        scheduler.submit(lambda name=name: order.append(name), user=user, interactive=interactive)
+    scheduler.submit(finished.set, user="z")
+    gate.set()
+    assert finished.wait(TIMEOUT)
+    assert order == ["c1", "a1", "b1", "a2", "a3"]
+
+
+def test_position_follows_the_rotation(scheduler):
+    gate = block(lambda func: scheduler.submit(func, user="blocker"))
+    a1, a2, a3 = (scheduler.submit(lambda: None, user="a") for _ in range(3))
+    b1 = scheduler.submit(lambda: None, user="b")
+    assert [scheduler.position(task) for task in (a1, b1, a2, a3)] == [0, 1, 2, 3]
+    urgent = scheduler.submit(lambda: None, user="c", interactive=True)
+    assert scheduler.position(urgent) == 0
+    assert scheduler.position(a1) == 1
+    gate.set()
+
+
+def test_promote_and_cancel(scheduler):
+    gate = block(lambda func: scheduler.submit(func, user="blocker"))
+    first = scheduler.submit(lambda: None, user="a")
+    second = scheduler.submit(lambda: None, user="a")
+    scheduler.promote(second)
+    assert scheduler.position(second) == 0
+    assert scheduler.cancel(first)
+    assert scheduler.position(first) is None
+    assert scheduler.stats()["waiting_bulk"] == 0
+    gate.set()
+
+
+def test_identical_submissions_share_one_job(manager):
+    gate = block(lambda func: manager.submit("blocker", func))
+    calls = []
+    first = manager.submit("key", lambda: calls.append(1) or {"locations": []})
+    second = manager.submit("key", lambda: calls.append(2) or {"locations": []})
+    assert first is second and first.subscribers == 2
+    gate.set()
+    assert first.done.wait(TIMEOUT)
+    assert calls == [1] and first.status == "done"
+    assert manager.stats()["deduplicated"] == 1
+
+
+def test_job_is_cancelled_only_when_every_submitter_released_it(manager):
+    gate = block(lambda func: manager.submit("blocker", func))
+    job = manager.submit("key", lambda: {"locations": []})
+    manager.submit("key", lambda: {"locations": []})
+    assert not manager.release(job)
+    assert not job.finished
+    assert manager.release(job)
+    assert job.finished and job.status == "cancelled" and job.result["cancelled"]
+    gate.set()
+
+
+def test_cancel_aborts_a_running_job(manager):
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        cancel.sleep(TIMEOUT)
+        return {"locations": []}
+
+    job = manager.submit("key", slow)
+    assert started.wait(TIMEOUT)
+    assert manager.cancel(job)
+    assert job.done.wait(TIMEOUT)
+    assert job.status == "cancelled"
+    # A new submission with the same key starts a fresh job
+    assert manager.submit("key", lambda: {"locations": []}) is not job
+
+
+def test_failures_are_reported_as_results(manager):
+    job = manager.submit("error", lambda: {"error": "503"})
+    crash = manager.submit("crash", lambda: 1 / 0)
+    assert job.done.wait(TIMEOUT) and crash.done.wait(TIMEOUT)
+    assert job.status == "failed"
+    assert crash.status == "failed" and crash.result["error"].startswith("Unexpected error during analysis")
@@ -0,0 +1,86 @@
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from geospyer.cassette import Cassette, CassetteAdapter, CassetteMiss, fingerprint, strip_secrets
+
+UPLOAD_URL = "https://example.test/upload?upload_id=7&key=SECRET"
+
+
+class FakeAdapter(BaseAdapter):
+    """Answers every request with 200 and an upload URL header, counting calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers["X-Goog-Upload-URL"] = UPLOAD_URL
+        response.headers["Content-Type"] = "application/json"
+        response.headers["Set-Cookie"] = "session=abc"
+        response._content = b'{"calls": %d}' % self.calls
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def session_for(cassette, adapter):
+    session = requests.Session()
+    session.mount("https://", CassetteAdapter(cassette, adapter))
+    return session
+
+
+def test_strip_secrets():
+    assert strip_secrets("https://x.test/v1/models/m:generate?key=SECRET&alt=json") == \
+        "https://x.test/v1/models/m:generate?alt=json"
+
+
+def test_fingerprint_ignores_the_key():
+    assert fingerprint("post", "https://x.test/a?key=one", b"{}") == fingerprint("POST", "https://x.test/a?key=two", b"{}")
+    assert fingerprint("POST", "https://x.test/a", b"{}") != fingerprint("POST", "https://x.test/a", b"[]")
+
+
+def test_record_never_writes_the_key(tmp_path):
+    path = tmp_path / "traffic.cassette"
+    adapter = FakeAdapter()
+    session_for(Cassette(str(path), "record"), adapter).post("https://example.test/api?key=SECRET", data=b"{}")
+    content = path.read_text()
+    assert "SECRET" not in content
+    assert "upload_id=7" in content
+    assert "session=abc" not in content
+
+
+def test_replay_answers_in_recorded_order_without_the_network(tmp_path):
+    path = str(tmp_path / "traffic.cassette")
+    recorder = session_for(Cassette(path, "record"), FakeAdapter())
+    for _ in range(2):
+        recorder.post("https://example.test/api?key=SECRET", data=b"{}")
+
+    network = FakeAdapter()
+    cassette = Cassette(path, "replay")
+    replayer = session_for(cassette, network)
+    # A different key replays the same recording
+    answers = [replayer.post("https://example.test/api?key=OTHER", data=b"{}").json() for _ in range(3)]
+    assert answers == [{"calls": 1}, {"calls": 2}, {"calls": 2}]
+    assert network.calls == 0 and cassette.replayed == 3
+
+
+def test_replay_miss(tmp_path):
+    path = tmp_path / "traffic.cassette"
+    path.write_text("")
+    cassette = Cassette(str(path), "replay")
+    with pytest.raises(CassetteMiss):
+        session_for(cassette, FakeAdapter()).get("https://example.test/unknown")
+    assert cassette.misses == 1
+
+
+def test_replay_requires_the_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Cassette(str(tmp_path / "missing.cassette"), "replay")
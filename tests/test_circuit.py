@@ -0,0 +1,100 @@
+import time
+
+from geospyer.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def make_breaker(**kwargs):
+    options = dict(failure_rate=0.5, min_requests=4, consecutive_failures=3, open_seconds=0.05, probes=1)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def fail(breaker, times):
+    for _ in range(times):
+        breaker.record(breaker.allow(), False)
+
+
+def wait_for_probe(breaker):
+    time.sleep(breaker.open_seconds + 0.01)
+
+
+def test_opens_after_consecutive_failures():
+    breaker = make_breaker()
+    fail(breaker, 2)
+    assert breaker.state == CLOSED
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.allow() is None
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_opens_on_failure_rate():
+    breaker = make_breaker(consecutive_failures=0)
+    for success in (True, False, True, False):
+        breaker.record(breaker.allow(), success)
+    assert breaker.state == OPEN
+
+
+def test_successes_reset_the_failure_streak():
+    breaker = make_breaker(min_requests=100)
+    for _ in range(5):
+        fail(breaker, 2)
+        breaker.record(breaker.allow(), True)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_success_closes():
+    breaker = make_breaker()
+    fail(breaker, 3)
+    wait_for_probe(breaker)
+    probe = breaker.allow()
+    assert probe.probe and breaker.state == HALF_OPEN
+    assert breaker.allow() is None  # Only one probe at a time
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = make_breaker()
+    fail(breaker, 3)
+    wait_for_probe(breaker)
+    breaker.record(breaker.allow(), False)
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+
+
+def test_abandoned_probe_frees_its_slot():
+    breaker = make_breaker()
+    fail(breaker, 3)
+    wait_for_probe(breaker)
+    breaker.record(breaker.allow(), None)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is not None
+
+
+def test_stale_request_is_not_counted_as_a_probe():
+    breaker = make_breaker()
+    stale = breaker.allow()  # Admitted while closed, still in flight when the circuit opens
+    fail(breaker, 3)
+    wait_for_probe(breaker)
+    probe = breaker.allow()
+    breaker.record(stale, True)
+    assert breaker.state == HALF_OPEN
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
+
+
+def test_allow_waits_for_the_probe_window():
+    breaker = make_breaker(max_wait=1.0)
+    fail(breaker, 3)
+    started = time.monotonic()
+    admission = breaker.allow()
+    assert admission is not None and admission.probe
+    assert time.monotonic() - started < 0.5
+
+
+def test_retry_after():
+    breaker = make_breaker(open_seconds=30)
+    assert breaker.retry_after() == 0
+    fail(breaker, 3)
+    assert 29 < breaker.retry_after() <= 30
@@ -0,0 +1,104 @@
+import csv
+import json
+
+import pytest
+
+from geospyer.export import FIELDS, ResultWriter, flatten_result, infer_format, open_writer
+
+PARIS = {
+    "interpretation": "A boulevard with Haussmann buildings.",
+    "locations": [
+        {"country": "France", "state": "Île-de-France", "city": "Paris", "confidence": "High",
+         "coordinates": {"latitude": 48.8566, "longitude": 2.3522}, "explanation": "Architecture"},
+        {"country": "Belgium", "state": "Brussels", "city": "Brussels", "confidence": "Low",
+         "coordinates": {"latitude": "50.85", "longitude": "bad"}, "explanation": "Similar style"},
+    ],
+}
+FAILED = {"error": "Failed to process image: truncated file"}
+
+
+def write(path, fmt=None):
+    with open_writer(str(path), fmt) as writer:
+        writer.write("paris.jpg", PARIS)
+        writer.write("broken.jpg", FAILED)
+    return writer
+
+
+def test_result_writer_is_abstract():
+    with pytest.raises(TypeError):
+        ResultWriter("out.csv")
+
+
+def test_flatten_result():
+    rows = flatten_result("paris.jpg", PARIS)
+    assert [row["rank"] for row in rows] == [1, 2]
+    assert rows[0]["latitude"] == 48.8566 and rows[0]["interpretation"] == PARIS["interpretation"]
+    assert rows[1]["latitude"] == 50.85 and rows[1]["longitude"] is None
+    [row] = flatten_result("broken.jpg", FAILED)
+    assert set(row) == set(FIELDS) and row["error"] == FAILED["error"] and row["rank"] is None
+    assert flatten_result("empty.jpg", {"locations": []})[0]["error"] == "No locations identified"
+
+
+@pytest.mark.parametrize("path, fmt", [("out.csv", "csv"), ("out.jsonl", "ndjson"), ("out.geojson", "geojson"),
+                                       ("out.pq", "parquet"), ("out.txt", "json")])
+def test_infer_format(path, fmt):
+    assert infer_format(path) == fmt
+
+
+def test_csv_round_trip(tmp_path):
+    writer = write(tmp_path / "out.csv")
+    assert (writer.results_written, writer.rows_written) == (2, 3)
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["city"] for row in rows] == ["Paris", "Brussels", ""]
+    assert rows[0]["state"] == "Île-de-France" and float(rows[0]["latitude"]) == 48.8566
+    assert rows[2]["error"] == FAILED["error"]
+
+
+def test_ndjson_round_trip(tmp_path):
+    write(tmp_path / "out.ndjson")
+    with open(tmp_path / "out.ndjson", encoding="utf-8") as f:
+        features = [json.loads(line) for line in f]
+    assert len(features) == 3
+    assert features[0]["geometry"] == {"type": "Point", "coordinates": [2.3522, 48.8566]}
+    assert features[1]["geometry"] is None  # Invalid longitude
+    assert features[2]["properties"]["error"] == FAILED["error"]
+
+
+def test_geojson_round_trip(tmp_path):
+    write(tmp_path / "out.geojson")
+    with open(tmp_path / "out.geojson", encoding="utf-8") as f:
+        collection = json.load(f)
+    assert collection["type"] == "FeatureCollection"
+    assert [feature["properties"]["source"] for feature in collection["features"]] == \
+        ["paris.jpg", "paris.jpg", "broken.jpg"]
+
+
+def test_empty_geojson_is_valid(tmp_path):
+    with open_writer(str(tmp_path / "out.geojson")):
+        pass
+    with open(tmp_path / "out.geojson", encoding="utf-8") as f:
+        assert json.load(f) == {"type": "FeatureCollection", "features": []}
+
+
+def test_json_keeps_full_results(tmp_path):
+    write(tmp_path / "out.json")
+    with open(tmp_path / "out.json", encoding="utf-8") as f:
+        results = json.load(f)
+    assert results == [{"source": "paris.jpg", **PARIS}, {"source": "broken.jpg", **FAILED}]
+
+
+def test_parquet_round_trip(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    write(tmp_path / "out.parquet")
+    table = pq.read_table(str(tmp_path / "out.parquet"))
+    assert table.column_names == FIELDS
+    assert table.column("city").to_pylist() == ["Paris", "Brussels", None]
+    assert table.column("latitude").to_pylist() == [48.8566, 50.85, None]
+
+
+def test_close_is_idempotent(tmp_path):
+    writer = write(tmp_path / "out.geojson")
+    writer.close()
+    with open(tmp_path / "out.geojson", encoding="utf-8") as f:
+        assert len(json.load(f)["features"]) == 3
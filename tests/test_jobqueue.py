@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from geospyer.jobqueue import DONE, FAILED, LEASED, QUEUED, MemoryQueue, QueueBackend, SQLiteQueue, open_queue
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def backend(request, tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "queue.db")) if request.param == "sqlite" else MemoryQueue()
+    yield queue
+    queue.close()
+
+
+def test_queue_backend_is_abstract():
+    with pytest.raises(TypeError):
+        QueueBackend()
+
+
+def test_enqueue_and_lease(backend):
+    assert backend.enqueue(["a.jpg", "b.jpg"], context_info="ctx", location_guess="Paris") == 2
+    jobs = backend.lease("w1", visibility_timeout=60, limit=5)
+    assert [job["image"] for job in jobs] == ["a.jpg", "b.jpg"]
+    assert jobs[0]["context"] == "ctx" and jobs[0]["guess"] == "Paris" and jobs[0]["attempts"] == 1
+    assert backend.lease("w2", visibility_timeout=60) == []
+    assert backend.stats() == {QUEUED: 0, LEASED: 2, DONE: 0, FAILED: 0}
+
+
+def test_complete_requires_the_lease(backend):
+    backend.enqueue(["a.jpg"])
+    job = backend.lease("w1", visibility_timeout=60)[0]
+    assert not backend.complete(job["id"], "w2", {"locations": []})
+    assert backend.complete(job["id"], "w1", {"locations": []})
+    assert list(backend.iter_results()) == [("a.jpg", {"locations": []})]
+
+
+def test_expired_lease_is_leased_again(backend):
+    backend.enqueue(["a.jpg"])
+    backend.lease("w1", visibility_timeout=0.01)
+    time.sleep(0.02)
+    job = backend.lease("w2", visibility_timeout=60)[0]
+    assert job["attempts"] == 2
+    # The first worker lost its lease and can no longer finish the job
+    assert not backend.complete(job["id"], "w1", {"locations": []})
+
+
+def test_failures_retry_until_max_attempts(backend):
+    backend.enqueue(["a.jpg"], max_attempts=2)
+    job = backend.lease("w1", visibility_timeout=60)[0]
+    assert backend.fail(job["id"], "w1", {"error": "503"}, base_delay=0) == QUEUED
+    job = backend.lease("w1", visibility_timeout=60)[0]
+    assert backend.fail(job["id"], "w1", {"error": "503"}, base_delay=0) == FAILED
+    assert list(backend.iter_results()) == [("a.jpg", {"error": "503"})]
+
+
+def test_failure_backoff_delays_the_retry(backend):
+    backend.enqueue(["a.jpg"])
+    job = backend.lease("w1", visibility_timeout=60)[0]
+    backend.fail(job["id"], "w1", {"error": "503"}, base_delay=60)
+    assert backend.lease("w1", visibility_timeout=60) == []
+
+
+def test_non_retryable_failure_is_final(backend):
+    backend.enqueue(["a.jpg"], max_attempts=3)
+    job = backend.lease("w1", visibility_timeout=60)[0]
+    assert backend.fail(job["id"], "w1", {"error": "bad image"}, retry=False) == FAILED
+
+
+def test_release_does_not_use_an_attempt(backend):
+    backend.enqueue(["a.jpg"], max_attempts=1)
+    job = backend.lease("w1", visibility_timeout=60)[0]
+    assert backend.release(job["id"], "w1")
+    assert not backend.release(job["id"], "w1")
+    job = backend.lease("w1", visibility_timeout=60)[0]
+    assert job["attempts"] == 1
+
+
+def test_release_delay(backend):
+    backend.enqueue(["a.jpg"])
+    job = backend.lease("w1", visibility_timeout=60)[0]
+    backend.release(job["id"], "w1", delay=60)
+    assert backend.lease("w1", visibility_timeout=60) == []
+    assert backend.stats()[QUEUED] == 1
+
+
+def test_sqlite_queue_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "queue.db")
+    producer, consumer = open_queue(path), open_queue(f"sqlite://{path}")
+    try:
+        producer.enqueue(["a.jpg"])
+        assert [job["image"] for job in consumer.lease("w1", visibility_timeout=60)] == ["a.jpg"]
+    finally:
+        producer.close()
+        consumer.close()
+
+
+def test_memory_queues_are_shared_by_name():
+    assert open_queue("memory://tests-shared") is open_queue("memory://tests-shared")
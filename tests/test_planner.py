@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from PIL import Image
+
+from geospyer.planner import IMAGE_TOKENS_PER_TILE, estimate_image_tokens, iter_image_paths, plan_batch
+
+
+@pytest.fixture
+def images(tmp_path):
+    Image.new("RGB", (300, 200)).save(tmp_path / "small.jpg")
+    Image.new("RGB", (1600, 800)).save(tmp_path / "large.png")
+    (tmp_path / "notes.txt").write_text("not an image")
+    (tmp_path / "broken.jpg").write_bytes(b"not a jpeg")
+    return tmp_path
+
+
+@pytest.mark.parametrize("width, height, tiles", [(384, 384, 1), (385, 100, 1), (768, 768, 1),
+                                                  (769, 768, 2), (1600, 800, 6)])
+def test_estimate_image_tokens(width, height, tiles):
+    assert estimate_image_tokens(width, height) == tiles * IMAGE_TOKENS_PER_TILE
+
+
+def test_directories_expand_to_image_files(images):
+    paths = sorted(path.rsplit("/", 1)[-1] for path in iter_image_paths([str(images), "https://x.test/a.jpg"]))
+    assert paths == ["a.jpg", "broken.jpg", "large.png", "small.jpg"]
+
+
+def test_plan_batch(images):
+    report = plan_batch([str(images)], concurrency=2, avg_latency=4, output_tokens=100)
+    assert (report["images"], report["requests"], report["unreadable"]) == (3, 2, 1)
+    assert report["output_tokens"] == 200
+    assert report["input_tokens"] == 7 * IMAGE_TOKENS_PER_TILE + 2 * report["prompt_tokens_per_request"]
+    assert report["throughput_per_minute"] == 30.0
+    assert report["estimated_seconds"] == 4.0
+    assert report["upload_bytes"] > report["raw_bytes"]  # base64 and request overhead
+    json.dumps(report, allow_nan=False)
+
+
+def test_quota_limits_throughput(images):
+    report = plan_batch([str(images)], concurrency=10, avg_latency=1, requests_per_minute=6)
+    assert report["throughput_per_minute"] == 6.0
+    assert report["estimated_seconds"] == 20.0
+
+
+def test_max_dimension_scales_bytes_and_tokens(images):
+    full = plan_batch([str(images / "large.png")])
+    scaled = plan_batch([str(images / "large.png")], max_dimension=800)
+    assert scaled["input_tokens"] < full["input_tokens"]
+    assert scaled["raw_bytes"] == int(full["raw_bytes"] * 0.25)
+
+
+@pytest.mark.parametrize("options", [{"avg_latency": 0}, {"avg_latency": -1}, {"concurrency": 0}])
+def test_invalid_throughput_options(images, options):
+    with pytest.raises(ValueError):
+        plan_batch([str(images)], **options)